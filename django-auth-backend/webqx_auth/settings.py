@@ -62,6 +62,7 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'authentication.tracing.TracingMiddleware',  # first, so the request span covers the others
     'corsheaders.middleware.CorsMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'whitenoise.middleware.WhiteNoiseMiddleware',
@@ -129,7 +130,7 @@ DATABASES = {
 # Redis Configuration for Caching and Sessions
 CACHES = {
     'default': {
-        'BACKEND': 'django_redis.cache.RedisCache',
+        'BACKEND': 'authentication.cache.TracedRedisCache',
         'LOCATION': os.getenv('REDIS_URL', 'redis://webqx-auth-cache.abc123.cache.amazonaws.com:6379/1'),
         'OPTIONS': {
             'CLIENT_CLASS': 'django_redis.client.DefaultClient',
@@ -141,7 +142,7 @@ CACHES = {
         'TIMEOUT': 3600,
     },
     'sessions': {
-        'BACKEND': 'django_redis.cache.RedisCache',
+        'BACKEND': 'authentication.cache.TracedRedisCache',
         'LOCATION': os.getenv('REDIS_URL', 'redis://webqx-auth-cache.abc123.cache.amazonaws.com:6379/2'),
         'OPTIONS': {
             'CLIENT_CLASS': 'django_redis.client.DefaultClient',
@@ -1,4 +1,4 @@
-from fastapi import FastAPI, Depends, HTTPException, Header
+from fastapi import FastAPI, Depends
 from pydantic import BaseModel
 from typing import Optional
 
@@ -22,33 +22,19 @@ class AssistResponse(BaseModel):
     result: str
     model: str = "mock-clinical-assistant"
 
-from services.shared.jwt_rs256 import JWTVerifier, VerifierSettings
 from services.shared.audit import get_audit_logger
 from services.shared import rbac
-import os
+from services.shared.middleware import instrument, get_verifier, require_auth
+from services.shared.profiler import profile_router
+from services.shared.audit_store import audit_router
 
-_verifier = None
-def get_verifier():
-    global _verifier
-    if _verifier is None:
-        # Prefer new short alias path /auth/.well-known/jwks.json; fallback keeps backward compatibility
-        settings = VerifierSettings(
-            jwks_url=os.getenv("JWT_JWKS_URL", os.getenv("JWT_JWKS_FALLBACK", "http://localhost:8000/auth/.well-known/jwks.json")),
-            issuer=os.getenv("JWT_ISSUER", "webqx.healthcare"),
-            audience=os.getenv("JWT_AUDIENCE", "webqx.emr"),
-        )
-        _verifier = JWTVerifier(settings)
-    return _verifier
+verify_auth = require_auth()  # any verified token carrying a role claim
 
-async def verify_auth(authorization: Optional[str] = Header(None)):
-    try:
-        claims = await get_verifier().verify(authorization)
-        # Minimal RBAC placeholder: ensure role claim exists
-        if 'role' not in claims:
-            raise HTTPException(status_code=403, detail="Missing role claim")
-        return claims
-    except ValueError as e:
-        raise HTTPException(status_code=401, detail=str(e))
+instrument(app)
+app.include_router(profile_router(get_verifier))
+app.include_router(audit_router(get_verifier))
+app.include_router(rbac.permissions_router(verify_auth))
+rbac.install_reload_signal()  # SIGHUP re-reads RBAC policies without a restart
 
 @app.get("/health")
 async def health():
@@ -1,16 +1,58 @@
-"""Simple asynchronous audit logger.
+"""Asynchronous, batching audit logger.
 
 Writes JSON lines to a target file (default: audit.log). Intended for lightweight
-compliance trace—NOT a full SIEM. Can be extended with async queue + rotation.
+compliance trace—NOT a full SIEM.
+
+``log`` only enqueues. A writer thread collects events into batches and flushes
+a batch once it holds ``batch_size`` events or its oldest event has waited
+``flush_interval`` seconds. Each batch is one ``write`` on a file descriptor
+opened with ``O_APPEND`` and kept open, so lines from several processes sharing
+the file never interleave.
+
+- rotation: when the file would exceed ``max_bytes`` or is older than
+  ``rotate_seconds`` it is renamed to ``<name>.<UTC timestamp>`` and gzipped in
+  the background; a writer that finds its file rotated by another process reopens
+- durability: ``fsync`` is ``"always"`` (every batch), ``"interval"`` (at most
+  every ``fsync_interval`` seconds) or ``"never"``
+- back-pressure: the queue holds ``max_queue`` events; when full, ``"block"``
+  waits up to ``block_timeout`` seconds and ``"drop"`` does not wait. ``"block"``
+  never waits when called from a running event loop (async views, ASGI
+  middleware), where it would stall every request on the worker; it drops
+  instead. Events that cannot be queued are counted in ``dropped``
+- ``shutdown`` writes everything still queued before returning
+- indexing: with a ``store`` (``AUDIT_STORE_DIR``, see ``audit_store``) each
+  written batch is also inserted into the time/actor/action-indexed segments
 """
 from __future__ import annotations
+import asyncio
+import atexit
+import gzip
 import json
+import logging
+import os
+import shutil
+import sqlite3
 import time
 import threading
 from dataclasses import dataclass, asdict
 from pathlib import Path
-from queue import Queue, Empty
-from typing import Any, Optional
+from queue import Queue, Empty, Full
+from typing import Any, Dict, List, Optional
+
+from .metrics import record
+from .tracing import span
+
+logger = logging.getLogger("webqx.audit")
+
+_STOP = object()
+
+
+def _on_event_loop() -> bool:
+    try:
+        asyncio.get_running_loop()
+    except RuntimeError:
+        return False
+    return True
 
 
 @dataclass
@@ -25,35 +67,222 @@ class AuditEvent:
 
 
 class AuditLogger:
-    def __init__(self, path: str = "audit.log", flush_interval: float = 2.0):
+    def __init__(
+        self,
+        path: str = "audit.log",
+        flush_interval: float = 2.0,
+        batch_size: int = 256,
+        max_queue: int = 10000,
+        overflow: str = "block",
+        block_timeout: float = 0.5,
+        max_bytes: int = 64 * 1024 * 1024,
+        rotate_seconds: float = 0,
+        compress: bool = True,
+        fsync: str = "interval",
+        fsync_interval: float = 1.0,
+        store: Optional[Any] = None,
+    ):
+        if overflow not in ("block", "drop"):
+            raise ValueError("overflow must be 'block' or 'drop'")
+        if fsync not in ("always", "interval", "never"):
+            raise ValueError("fsync must be 'always', 'interval' or 'never'")
         self.path = Path(path)
         self.flush_interval = flush_interval
-        self._q: Queue[AuditEvent] = Queue()
+        self.batch_size = batch_size
+        self.overflow = overflow
+        self.block_timeout = block_timeout
+        self.max_bytes = max_bytes
+        self.rotate_seconds = rotate_seconds
+        self.compress = compress
+        self.fsync = fsync
+        self.fsync_interval = fsync_interval
+        self.store = store
+        self.enqueued = 0
+        self.dropped = 0
+        self.written = 0
+        self.batches = 0
+        self.write_errors = 0
+        self.rotations = 0
+        self.store_errors = 0
+        self._fd = -1
+        self._opened_at = 0.0
+        self._synced_at = 0.0
+        self._q: Queue[Any] = Queue(maxsize=max_queue)
         self._stop = threading.Event()
-        self._thread = threading.Thread(target=self._worker, daemon=True)
+        self._thread = threading.Thread(target=self._worker, name="audit-writer", daemon=True)
         self._thread.start()
 
-    def _worker(self):  # pragma: no cover - background thread
-        buffer: list[str] = []
-        while not self._stop.is_set():
+    # --- writer thread -------------------------------------------------
+
+    def _worker(self):
+        stopping = False
+        while not stopping:
+            item = self._q.get()
+            if item is _STOP:
+                break
+            batch: List[AuditEvent] = [item]
+            deadline = time.monotonic() + self.flush_interval
+            while len(batch) < self.batch_size:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                try:
+                    item = self._q.get(timeout=remaining)
+                except Empty:
+                    break
+                if item is _STOP:
+                    stopping = True
+                    break
+                batch.append(item)
+            self._flush(batch)
+        # drain whatever was queued before shutdown
+        rest: List[AuditEvent] = []
+        while True:
             try:
-                evt = self._q.get(timeout=self.flush_interval)
-                buffer.append(json.dumps(asdict(evt), separators=(",", ":")))
+                item = self._q.get_nowait()
             except Empty:
-                pass
-            if buffer:
-                self.path.parent.mkdir(parents=True, exist_ok=True)
-                with self.path.open("a", encoding="utf-8") as f:
-                    f.write("\n".join(buffer) + "\n")
-                buffer.clear()
+                break
+            if item is not _STOP:
+                rest.append(item)
+        for i in range(0, len(rest), self.batch_size):
+            self._flush(rest[i:i + self.batch_size])
+        self._close(sync=self.fsync != "never")
+        if self.store is not None:
+            self.store.close()
+
+    def _flush(self, batch: List[AuditEvent]) -> None:
+        try:
+            self._write(batch)
+        except Exception:  # an unexpected error costs this batch, never the writer thread
+            self.write_errors += 1
+            logger.exception("Audit batch of %d events lost", len(batch))
+
+    def _write(self, batch: List[AuditEvent]) -> None:
+        # default=str: a details value JSON can't encode must not cost the batch (or the thread)
+        lines = [json.dumps(asdict(e), separators=(",", ":"), default=str) for e in batch]
+        data = ("\n".join(lines) + "\n").encode("utf-8")
+        try:
+            self._prepare(len(data))
+            view = memoryview(data)
+            while view:  # a regular file takes it in one call; loop only for short writes
+                view = view[os.write(self._fd, view):]
+            now = time.monotonic()
+            if self.fsync == "always" or (self.fsync == "interval" and now - self._synced_at >= self.fsync_interval):
+                os.fsync(self._fd)
+                self._synced_at = now
+        except OSError as e:
+            self.write_errors += 1
+            logger.error("Audit write of %d events to %s failed: %s", len(batch), self.path, e)
+            self._close(sync=False)
+            return
+        self.written += len(batch)
+        self.batches += 1
+        if self.store is not None:
+            try:
+                self.store.append(batch)
+            except (sqlite3.Error, OSError) as e:  # the JSON-lines file remains the record
+                self.store_errors += 1
+                logger.error("Indexing %d audit events failed: %s", len(batch), e)
+
+    def _prepare(self, incoming: int) -> None:
+        if self._fd >= 0:
+            st = os.fstat(self._fd)
+            try:
+                current = os.stat(self.path).st_ino
+            except FileNotFoundError:
+                current = None
+            if current != st.st_ino:  # rotated by another process
+                self._close(sync=self.fsync != "never")
+            elif st.st_size and (
+                (self.max_bytes and st.st_size + incoming > self.max_bytes)
+                or (self.rotate_seconds and time.monotonic() - self._opened_at >= self.rotate_seconds)
+            ):
+                self._rotate()
+        if self._fd < 0:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            self._fd = os.open(self.path, os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o640)
+            self._opened_at = time.monotonic()
+
+    def _rotate(self) -> None:
+        self._close(sync=self.fsync != "never")
+        now = time.time()
+        stamp = time.strftime("%Y%m%dT%H%M%S", time.gmtime(now)) + f"{now % 1:.6f}"[1:]
+        target = self.path.with_name(f"{self.path.name}.{stamp}.{os.getpid()}")
+        try:
+            os.rename(self.path, target)
+        except FileNotFoundError:  # another process rotated it first
+            return
+        self.rotations += 1
+        if self.compress:
+            threading.Thread(target=_gzip_file, args=(target,), name="audit-compress", daemon=True).start()
+
+    def _close(self, sync: bool) -> None:
+        if self._fd < 0:
+            return
+        try:
+            if sync:
+                os.fsync(self._fd)
+        except OSError:
+            pass
+        os.close(self._fd)
+        self._fd = -1
+
+    # --- producer side -------------------------------------------------
 
     def log(self, action: str, actor: Optional[str] = None, **kwargs: Any):
+        started = time.perf_counter()
         evt = AuditEvent(ts=time.time(), actor=actor, action=action, **kwargs)
-        self._q.put(evt)
+        with span("audit.enqueue", {"audit.action": action}) as s:
+            try:
+                if self._stop.is_set():
+                    self.dropped += 1
+                    s.set_attribute("audit.dropped", True)
+                elif self.overflow == "block" and not _on_event_loop():
+                    self._q.put(evt, timeout=self.block_timeout)
+                    self.enqueued += 1
+                else:
+                    self._q.put_nowait(evt)
+                    self.enqueued += 1
+            except Full:
+                self.dropped += 1
+                s.set_attribute("audit.dropped", True)
+            finally:
+                record("audit", time.perf_counter() - started)
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            "enqueued": self.enqueued,
+            "dropped": self.dropped,
+            "written": self.written,
+            "batches": self.batches,
+            "write_errors": self.write_errors,
+            "rotations": self.rotations,
+            "store_errors": self.store_errors,
+            "queued": self._q.qsize(),
+        }
 
-    def shutdown(self):  # pragma: no cover
+    def shutdown(self, timeout: float = 10.0):
+        """Stop accepting events, write out the queue and close the file."""
+        if self._stop.is_set():
+            return
         self._stop.set()
-        self._thread.join(timeout=1.5)
+        if not self._thread.is_alive():
+            return
+        try:
+            self._q.put(_STOP, timeout=timeout)
+        except Full:
+            logger.error("Audit queue still full after %.1fs; %d events not written", timeout, self._q.qsize())
+            return
+        self._thread.join(timeout=timeout)
+
+
+def _gzip_file(path: Path) -> None:
+    try:
+        with path.open("rb") as src, gzip.open(f"{path}.gz", "wb") as dst:
+            shutil.copyfileobj(src, dst, 1024 * 1024)
+        os.unlink(path)
+    except OSError as e:  # pragma: no cover - leave the plain file in place
+        logger.error("Compressing rotated audit log %s failed: %s", path, e)
 
 
 _global_logger: Optional[AuditLogger] = None
@@ -62,7 +291,20 @@ _global_logger: Optional[AuditLogger] = None
 def get_audit_logger() -> AuditLogger:
     global _global_logger
     if _global_logger is None:
-        _global_logger = AuditLogger()
+        from .audit_store import get_audit_store
+
+        _global_logger = AuditLogger(
+            path=os.getenv("AUDIT_LOG_PATH", "audit.log"),
+            flush_interval=float(os.getenv("AUDIT_FLUSH_INTERVAL", "2.0")),
+            batch_size=int(os.getenv("AUDIT_BATCH_SIZE", "256")),
+            max_queue=int(os.getenv("AUDIT_QUEUE_SIZE", "10000")),
+            overflow=os.getenv("AUDIT_OVERFLOW", "block"),
+            max_bytes=int(os.getenv("AUDIT_MAX_BYTES", str(64 * 1024 * 1024))),
+            rotate_seconds=float(os.getenv("AUDIT_ROTATE_SECONDS", "0")),
+            fsync=os.getenv("AUDIT_FSYNC", "interval"),
+            store=get_audit_store(),
+        )
+        atexit.register(_global_logger.shutdown)
     return _global_logger
 
 
@@ -0,0 +1,228 @@
+"""Indexed audit store: monthly SQLite segments queried by time, actor and action.
+
+Enabled by ``AUDIT_STORE_DIR``. The audit writer thread appends each batch
+(after it reaches the JSON-lines file) to ``audit-YYYY-MM.sqlite`` for the UTC
+month of each event, in one transaction per segment. Every segment indexes
+``ts`` and ``(actor, ts)``, ``(action, ts)``, ``(resource, ts)``.
+
+A query touches only the segments whose month overlaps its time range, walks
+them in order and pages with an opaque ``(ts, id)`` cursor, so questions like
+"everything user X did last Tuesday" read one segment's index instead of years
+of logs. Segments are append-only; retention is deleting old segment files.
+"""
+from __future__ import annotations
+import json
+import os
+import sqlite3
+import time
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS audit_events (
+    id INTEGER PRIMARY KEY,
+    ts REAL NOT NULL,
+    actor TEXT,
+    action TEXT NOT NULL,
+    resource TEXT,
+    outcome TEXT,
+    ip TEXT,
+    details TEXT
+);
+CREATE INDEX IF NOT EXISTS audit_ts ON audit_events (ts);
+CREATE INDEX IF NOT EXISTS audit_actor_ts ON audit_events (actor, ts);
+CREATE INDEX IF NOT EXISTS audit_action_ts ON audit_events (action, ts);
+CREATE INDEX IF NOT EXISTS audit_resource_ts ON audit_events (resource, ts);
+"""
+
+_COLUMNS = ("ts", "actor", "action", "resource", "outcome", "ip", "details")
+_PREFIX = "audit-"
+_SUFFIX = ".sqlite"
+
+
+def segment_month(ts: float) -> str:
+    return time.strftime("%Y-%m", time.gmtime(ts))
+
+
+def _encode_cursor(ts: float, rowid: int) -> str:
+    return f"{ts!r}:{rowid}"
+
+
+def _decode_cursor(cursor: str) -> Tuple[float, int]:
+    ts, sep, rowid = cursor.rpartition(":")
+    if not sep:
+        raise ValueError("Invalid cursor")
+    return float(ts), int(rowid)
+
+
+class AuditStore:
+    def __init__(self, root: str, max_open: int = 2):
+        self.root = Path(root)
+        self.root.mkdir(parents=True, exist_ok=True)
+        self.max_open = max_open
+        self._writers: Dict[str, sqlite3.Connection] = {}  # writer thread only
+
+    def _path(self, month: str) -> Path:
+        return self.root / f"{_PREFIX}{month}{_SUFFIX}"
+
+    def _writer(self, month: str) -> sqlite3.Connection:
+        conn = self._writers.pop(month, None)
+        if conn is None:
+            conn = sqlite3.connect(self._path(month), isolation_level=None, check_same_thread=False)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.execute("PRAGMA busy_timeout=5000")  # several processes share a segment
+            conn.executescript(SCHEMA)
+        self._writers[month] = conn  # most recently used last
+        while len(self._writers) > self.max_open:
+            self._writers.pop(next(iter(self._writers))).close()
+        return conn
+
+    def append(self, events: Iterable[Any]) -> None:
+        """Insert ``AuditEvent``s, one transaction per monthly segment."""
+        by_month: Dict[str, List[tuple]] = {}
+        for e in events:
+            details = json.dumps(e.details, separators=(",", ":"), default=str) if e.details is not None else None
+            by_month.setdefault(segment_month(e.ts), []).append(
+                (e.ts, e.actor, e.action, e.resource, e.outcome, e.ip, details)
+            )
+        for month, rows in by_month.items():
+            conn = self._writer(month)
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                conn.executemany(
+                    f"INSERT INTO audit_events ({', '.join(_COLUMNS)}) VALUES (?, ?, ?, ?, ?, ?, ?)", rows
+                )
+                conn.execute("COMMIT")
+            except BaseException:
+                conn.execute("ROLLBACK")
+                raise
+
+    def segments(self, since: Optional[float] = None, until: Optional[float] = None) -> List[Path]:
+        """Existing segment files overlapping ``[since, until)``, oldest first."""
+        low = segment_month(since) if since is not None else ""
+        high = segment_month(until) if until is not None else "9999-99"
+        found = []
+        for path in self.root.glob(f"{_PREFIX}*{_SUFFIX}"):
+            month = path.name[len(_PREFIX):-len(_SUFFIX)]
+            if low <= month <= high:
+                found.append((month, path))
+        return [path for _, path in sorted(found)]
+
+    def query(
+        self,
+        actor: Optional[str] = None,
+        action: Optional[str] = None,
+        resource: Optional[str] = None,
+        since: Optional[float] = None,
+        until: Optional[float] = None,
+        limit: int = 100,
+        cursor: Optional[str] = None,
+    ) -> Tuple[List[Dict[str, Any]], Optional[str]]:
+        """Matching events in time order and the cursor for the next page (None when done)."""
+        after = _decode_cursor(cursor) if cursor else None
+        if after is not None:
+            since = max(since, after[0]) if since is not None else after[0]
+        where, params = [], []
+        for column, value in (("actor", actor), ("action", action), ("resource", resource)):
+            if value is not None:
+                where.append(f"{column} = ?")
+                params.append(value)
+        if since is not None:
+            where.append("ts >= ?")
+            params.append(since)
+        if until is not None:
+            where.append("ts < ?")
+            params.append(until)
+        if after is not None:
+            where.append("(ts > ? OR (ts = ? AND id > ?))")
+            params.extend((after[0], after[0], after[1]))
+        sql = (
+            f"SELECT id, {', '.join(_COLUMNS)} FROM audit_events"
+            + (" WHERE " + " AND ".join(where) if where else "")
+            + " ORDER BY ts, id LIMIT ?"
+        )
+        events: List[Dict[str, Any]] = []
+        last: Optional[Tuple[float, int]] = None
+        for path in self.segments(since, until):
+            conn = sqlite3.connect(path.resolve().as_uri() + "?mode=ro", uri=True)
+            try:
+                rows = conn.execute(sql, params + [limit + 1 - len(events)]).fetchall()
+            finally:
+                conn.close()
+            for row in rows:
+                if len(events) == limit:
+                    return events, _encode_cursor(*last)  # type: ignore[misc]
+                rowid, ts, actor_, action_, resource_, outcome, ip, details = row
+                events.append({
+                    "ts": ts, "actor": actor_, "action": action_, "resource": resource_,
+                    "outcome": outcome, "ip": ip, "details": json.loads(details) if details else None,
+                })
+                last = (ts, rowid)
+        return events, None
+
+    def close(self) -> None:
+        for conn in self._writers.values():
+            conn.close()
+        self._writers.clear()
+
+
+_store: Optional[AuditStore] = None
+
+
+def get_audit_store() -> Optional[AuditStore]:
+    """Store under ``AUDIT_STORE_DIR``, or None when the indexed store is disabled."""
+    global _store
+    root = os.getenv("AUDIT_STORE_DIR", "")
+    if not root:
+        return None
+    if _store is None or _store.root != Path(root):
+        _store = AuditStore(root)
+    return _store
+
+
+def audit_router(get_verifier: Callable[[], Any], *, role: Optional[str] = None, max_limit: int = 1000):
+    """APIRouter exposing ``GET /admin/audit`` for tokens carrying the audit admin role."""
+    from fastapi import APIRouter, Depends, HTTPException, Query
+    from fastapi.concurrency import run_in_threadpool
+
+    from .audit import get_audit_logger
+    from .middleware import require_auth
+
+    required_role = role or os.getenv("AUDIT_ADMIN_ROLE", "admin")
+    router = APIRouter()
+    require_audit_role = require_auth([required_role], verifier=get_verifier)
+
+    @router.get("/admin/audit")
+    async def query_audit(
+        actor: Optional[str] = None,
+        action: Optional[str] = None,
+        resource: Optional[str] = None,
+        since: Optional[datetime] = Query(None, description="ISO 8601 or epoch seconds, inclusive"),
+        until: Optional[datetime] = Query(None, description="ISO 8601 or epoch seconds, exclusive"),
+        limit: int = Query(100, ge=1, le=max_limit),
+        cursor: Optional[str] = None,
+        claims: Dict[str, Any] = Depends(require_audit_role),
+    ):
+        store = get_audit_store()
+        if store is None:
+            raise HTTPException(status_code=404, detail="Audit store not enabled")
+        filters = {"actor": actor, "action": action, "resource": resource}
+        get_audit_logger().log("audit.query", actor=claims.get("sub"),
+                               details={k: v for k, v in filters.items() if v is not None})
+        try:
+            events, next_cursor = await run_in_threadpool(
+                store.query, **filters,
+                since=since.timestamp() if since else None,
+                until=until.timestamp() if until else None,
+                limit=limit, cursor=cursor,
+            )
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=str(e))
+        return {"events": events, "next_cursor": next_cursor}
+
+    return router
+
+
+__all__ = ["AuditStore", "SCHEMA", "segment_month", "get_audit_store", "audit_router"]
@@ -0,0 +1,18 @@
+"""Micro-benchmarks for the per-request security primitives.
+
+Every assistant/literacy request pays for ``JWTVerifier.verify``, ``rbac.check``
+and ``AuditLogger.log``; this suite measures each in isolation (run from the
+repository root):
+
+    python -m services.shared.bench                    # compare to services/shared/bench/baseline.json
+    python -m services.shared.bench --write-baseline   # refresh the baseline after an intentional change
+    python -m services.shared.bench --only verify --iterations 5000
+
+- ``fixtures.py`` – a fresh RSA keypair, signed tokens and an in-process JWKS
+  issuer (``httpx.MockTransport``), so no auth service or network is involved
+- ``harness.py`` – per-call latency and throughput single-threaded and from
+  concurrent asyncio tasks, plus tracemalloc allocations per call
+- ``report.py`` – percentiles and regression checks against the baseline
+
+Exits non-zero when a regression against the baseline is detected.
+"""
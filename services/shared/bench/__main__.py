@@ -0,0 +1,120 @@
+"""Benchmark entry point (run from the repository root).
+
+    python -m services.shared.bench                    # compare to bench/baseline.json
+    python -m services.shared.bench --write-baseline   # refresh the stored baseline
+    python -m services.shared.bench --only rbac --iterations 50000
+
+Exits non-zero when a regression against the baseline is detected.
+"""
+from __future__ import annotations
+import argparse
+import asyncio
+import json
+import platform
+import sys
+import tempfile
+from pathlib import Path
+from typing import Any, Dict, List
+
+from .. import rbac
+from ..audit import AuditLogger
+from .fixtures import LocalIssuer
+from .harness import Case, run_case
+from .report import compare, load_baseline, write_baseline
+
+DEFAULT_BASELINE = Path(__file__).with_name("baseline.json")
+
+
+def _parse_args(argv=None):
+    p = argparse.ArgumentParser(prog="python -m services.shared.bench",
+                                description="Micro-benchmarks for JWT verification, RBAC checks and audit logging")
+    p.add_argument("--iterations", type=int, default=20000, help="Calls per pass")
+    p.add_argument("--cold-tokens", type=int, default=300,
+                   help="Distinct pre-signed tokens for the claims-cache-miss case")
+    p.add_argument("--concurrency", type=int, default=32, help="asyncio tasks in the concurrent pass")
+    p.add_argument("--alloc-iterations", type=int, default=2000, help="Calls traced by tracemalloc")
+    p.add_argument("--only", action="append", help="Run cases whose name starts with this (repeatable)")
+    p.add_argument("--baseline", type=Path, default=DEFAULT_BASELINE)
+    p.add_argument("--write-baseline", action="store_true")
+    p.add_argument("--tolerance", type=float, default=0.5, help="Relative slack before flagging a regression")
+    p.add_argument("--min-delta-us", type=float, default=2.0,
+                   help="Absolute latency slack so timer noise on microsecond calls does not flap")
+    p.add_argument("--output", type=Path, help="Write the JSON summary here as well")
+    return p.parse_args(argv)
+
+
+def build_cases(args, issuer: LocalIssuer, audit: AuditLogger) -> List[Case]:
+    cached = issuer.verifier()
+    token = issuer.token()
+    cold = issuer.verifier()
+    cold_tokens = issuer.tokens(args.cold_tokens)
+    provider, patient = {"role": "provider", "sub": "u1"}, {"role": "patient", "sub": "u2"}
+
+    def rbac_denied(_i: int) -> None:
+        try:
+            rbac.check("assist.plan", patient)
+        except rbac.RBACError:
+            pass
+
+    return [
+        Case("verify.cached", lambda _i: cached.verify(token), is_async=True),
+        Case("verify.cold", lambda i: cold.verify(cold_tokens[i]), is_async=True,
+             iterations=len(cold_tokens), reset=cold.claims_cache.clear),
+        Case("rbac.check.allowed", lambda _i: rbac.check("assist.summary", provider)),
+        Case("rbac.check.denied", rbac_denied),
+        Case("audit.log", lambda _i: audit.log("assist.summary", actor="u1", resource="patient:p1",
+                                                details={"route": "/v1/assist/summary"})),
+    ]
+
+
+async def _run(args, cases: List[Case]) -> Dict[str, Any]:
+    results = {}
+    for case in cases:
+        if args.only and not any(case.name.startswith(prefix) for prefix in args.only):
+            continue
+        results[case.name] = await run_case(case, args.iterations, args.concurrency, args.alloc_iterations)
+        print(f"{case.name}: {json.dumps(results[case.name]['single'])}", file=sys.stderr)
+    return results
+
+
+def main(argv=None) -> int:
+    args = _parse_args(argv)
+    issuer = LocalIssuer()
+    with tempfile.TemporaryDirectory() as tmp:
+        audit = AuditLogger(str(Path(tmp) / "audit.log"), fsync="never")
+        try:
+            benchmarks = asyncio.run(_run(args, build_cases(args, issuer, audit)))
+        finally:
+            audit.shutdown()
+    summary = {
+        "benchmarks": benchmarks,
+        "meta": {
+            "python": platform.python_version(),
+            "machine": platform.machine(),
+            "iterations": args.iterations,
+            "cold_tokens": args.cold_tokens,
+            "concurrency": args.concurrency,
+            "alloc_iterations": args.alloc_iterations,
+        },
+    }
+    print(json.dumps(summary, indent=2))
+    if args.output:
+        args.output.write_text(json.dumps(summary, indent=2), encoding="utf-8")
+    if args.write_baseline:
+        write_baseline(args.baseline, summary)
+        print(f"baseline written to {args.baseline}", file=sys.stderr)
+        return 0
+    baseline = load_baseline(args.baseline)
+    if baseline is None:
+        print("no baseline found; run with --write-baseline", file=sys.stderr)
+        return 0
+    if baseline.get("meta", {}).get("python") != summary["meta"]["python"]:
+        print("warning: baseline was recorded on a different Python version", file=sys.stderr)
+    problems = compare(summary, baseline, tolerance=args.tolerance, min_delta_us=args.min_delta_us)
+    for line in problems:
+        print(f"REGRESSION {line}", file=sys.stderr)
+    return 1 if problems else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,57 @@
+"""Local issuer for benchmarks: RSA keypair, tokens and an in-process JWKS endpoint."""
+from __future__ import annotations
+import time
+from typing import Any, Dict, List
+
+import httpx
+import rsa
+from jose import jwk, jwt
+
+from ..jwks import JWKSClient, KeyRing
+from ..jwt_rs256 import JWTVerifier, VerifierSettings
+
+ISSUER = "webqx.bench"
+AUDIENCE = "webqx.emr"
+JWKS_URL = "https://issuer.bench/.well-known/jwks.json"
+
+
+class LocalIssuer:
+    """Signs RS256 tokens and serves the matching JWKS without a network."""
+
+    def __init__(self, kid: str = "bench-1", bits: int = 2048):
+        public, private = rsa.newkeys(bits)
+        self.kid = kid
+        self.private_pem = private.save_pkcs1()
+        self.public_jwk = jwk.construct(public.save_pkcs1(), "RS256").to_dict()
+        self.public_jwk.update(kid=kid, alg="RS256", use="sig")
+        self.jwks_requests = 0
+
+    def _handle(self, request: httpx.Request) -> httpx.Response:
+        self.jwks_requests += 1
+        return httpx.Response(200, json={"keys": [self.public_jwk]}, headers={"Cache-Control": "max-age=3600"})
+
+    def transport(self) -> httpx.MockTransport:
+        return httpx.MockTransport(self._handle)
+
+    def token(self, **claims: Any) -> str:
+        body: Dict[str, Any] = {
+            "sub": "bench-user", "role": "provider", "iss": ISSUER, "aud": AUDIENCE,
+            "exp": int(time.time()) + 3600, **claims,
+        }
+        body = {k: v for k, v in body.items() if v is not None}  # exp=None: a token without expiry
+        return "Bearer " + jwt.encode(body, self.private_pem, algorithm="RS256", headers={"kid": self.kid})
+
+    def tokens(self, count: int) -> List[str]:
+        """``count`` distinct tokens (a unique ``jti`` each), for claims-cache misses."""
+        return [self.token(jti=f"bench-{i}") for i in range(count)]
+
+    def verifier(self, claims_cache_size: int = 1024) -> JWTVerifier:
+        verifier = JWTVerifier(VerifierSettings(
+            jwks_url=JWKS_URL, issuer=ISSUER, audience=AUDIENCE, claims_cache_size=claims_cache_size,
+        ))
+        verifier.jwks = JWKSClient(JWKS_URL, client=httpx.AsyncClient(transport=self.transport()))
+        verifier.keyring = KeyRing(verifier.jwks)
+        return verifier
+
+
+__all__ = ["LocalIssuer", "ISSUER", "AUDIENCE", "JWKS_URL"]
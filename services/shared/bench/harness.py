@@ -0,0 +1,105 @@
+"""Timing and allocation passes over benchmark cases."""
+from __future__ import annotations
+import asyncio
+import gc
+import time
+import tracemalloc
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from .report import distribution
+
+
+@dataclass
+class Case:
+    """One primitive under test. ``call(i)`` performs call number ``i`` (awaited when ``is_async``)."""
+
+    name: str
+    call: Callable[[int], Any]
+    is_async: bool = False
+    iterations: Optional[int] = None  # cap, e.g. the number of pre-signed tokens
+    reset: Optional[Callable[[], None]] = None  # run before every pass (e.g. clear a cache)
+
+
+async def _invoke(case: Case, i: int) -> None:
+    if case.is_async:
+        await case.call(i)
+    else:
+        case.call(i)
+
+
+async def _single(case: Case, n: int) -> Tuple[List[int], float]:
+    latencies = []
+    clock = time.perf_counter_ns
+    started = clock()
+    for i in range(n):
+        t0 = clock()
+        await _invoke(case, i)
+        latencies.append(clock() - t0)
+    return latencies, (clock() - started) / 1e9
+
+
+async def _concurrent(case: Case, n: int, concurrency: int) -> Tuple[List[int], float]:
+    """``concurrency`` tasks share ``n`` calls and yield between them, like request handlers."""
+    latencies: List[int] = []
+    clock = time.perf_counter_ns
+
+    async def worker(offset: int) -> None:
+        for i in range(offset, n, concurrency):
+            t0 = clock()
+            await _invoke(case, i)
+            latencies.append(clock() - t0)
+            await asyncio.sleep(0)
+
+    started = clock()
+    await asyncio.gather(*(worker(k) for k in range(concurrency)))
+    return latencies, (clock() - started) / 1e9
+
+
+async def _allocations(case: Case, n: int) -> Dict[str, float]:
+    """Mean transient peak and net retained bytes per call under tracemalloc."""
+    tracemalloc.start()
+    try:
+        base = tracemalloc.get_traced_memory()[0]
+        peak_total = 0
+        for i in range(n):
+            tracemalloc.reset_peak()
+            current = tracemalloc.get_traced_memory()[0]
+            await _invoke(case, i)
+            peak_total += tracemalloc.get_traced_memory()[1] - current
+        retained = tracemalloc.get_traced_memory()[0] - base
+    finally:
+        tracemalloc.stop()
+    return {
+        "peak_bytes_per_call": round(peak_total / n, 1),
+        "retained_bytes_per_call": round(retained / n, 1),
+    }
+
+
+def _summary(latencies: List[int], wall: float) -> Dict[str, Any]:
+    return {
+        "calls": len(latencies),
+        "ops_per_sec": round(len(latencies) / wall, 1) if wall else 0.0,
+        "latency_us": distribution([ns / 1000.0 for ns in latencies]),
+    }
+
+
+async def run_case(case: Case, iterations: int, concurrency: int, alloc_iterations: int,
+                   warmup: int = 200) -> Dict[str, Any]:
+    n = min(iterations, case.iterations or iterations)
+    results: Dict[str, Any] = {}
+
+    async def _pass(runner, *args):
+        if case.reset is not None:
+            case.reset()
+        gc.collect()
+        return await runner(case, *args)
+
+    await _pass(_single, min(warmup, n))  # JWKS fetch, key import, policy compile
+    results["single"] = _summary(*await _pass(_single, n))
+    results["concurrent"] = {"tasks": concurrency, **_summary(*await _pass(_concurrent, n, concurrency))}
+    results["allocations"] = await _pass(_allocations, min(alloc_iterations, n))
+    return results
+
+
+__all__ = ["Case", "run_case"]
@@ -0,0 +1,64 @@
+"""Percentiles and baseline comparison for micro-benchmark runs."""
+from __future__ import annotations
+import json
+import math
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+PERCENTILES = (50, 95, 99)
+
+
+def percentile(values: List[float], p: float) -> float:
+    """Nearest-rank percentile (stable for small sample counts)."""
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    rank = max(1, math.ceil(p / 100.0 * len(ordered)))
+    return ordered[rank - 1]
+
+
+def distribution(values: List[float]) -> Dict[str, float]:
+    return {f"p{p}": round(percentile(values, p), 3) for p in PERCENTILES}
+
+
+def compare(current: Dict[str, Any], baseline: Dict[str, Any], tolerance: float = 0.5,
+            min_delta_us: float = 2.0, min_delta_bytes: float = 256.0) -> List[str]:
+    """Return human-readable regressions of ``current`` against ``baseline``.
+
+    Latency percentiles regress when they exceed baseline by more than ``tolerance``
+    (relative) *and* ``min_delta_us`` (absolute, so timer noise on microsecond calls
+    doesn't flap); throughput when it drops by more than ``tolerance``; allocations
+    when bytes per call grow by more than ``tolerance`` and ``min_delta_bytes``.
+    """
+    problems: List[str] = []
+    for name, base_case in (baseline.get("benchmarks") or {}).items():
+        cur_case = (current.get("benchmarks") or {}).get(name)
+        if cur_case is None:
+            continue
+        for mode in ("single", "concurrent"):
+            base, cur = base_case.get(mode) or {}, cur_case.get(mode) or {}
+            for key, b in (base.get("latency_us") or {}).items():
+                c = (cur.get("latency_us") or {}).get(key)
+                if c is not None and c > b * (1 + tolerance) and c - b > min_delta_us:
+                    problems.append(f"{name} {mode} {key}: {c:.1f}us > baseline {b:.1f}us")
+            b, c = base.get("ops_per_sec"), cur.get("ops_per_sec")
+            if b and c is not None and c < b * (1 - tolerance):
+                problems.append(f"{name} {mode} ops_per_sec: {c:.0f} < baseline {b:.0f}")
+        for key, b in (base_case.get("allocations") or {}).items():
+            c = (cur_case.get("allocations") or {}).get(key)
+            if c is not None and c > b * (1 + tolerance) and c - b > min_delta_bytes:
+                problems.append(f"{name} {key}: {c:.0f}B > baseline {b:.0f}B")
+    return problems
+
+
+def load_baseline(path: Path) -> Optional[Dict[str, Any]]:
+    if not path.exists():
+        return None
+    return json.loads(path.read_text(encoding="utf-8"))
+
+
+def write_baseline(path: Path, summary: Dict[str, Any]) -> None:
+    path.write_text(json.dumps(summary, indent=2, sort_keys=True) + "\n", encoding="utf-8")
+
+
+__all__ = ["percentile", "distribution", "compare", "load_baseline", "write_baseline"]
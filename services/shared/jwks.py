@@ -0,0 +1,226 @@
+"""JWKS retrieval with single-flight refresh and stale-while-revalidate.
+
+One ``JWKSClient`` per issuer holds the current key set and a long-lived,
+pooled ``httpx.AsyncClient``:
+
+- fresh (within the issuer's Cache-Control ``max-age``, else ``ttl``): served from memory
+- expired but no older than ``max_stale``: served as-is while one background refresh runs
+- never fetched, or older than that: callers await the single in-flight fetch
+
+Refreshes are conditional (``If-None-Match`` / ``If-Modified-Since``); a 304
+only extends the current set. While the issuer is failing, attempts back off
+exponentially (up to ``backoff_max`` seconds) and the last good set keeps being
+served until ``max_stale`` runs out; after that ``get`` raises
+``JWKSUnavailable`` instead of queueing requests behind a dead issuer.
+
+``KeyRing`` sits on top and hands out pre-built public key objects by ``kid``.
+"""
+from __future__ import annotations
+import asyncio
+import logging
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Mapping, Optional, Tuple
+
+import httpx
+from jose import jwk
+
+from .tracing import CLIENT, inject, span
+
+logger = logging.getLogger("webqx.jwks")
+
+
+class JWKSUnavailable(Exception):
+    pass
+
+
+class UnknownKid(Exception):
+    pass
+
+
+def cache_lifetime(headers: Mapping[str, str], default: int, min_ttl: int, max_ttl: int) -> int:
+    """Seconds a JWKS response may be reused: Cache-Control ``max-age`` minus ``Age``, clamped."""
+    directives: Dict[str, str] = {}
+    for part in headers.get("cache-control", "").split(","):
+        name, _, value = part.strip().partition("=")
+        if name:
+            directives[name.lower()] = value.strip('" ')
+    if "no-store" in directives or "no-cache" in directives:
+        return min_ttl  # keys are still needed to verify; revalidate as often as we allow
+    try:
+        ttl = int(directives["max-age"]) - int(headers.get("age", "0"))
+    except (KeyError, ValueError):
+        return default
+    return max(min_ttl, min(ttl, max_ttl))
+
+
+class JWKSClient:
+    def __init__(
+        self,
+        url: str,
+        ttl: int = 300,
+        max_stale: int = 3600,
+        timeout: float = 5.0,
+        min_ttl: int = 30,
+        max_ttl: int = 86400,
+        backoff_max: float = 60.0,
+        client: Optional[httpx.AsyncClient] = None,
+    ):
+        self.url = url
+        self.ttl = ttl
+        self.max_stale = max_stale
+        self.timeout = timeout
+        self.min_ttl = min_ttl
+        self.max_ttl = max_ttl
+        self.backoff_max = backoff_max
+        self.fetches = 0
+        self.version = 0  # bumped whenever the key set changes (rotation)
+        self._data: Optional[Dict[str, Any]] = None
+        self._expires_at = 0.0
+        self._etag: Optional[str] = None
+        self._last_modified: Optional[str] = None
+        self._failures = 0
+        self._retry_at = 0.0
+        self._inflight: Optional["asyncio.Task[Dict[str, Any]]"] = None
+        self._client = client
+        self._owns_client = client is None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+
+    def _http(self) -> httpx.AsyncClient:
+        # Pooled connections belong to the loop that opened them
+        loop = asyncio.get_running_loop()
+        if self._client is None or (self._owns_client and self._loop is not loop):
+            self._client = httpx.AsyncClient(
+                timeout=self.timeout,
+                limits=httpx.Limits(max_connections=4, max_keepalive_connections=2),
+            )
+            self._loop = loop
+        return self._client
+
+    async def get(self) -> Dict[str, Any]:
+        now = time.monotonic()
+        if self._data is not None:
+            if now < self._expires_at:
+                return self._data
+            if now < self._expires_at + self.max_stale:
+                if now >= self._retry_at:
+                    self._start_refresh()
+                return self._data
+        if now < self._retry_at:
+            raise JWKSUnavailable("JWKS issuer unavailable; retrying shortly")
+        return await self.refresh()
+
+    async def refresh(self) -> Dict[str, Any]:
+        """Fetch now, joining a fetch already in flight."""
+        try:
+            # shield: a cancelled request must not cancel the fetch others are awaiting
+            return await asyncio.shield(self._start_refresh())
+        except Exception as e:
+            raise JWKSUnavailable(f"Unable to fetch JWKS: {e}") from e
+
+    def _start_refresh(self) -> "asyncio.Task[Dict[str, Any]]":
+        task = self._inflight
+        if task is None or task.done() or task.get_loop() is not asyncio.get_running_loop():
+            task = self._inflight = asyncio.ensure_future(self._refresh())
+            task.add_done_callback(lambda t: t.cancelled() or t.exception())  # background failures are logged
+        return task
+
+    async def _refresh(self) -> Dict[str, Any]:
+        headers = {}
+        if self._data is not None:
+            if self._etag:
+                headers["If-None-Match"] = self._etag
+            if self._last_modified:
+                headers["If-Modified-Since"] = self._last_modified
+        self.fetches += 1
+        try:
+            with span("jwks.fetch", {"http.url": self.url}, kind=CLIENT) as s:
+                r = await self._http().get(self.url, headers=inject(headers))
+                s.set_attribute("http.status_code", r.status_code)
+                if r.status_code == 304 and self._data is not None:
+                    data = self._data
+                else:
+                    r.raise_for_status()
+                    data = r.json()
+                    if not isinstance(data, dict) or not isinstance(data.get("keys"), list):
+                        raise ValueError("Malformed JWKS document")
+                    self._etag = r.headers.get("etag")
+                    self._last_modified = r.headers.get("last-modified")
+        except Exception as e:
+            self._failures += 1
+            self._retry_at = time.monotonic() + min(self.backoff_max, 2.0 ** (self._failures - 1))
+            logger.warning("JWKS fetch from %s failed (%d in a row): %s", self.url, self._failures, e)
+            raise
+        if data != self._data:
+            self.version += 1
+        self._data = data
+        self._expires_at = time.monotonic() + cache_lifetime(r.headers, self.ttl, self.min_ttl, self.max_ttl)
+        self._failures = 0
+        self._retry_at = 0.0
+        return data
+
+    async def aclose(self) -> None:
+        client, self._client = self._client, None
+        if self._owns_client and client is not None and self._loop is asyncio.get_running_loop():
+            await client.aclose()
+
+
+class KeyRing:
+    """Public key objects from a ``JWKSClient``, indexed by ``kid`` and rebuilt on rotation.
+
+    A ``kid`` missing from the current set forces a refresh at most once every
+    ``refresh_interval`` seconds; a kid still unknown afterwards is remembered
+    for ``negative_ttl`` seconds, so junk tokens cannot drive JWKS fetches.
+    """
+
+    def __init__(self, client: JWKSClient, refresh_interval: float = 30.0, negative_ttl: float = 60.0,
+                 max_negative: int = 1024):
+        self.client = client
+        self.refresh_interval = refresh_interval
+        self.negative_ttl = negative_ttl
+        self.max_negative = max_negative
+        self._keys: Dict[Optional[str], Tuple[str, Any]] = {}
+        self._version = -1
+        self._negative: "OrderedDict[Optional[str], float]" = OrderedDict()
+        self._last_forced = float("-inf")
+
+    def _index(self, data: Dict[str, Any]) -> None:
+        if self.client.version == self._version:
+            return
+        keys: Dict[Optional[str], Tuple[str, Any]] = {}
+        for k in data.get("keys", []):
+            alg = k.get("alg", "RS256")
+            try:
+                keys[k.get("kid")] = (alg, jwk.construct(k, alg))
+            except Exception as e:
+                logger.warning("Skipping unusable JWK %r: %s", k.get("kid"), e)
+        self._keys = keys
+        self._version = self.client.version
+        self._negative.clear()
+
+    async def get(self, kid: Optional[str]) -> Tuple[str, Any]:
+        """``(alg, key)`` for ``kid``; raises ``UnknownKid``."""
+        self._index(await self.client.get())
+        found = self._keys.get(kid)
+        if found is not None:
+            return found
+        now = time.monotonic()
+        if self._negative.get(kid, 0.0) > now:
+            raise UnknownKid(kid)
+        if now - self._last_forced >= self.refresh_interval:
+            self._last_forced = now
+            try:
+                self._index(await self.client.refresh())
+            except JWKSUnavailable as e:
+                logger.warning("JWKS refresh for unknown kid %r failed: %s", kid, e)
+            found = self._keys.get(kid)
+            if found is not None:
+                return found
+        self._negative[kid] = now + self.negative_ttl
+        self._negative.move_to_end(kid)
+        while len(self._negative) > self.max_negative:
+            self._negative.popitem(last=False)
+        raise UnknownKid(kid)
+
+
+__all__ = ["JWKSClient", "JWKSUnavailable", "KeyRing", "UnknownKid", "cache_lifetime"]
@@ -1,4 +1,10 @@
-"""Shared RS256 JWT verification with JWKS caching.
+"""Shared RS256 JWT verification with JWKS caching (see ``jwks.JWKSClient``).
+
+Verified claims are kept in a bounded LRU keyed on the SHA-256 of the token,
+until shortly before the token stops being acceptable (``exp`` + leeway), so a
+token reused for its whole lifetime pays the RSA check once. The cache is
+cleared whenever the JWKS key set changes.
+
 Usage (FastAPI):
 
 from services.shared.jwt_rs256 import JWTVerifier, VerifierSettings
@@ -9,73 +15,121 @@ async def dependency(claims=Depends(verifier.verify)):
     return claims
 """
 from __future__ import annotations
+import hashlib
 import time
+from collections import OrderedDict
 from dataclasses import dataclass
 from typing import Any, Dict, Optional
 
-import httpx
 from jose import jwt
 
+from .jwks import JWKSClient, JWKSUnavailable, KeyRing, UnknownKid
+
 @dataclass
 class VerifierSettings:
     jwks_url: str
     issuer: str
     audience: str
-    cache_ttl: int = 300
+    cache_ttl: int = 300  # used when the issuer sends no Cache-Control max-age
+    max_stale: int = 3600  # how long the last good key set is served while the issuer is down
+    fetch_timeout: float = 5.0
+    leeway: int = 0  # seconds of clock skew tolerated on exp/nbf/iat
+    claims_cache_size: int = 1024  # 0 disables the verified-claims cache
+
+# Cached claims are dropped this many seconds before the token would be rejected
+CLAIMS_EXPIRY_MARGIN = 5.0
+
+class ClaimsCache:
+    """LRU of verified claims with a per-entry deadline (wall clock)."""
+
+    def __init__(self, maxsize: int = 1024):
+        self.maxsize = maxsize
+        self._entries: "OrderedDict[bytes, tuple[float, Dict[str, Any]]]" = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
 
-class JWKSCache:
-    def __init__(self):
-        self._data: Optional[Dict[str, Any]] = None
-        self._fetched_at: float = 0.0
+    def get(self, digest: bytes) -> Optional[Dict[str, Any]]:
+        entry = self._entries.get(digest)
+        if entry is not None:
+            if entry[0] > time.time():
+                self._entries.move_to_end(digest)
+                self.hits += 1
+                return entry[1]
+            del self._entries[digest]
+        self.misses += 1
+        return None
 
-    def get(self) -> Optional[Dict[str, Any]]:
-        return self._data
+    def put(self, digest: bytes, claims: Dict[str, Any], until: float) -> None:
+        if self.maxsize <= 0:
+            return
+        self._entries[digest] = (until, claims)
+        self._entries.move_to_end(digest)
+        while len(self._entries) > self.maxsize:
+            self._entries.popitem(last=False)
+            self.evictions += 1
 
-    def set(self, data: Dict[str, Any]):
-        self._data = data
-        self._fetched_at = time.time()
+    def clear(self) -> None:
+        self._entries.clear()
 
-    def is_fresh(self, ttl: int) -> bool:
-        return self._data is not None and (time.time() - self._fetched_at) < ttl
+    def stats(self) -> Dict[str, int]:
+        return {"hits": self.hits, "misses": self.misses, "evictions": self.evictions, "size": len(self._entries)}
 
 class JWTVerifier:
     def __init__(self, settings: VerifierSettings):
         self.settings = settings
-        self.cache = JWKSCache()
-
-    async def _fetch_jwks(self) -> Dict[str, Any]:  # pragma: no cover
-        async with httpx.AsyncClient(timeout=5.0) as client:
-            r = await client.get(self.settings.jwks_url)
-            r.raise_for_status()
-            return r.json()
+        self.claims_cache = ClaimsCache(settings.claims_cache_size)
+        self._claims_version = 0
+        self.jwks = JWKSClient(
+            settings.jwks_url,
+            ttl=settings.cache_ttl,
+            max_stale=settings.max_stale,
+            timeout=settings.fetch_timeout,
+        )
+        self.keyring = KeyRing(self.jwks)
 
     async def _get_jwks(self) -> Dict[str, Any]:
-        if self.cache.is_fresh(self.settings.cache_ttl):
-            return self.cache.get()  # type: ignore
-        data = await self._fetch_jwks()
-        self.cache.set(data)
-        return data
+        return await self.jwks.get()
 
     async def verify(self, authorization: Optional[str]) -> Dict[str, Any]:
         if not authorization or not authorization.lower().startswith("bearer "):
             raise ValueError("Missing bearer token")
         token = authorization.split(" ", 1)[1].strip()
-        jwks = await self._get_jwks()
-        headers = jwt.get_unverified_header(token)
-        kid = headers.get("kid")
-        key = next((k for k in jwks.get("keys", []) if k.get("kid") == kid), None)
-        if not key:
+        await self._get_jwks()
+        if self.jwks.version != self._claims_version:  # key rotation: re-verify everything
+            self.claims_cache.clear()
+            self._claims_version = self.jwks.version
+        digest = hashlib.sha256(token.encode()).digest()
+        cached = self.claims_cache.get(digest)
+        if cached is not None:
+            return dict(cached)
+        try:
+            kid = jwt.get_unverified_header(token).get("kid")
+        except Exception as e:
+            raise ValueError(f"Invalid token: {e}")
+        try:
+            alg, key = await self.keyring.get(kid)
+        except UnknownKid:
             raise ValueError("Signing key not found")
         try:
             claims = jwt.decode(
                 token,
                 key,
-                algorithms=[key.get("alg", "RS256")],
+                algorithms=[alg],
                 audience=self.settings.audience,
                 issuer=self.settings.issuer,
+                options={"leeway": self.settings.leeway},
             )
         except Exception as e:  # pragma: no cover
             raise ValueError(f"Invalid token: {e}")
-        return claims
+        exp = claims.get("exp")
+        if isinstance(exp, (int, float)):
+            until = exp + self.settings.leeway - CLAIMS_EXPIRY_MARGIN
+            if until > time.time():
+                self.claims_cache.put(digest, claims, until)
+        return dict(claims)
+
+    def cache_stats(self) -> Dict[str, int]:
+        return self.claims_cache.stats()
 
-__all__ = ["VerifierSettings", "JWTVerifier"]
+__all__ = ["VerifierSettings", "JWTVerifier", "ClaimsCache", "JWKSUnavailable"]
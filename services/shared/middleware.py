@@ -0,0 +1,177 @@
+"""Request instrumentation and bearer-auth scaffolding for the FastAPI services.
+
+Usage (FastAPI):
+
+from services.shared.middleware import instrument, get_verifier, require_auth
+app = FastAPI(...)
+instrument(app)                                   # metrics middleware + GET /metrics
+verify_auth = require_auth({"patient", "provider"})  # or require_auth() for any role
+
+``RequestMetricsMiddleware`` is plain ASGI. Per request it keeps
+``http_requests_in_flight`` and records ``http_requests_total`` and
+``http_request_duration_seconds`` by route template (not raw path, so ids in
+URLs do not explode label cardinality), and adds a ``Server-Timing`` header
+with the JWT, RBAC and audit stages recorded through ``metrics.record`` plus
+the total. Route templates are resolved once per (method, path) and cached.
+
+With ``TRACE_EXPORTER`` set, ``instrument`` also adds ``tracing.TracingMiddleware``
+so each request is a server span and the same stages are child spans.
+"""
+from __future__ import annotations
+import os
+import time
+from typing import Any, Callable, Dict, Iterable, Optional, Tuple
+
+from .jwt_rs256 import JWTVerifier, VerifierSettings, JWKSUnavailable
+from .metrics import (
+    REGISTRY, CONTENT_TYPE_LATEST, DEFAULT_BUCKETS, Counter, Gauge, Histogram, _TIMINGS, render_latest, timed,
+)
+from .tracing import TracingMiddleware, configure as configure_tracing, span
+
+REQUESTS: Counter = REGISTRY.register(  # type: ignore[assignment]
+    Counter("http_requests_total", "Completed HTTP requests.", ["route", "method", "status"])
+)
+DURATION: Histogram = REGISTRY.register(  # type: ignore[assignment]
+    Histogram("http_request_duration_seconds", "HTTP request latency in seconds.", ["route", "method"], DEFAULT_BUCKETS)
+)
+IN_FLIGHT: Gauge = REGISTRY.register(  # type: ignore[assignment]
+    Gauge("http_requests_in_flight", "HTTP requests currently being handled.", ["route"])
+)
+
+_ROUTE_CACHE_SIZE = 1024
+
+
+def server_timing(timings: Dict[str, float], total: float) -> str:
+    parts = [f"{stage};dur={seconds * 1000:.3f}" for stage, seconds in timings.items()]
+    parts.append(f"total;dur={total * 1000:.3f}")
+    return ", ".join(parts)
+
+
+class RequestMetricsMiddleware:
+    def __init__(self, app: Any, router: Any = None, server_timing: bool = True):
+        self.app = app
+        self.router = router
+        self.server_timing = server_timing
+        self._routes: Dict[Tuple[str, str], str] = {}
+
+    def _route(self, scope: Dict[str, Any]) -> str:
+        key = (scope["method"], scope["path"])
+        name = self._routes.get(key)
+        if name is None:
+            from starlette.routing import Match
+
+            name = "unmatched"
+            for route in getattr(self.router, "routes", ()):
+                match, _ = route.matches(scope)
+                if match == Match.FULL:
+                    name = getattr(route, "path", name)
+                    break
+            if len(self._routes) >= _ROUTE_CACHE_SIZE:
+                self._routes.clear()
+            self._routes[key] = name
+        return name
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        started = time.perf_counter()
+        route = self._route(scope)
+        timings: Dict[str, float] = {}
+        token = _TIMINGS.set(timings)
+        status = 500
+
+        async def send_wrapper(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+                if self.server_timing:
+                    header = server_timing(timings, time.perf_counter() - started).encode("latin-1")
+                    message = {**message, "headers": [*message.get("headers", ()), (b"server-timing", header)]}
+            await send(message)
+
+        IN_FLIGHT.inc(route=route)
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            IN_FLIGHT.dec(route=route)
+            DURATION.observe(time.perf_counter() - started, route=route, method=scope["method"])
+            REQUESTS.inc(route=route, method=scope["method"], status=str(status))
+            _TIMINGS.reset(token)
+
+
+def metrics_router(path: str = "/metrics"):
+    from fastapi import APIRouter
+    from fastapi.responses import Response
+
+    router = APIRouter()
+
+    @router.get(path, include_in_schema=False)
+    async def metrics():
+        return Response(render_latest(), media_type=CONTENT_TYPE_LATEST)
+
+    return router
+
+
+def instrument(app: Any, *, metrics_path: str = "/metrics", server_timing: bool = True) -> Any:
+    """Mount ``RequestMetricsMiddleware``, the Prometheus endpoint and (when ``TRACE_EXPORTER``
+    is set) ``TracingMiddleware`` on ``app``."""
+    app.add_middleware(RequestMetricsMiddleware, router=app.router, server_timing=server_timing)
+    if configure_tracing(os.getenv("TRACE_SERVICE_NAME", app.title)) is not None:
+        app.add_middleware(TracingMiddleware)
+    app.include_router(metrics_router(metrics_path))
+    return app
+
+
+_verifier: Optional[JWTVerifier] = None
+
+
+def get_verifier() -> JWTVerifier:
+    global _verifier
+    if _verifier is None:
+        # Prefer new short alias path /auth/.well-known/jwks.json; fallback keeps backward compatibility
+        settings = VerifierSettings(
+            jwks_url=os.getenv("JWT_JWKS_URL", os.getenv("JWT_JWKS_FALLBACK", "http://localhost:8000/auth/.well-known/jwks.json")),
+            issuer=os.getenv("JWT_ISSUER", "webqx.healthcare"),
+            audience=os.getenv("JWT_AUDIENCE", "webqx.emr"),
+            leeway=int(os.getenv("JWT_LEEWAY", "0")),
+            claims_cache_size=int(os.getenv("JWT_CLAIMS_CACHE_SIZE", "1024")),
+        )
+        _verifier = JWTVerifier(settings)
+    return _verifier
+
+
+def require_auth(
+    roles: Optional[Iterable[str]] = None, *, verifier: Callable[[], JWTVerifier] = get_verifier
+) -> Callable[..., Any]:
+    """FastAPI dependency: verified claims carrying a ``role`` (one of ``roles`` when given)."""
+    from fastapi import Header, HTTPException
+
+    allowed = frozenset(roles) if roles is not None else None
+
+    async def verify_auth(authorization: Optional[str] = Header(None)) -> Dict[str, Any]:
+        try:
+            with timed("jwt"), span("jwt.verify"):
+                claims = await verifier().verify(authorization)
+        except ValueError as e:
+            raise HTTPException(status_code=401, detail=str(e))
+        except JWKSUnavailable as e:
+            raise HTTPException(status_code=503, detail=str(e))
+        if "role" not in claims:
+            raise HTTPException(status_code=403, detail="Missing role claim")
+        role = claims.get("role")
+        if allowed is not None and (not isinstance(role, str) or role not in allowed):
+            raise HTTPException(status_code=403, detail="Insufficient role")
+        return claims
+
+    return verify_auth
+
+
+__all__ = [
+    "RequestMetricsMiddleware",
+    "metrics_router",
+    "instrument",
+    "server_timing",
+    "get_verifier",
+    "require_auth",
+]
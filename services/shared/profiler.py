@@ -0,0 +1,148 @@
+"""On-demand sampling profiler for FastAPI services.
+
+Samples the Python stack of every thread at a fixed interval for N seconds and
+renders the aggregate as collapsed stacks (flamegraph.pl / speedscope import)
+or speedscope JSON. Only one profile runs per process at a time.
+
+Usage (FastAPI):
+
+from services.shared.profiler import profile_router
+app.include_router(profile_router(get_verifier))
+
+    GET /debug/profile?seconds=10&format=speedscope&interval_ms=10
+
+The route verifies the bearer token itself and requires ``role == PROFILER_ROLE``
+(default ``admin``), independent of the service's own role rules.
+"""
+from __future__ import annotations
+import os
+import sys
+import threading
+import time
+from collections import Counter
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+Frame = Tuple[str, str, int]  # (function, file, first line)
+Samples = Dict[str, "Counter[Tuple[Frame, ...]]"]
+
+_RUNNING = threading.Lock()
+
+
+class ProfilerBusy(Exception):
+    pass
+
+
+def sample(seconds: float, interval: float = 0.01) -> Samples:
+    """Blocking: sample all other threads' stacks for ``seconds``; returns counts per thread name."""
+    if not _RUNNING.acquire(blocking=False):
+        raise ProfilerBusy("A profile is already running")
+    try:
+        me = threading.get_ident()
+        labels: Dict[Any, Frame] = {}
+        samples: Samples = {}
+        deadline = time.perf_counter() + seconds
+        while time.perf_counter() < deadline:
+            names = {t.ident: t.name for t in threading.enumerate()}
+            for tid, frame in sys._current_frames().items():
+                if tid == me:
+                    continue
+                stack: List[Frame] = []
+                while frame is not None:
+                    code = frame.f_code
+                    label = labels.get(code)
+                    if label is None:
+                        label = labels[code] = (code.co_name, code.co_filename, code.co_firstlineno)
+                    stack.append(label)
+                    frame = frame.f_back
+                stack.reverse()
+                samples.setdefault(names.get(tid, f"thread-{tid}"), Counter())[tuple(stack)] += 1
+            time.sleep(interval)
+        return samples
+    finally:
+        _RUNNING.release()
+
+
+def _frame_name(frame: Frame) -> str:
+    name, filename, line = frame
+    return f"{name} ({os.path.basename(filename)}:{line})"
+
+
+def render_collapsed(samples: Samples) -> str:
+    """``thread;outer;...;inner count`` per line."""
+    lines = []
+    for thread, stacks in samples.items():
+        for stack, count in stacks.most_common():
+            path = ";".join([thread] + [_frame_name(f).replace(";", ":") for f in stack])
+            lines.append(f"{path} {count}")
+    return "\n".join(lines) + "\n"
+
+
+def render_speedscope(samples: Samples, interval: float, name: str = "profile") -> Dict[str, Any]:
+    """Speedscope file format: one sampled profile per thread over shared frames."""
+    frames: List[Dict[str, Any]] = []
+    index: Dict[Frame, int] = {}
+    profiles = []
+    for thread, stacks in samples.items():
+        stack_ids: List[List[int]] = []
+        weights: List[float] = []
+        for stack, count in stacks.items():
+            ids = []
+            for f in stack:
+                if f not in index:
+                    index[f] = len(frames)
+                    frames.append({"name": f[0], "file": f[1], "line": f[2]})
+                ids.append(index[f])
+            stack_ids.append(ids)
+            weights.append(count * interval)
+        profiles.append({
+            "type": "sampled",
+            "name": thread,
+            "unit": "seconds",
+            "startValue": 0,
+            "endValue": sum(weights),
+            "samples": stack_ids,
+            "weights": weights,
+        })
+    return {
+        "$schema": "https://www.speedscope.app/file-format-schema.json",
+        "name": name,
+        "exporter": "webqx-profiler",
+        "shared": {"frames": frames},
+        "profiles": profiles,
+    }
+
+
+def profile_router(get_verifier: Callable[[], Any], *, role: Optional[str] = None, max_seconds: float = 60.0):
+    """APIRouter exposing ``GET /debug/profile`` for tokens carrying the profiler role."""
+    from fastapi import APIRouter, Depends, HTTPException, Query
+    from fastapi.concurrency import run_in_threadpool
+    from fastapi.responses import JSONResponse, PlainTextResponse
+
+    from .audit import get_audit_logger
+    from .middleware import require_auth
+
+    required_role = role or os.getenv("PROFILER_ROLE", "admin")
+    router = APIRouter()
+    require_profiler_role = require_auth([required_role], verifier=get_verifier)
+
+    @router.get("/debug/profile")
+    async def profile(
+        seconds: float = Query(10.0, gt=0, le=max_seconds),
+        format: str = Query("collapsed", pattern="^(collapsed|speedscope)$"),
+        interval_ms: float = Query(10.0, ge=1, le=1000),
+        claims: Dict[str, Any] = Depends(require_profiler_role),
+    ):
+        get_audit_logger().log("debug.profile", actor=claims.get("sub"),
+                               details={"seconds": seconds, "format": format})
+        try:
+            samples = await run_in_threadpool(sample, seconds, interval_ms / 1000.0)
+        except ProfilerBusy as e:
+            raise HTTPException(status_code=409, detail=str(e))
+        if format == "speedscope":
+            return JSONResponse(render_speedscope(samples, interval_ms / 1000.0))
+        return PlainTextResponse(render_collapsed(samples))
+
+    return router
+
+
+__all__ = ["sample", "render_collapsed", "render_speedscope", "profile_router", "ProfilerBusy"]
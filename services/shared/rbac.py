@@ -4,41 +4,318 @@ Policies format (JSON):
 {
   "action.name": {"roles": ["provider"], "specialties_any": ["psychiatry"]}
 }
+
+The file (``RBAC_POLICY_PATH``, default ``rbac_policies.json`` next to this
+module) is compiled at load into frozensets per action plus an index of the
+actions each role may perform; decisions are memoised per
+``(action, role, specialties)`` on the compiled object, so a swap discards them.
+
+A watcher thread re-stats the file every ``RBAC_RELOAD_INTERVAL`` seconds and
+recompiles when it changes; ``request_reload`` (wired to SIGHUP by
+``install_reload_signal``) forces it. The new compiled set replaces the old one
+with a single reference assignment, so requests never wait on a reload. A file
+that fails to parse leaves the previous policies in force.
 """
 from __future__ import annotations
+import hashlib
 import json
+import logging
+import os
+import signal
+import threading
+import time
 from pathlib import Path
-from typing import Dict, Any, Iterable
+from typing import Any, Callable, Dict, FrozenSet, Iterable, List, NamedTuple, Optional, Tuple
+
+from .metrics import REGISTRY, Counter, FAST_BUCKETS, Gauge, Histogram, add_server_timing
+from .tracing import span
 
-_POLICIES: Dict[str, Any] | None = None
+logger = logging.getLogger("webqx.rbac")
 
+DEFAULT_POLICY_PATH = os.getenv("RBAC_POLICY_PATH", str(Path(__file__).with_name("rbac_policies.json")))
+DECISION_CACHE_SIZE = 4096
 
-def load_policies(path: str = "services/shared/rbac_policies.json") -> Dict[str, Any]:
-    global _POLICIES
-    if _POLICIES is None:
-        p = Path(path)
-        _POLICIES = json.loads(p.read_text(encoding="utf-8")) if p.exists() else {}
-    return _POLICIES
+LOAD_SECONDS: Gauge = REGISTRY.register(  # type: ignore[assignment]
+    Gauge("rbac_policy_load_seconds", "Time taken by the last policy load and compile.")
+)
+RELOADS: Counter = REGISTRY.register(  # type: ignore[assignment]
+    Counter("rbac_policy_reloads_total", "Policy (re)loads by result.", ["result"])
+)
+DECISION_SECONDS: Histogram = REGISTRY.register(  # type: ignore[assignment]
+    Histogram("rbac_decision_seconds", "Latency of rbac.check decisions.", buckets=FAST_BUCKETS)
+)
+
+_MISS = object()
 
 
 class RBACError(Exception):
     pass
 
 
-def check(action: str, claims: Dict[str, Any], *, policy_path: str = "services/shared/rbac_policies.json"):
-    policies = load_policies(policy_path)
-    rule = policies.get(action)
-    if not rule:
-        raise RBACError(f"No policy for action {action}")
+class Rule(NamedTuple):
+    roles: FrozenSet[str]
+    specialties_any: FrozenSet[str]
+
+
+class CompiledPolicies:
+    def __init__(self, raw: Dict[str, Any], version: str):
+        self.raw = raw
+        self.version = version
+        self.rules: Dict[str, Rule] = {
+            action: Rule(frozenset(rule.get("roles", [])), frozenset(rule.get("specialties_any", [])))
+            for action, rule in raw.items()
+            if rule
+        }
+        roles = frozenset().union(*(r.roles for r in self.rules.values()))
+        self.actions_by_role: Dict[str, FrozenSet[str]] = {
+            role: frozenset(a for a, r in self.rules.items() if role in r.roles) for role in roles
+        }
+        self._decisions: Dict[Tuple[str, Any, Tuple[str, ...]], Optional[str]] = {}
+
+    def _evaluate(self, action: str, role: Any, specialties: Tuple[str, ...]) -> Optional[str]:
+        rule = self.rules.get(action)
+        if rule is None:
+            return f"No policy for action {action}"
+        if role not in rule.roles:
+            return f"Role '{role}' not permitted for {action}"
+        if rule.specialties_any and rule.specialties_any.isdisjoint(specialties):
+            return "Required specialty missing"
+        return None
+
+    def decide(self, action: str, role: Any, specialties: Tuple[str, ...] = ()) -> Optional[str]:
+        """None when allowed, else the denial reason."""
+        key = (action, role, specialties)
+        denial = self._decisions.get(key, _MISS)
+        if denial is _MISS:
+            denial = self._evaluate(action, role, specialties)
+            if len(self._decisions) >= DECISION_CACHE_SIZE:
+                self._decisions.clear()
+            self._decisions[key] = denial
+        return denial  # type: ignore[return-value]
+
+    def allowed(self, role: Any, specialties: Iterable[str] = ()) -> FrozenSet[str]:
+        """Every action ``role`` with ``specialties`` may perform."""
+        specs = frozenset(specialties)
+        return frozenset(
+            a for a in self.actions_by_role.get(role, ())
+            if not self.rules[a].specialties_any or not self.rules[a].specialties_any.isdisjoint(specs)
+        )
+
+
+def _validate(raw: Any) -> None:
+    if not isinstance(raw, dict):
+        raise ValueError("RBAC policy file must be a JSON object")
+    for action, rule in raw.items():
+        if rule is None or rule == {}:
+            continue
+        if not isinstance(rule, dict):
+            raise ValueError(f"Policy for {action!r} must be an object")
+        for key in ("roles", "specialties_any"):
+            values = rule.get(key, [])
+            if not isinstance(values, list) or not all(isinstance(v, str) for v in values):
+                raise ValueError(f"{key!r} of {action!r} must be a list of strings")
+
+
+def compile_policies(data: bytes) -> CompiledPolicies:
+    """Parse, validate and compile a policy file; ValueError when it is malformed."""
+    raw = json.loads(data.decode("utf-8")) if data.strip() else {}
+    _validate(raw)
+    return CompiledPolicies(raw, hashlib.sha256(data).hexdigest()[:16])
+
+
+class PolicyStore:
+    def __init__(self, path: str, reload_interval: float = 2.0):
+        self.path = Path(path)
+        self.reload_interval = reload_interval
+        self._compiled: Optional[CompiledPolicies] = None
+        self._stamp: Optional[Tuple[int, int, int]] = None
+        self._lock = threading.Lock()
+        self._wake = threading.Event()
+        self._force = False
+        self._watcher: Optional[threading.Thread] = None
+
+    @property
+    def compiled(self) -> CompiledPolicies:
+        compiled = self._compiled
+        if compiled is None:
+            with self._lock:
+                if self._compiled is None:
+                    self.reload(force=True)
+                    if self.reload_interval > 0:
+                        self._watcher = threading.Thread(target=self._watch, name="rbac-reload", daemon=True)
+                        self._watcher.start()
+            compiled = self._compiled
+        return compiled  # type: ignore[return-value]
+
+    def _file_stamp(self) -> Optional[Tuple[int, int, int]]:
+        try:
+            st = os.stat(self.path)
+        except FileNotFoundError:
+            return None
+        return (st.st_mtime_ns, st.st_size, st.st_ino)
+
+    def reload(self, force: bool = False) -> bool:
+        """Recompile if the file changed (or ``force``); returns whether policies were swapped."""
+        stamp = self._file_stamp()
+        if not force and stamp == self._stamp and self._compiled is not None:
+            return False
+        started = time.perf_counter()
+        try:
+            data = self.path.read_bytes() if stamp is not None else b""
+            compiled = compile_policies(data)
+        except (OSError, ValueError) as e:
+            RELOADS.inc(result="error")
+            if self._compiled is None:
+                raise
+            logger.error("Keeping RBAC policies %s; reload of %s failed: %s", self._compiled.version, self.path, e)
+            self._stamp = stamp  # do not retry the same broken file every interval
+            return False
+        self._compiled = compiled
+        self._stamp = stamp
+        LOAD_SECONDS.set(time.perf_counter() - started)
+        RELOADS.inc(result="ok")
+        logger.info("Loaded RBAC policies %s from %s (%d actions)", compiled.version, self.path, len(compiled.rules))
+        return True
+
+    def request_reload(self) -> None:
+        """Force a reload on the watcher thread (safe to call from a signal handler)."""
+        self._force = True
+        self._wake.set()
+
+    def _watch(self) -> None:
+        while True:
+            self._wake.wait(self.reload_interval)
+            self._wake.clear()
+            force, self._force = self._force, False
+            try:
+                self.reload(force=force)
+            except Exception:  # pragma: no cover - keep watching
+                logger.exception("RBAC policy reload failed")
+
+
+_STORES: Dict[str, PolicyStore] = {}
+_STORES_LOCK = threading.Lock()
+
+
+def get_policy_store(path: Optional[str] = None) -> PolicyStore:
+    path = path or DEFAULT_POLICY_PATH
+    store = _STORES.get(path)
+    if store is None:
+        with _STORES_LOCK:
+            store = _STORES.get(path)
+            if store is None:
+                store = _STORES[path] = PolicyStore(path, float(os.getenv("RBAC_RELOAD_INTERVAL", "2.0")))
+    return store
+
+
+def install_reload_signal(signum: int = signal.SIGHUP) -> bool:
+    """Reload every loaded policy file on ``signum``; False when not on the main thread."""
+    def _handler(_signum, _frame):
+        for store in list(_STORES.values()):
+            store.request_reload()
+
+    try:
+        signal.signal(signum, _handler)
+    except ValueError:
+        return False
+    return True
+
+
+def load_policies(path: Optional[str] = None) -> Dict[str, Any]:
+    return get_policy_store(path).compiled.raw
+
+
+def _specialties(claims: Dict[str, Any]) -> Tuple[str, ...]:
+    specs: Iterable[str] = claims.get("specialties") or ()
+    return specs if isinstance(specs, tuple) else tuple(specs)
+
+
+def _role(claims: Dict[str, Any]) -> Optional[str]:
     role = claims.get("role")
-    if role not in rule.get("roles", []):
-        raise RBACError(f"Role '{role}' not permitted for {action}")
-    specialties_req: Iterable[str] = rule.get("specialties_any", [])
-    if specialties_req:
-        user_specs = set(claims.get("specialties", []))
-        if user_specs.isdisjoint(specialties_req):
-            raise RBACError("Required specialty missing")
+    return role if isinstance(role, (str, type(None))) else repr(role)
+
+
+def check(action: str, claims: Dict[str, Any], *, policy_path: Optional[str] = None):
+    with span("rbac.check", {"rbac.action": action}) as s:
+        started = time.perf_counter()
+        denial = get_policy_store(policy_path).compiled.decide(action, _role(claims), _specialties(claims))
+        elapsed = time.perf_counter() - started
+        s.set_attribute("rbac.allowed", denial is None)
+    DECISION_SECONDS.observe(elapsed)
+    add_server_timing("rbac", elapsed)
+    if denial is not None:
+        raise RBACError(denial)
     return True
 
 
-__all__ = ["check", "RBACError", "load_policies"]
+def evaluate(
+    claims: Dict[str, Any], actions: Optional[Iterable[str]] = None, *, policy_path: Optional[str] = None
+) -> Tuple[str, Dict[str, bool]]:
+    """``(policy_version, {action: allowed})`` for all policy actions, or just ``actions``."""
+    compiled = get_policy_store(policy_path).compiled
+    allowed = compiled.allowed(_role(claims), _specialties(claims))
+    names = sorted(compiled.rules) if actions is None else actions
+    return compiled.version, {a: a in allowed for a in names}
+
+
+def manifest_etag(version: str, claims: Dict[str, Any], actions: Optional[Iterable[str]] = None) -> str:
+    basis = json.dumps(
+        [version, _role(claims), sorted(_specialties(claims)), sorted(actions) if actions is not None else None]
+    )
+    return f'"{version}-{hashlib.sha256(basis.encode()).hexdigest()[:16]}"'
+
+
+def _etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    if not if_none_match:
+        return False
+    tags = [t.strip() for t in if_none_match.split(",")]
+    return "*" in tags or etag in tags or f"W/{etag}" in tags
+
+
+def permissions_router(auth_dependency: Callable[..., Any], *, policy_path: Optional[str] = None):
+    """APIRouter exposing ``GET /v1/permissions`` (the caller's allowed-actions manifest)."""
+    from fastapi import APIRouter, Depends, Header, Query
+    from fastapi.responses import JSONResponse, Response
+
+    router = APIRouter()
+
+    @router.get("/v1/permissions")
+    async def permissions(
+        actions: Optional[str] = Query(None, description="Comma-separated subset of actions; default all"),
+        if_none_match: Optional[str] = Header(None),
+        claims: Dict[str, Any] = Depends(auth_dependency),
+    ):
+        requested: Optional[List[str]] = None
+        if actions is not None:
+            requested = sorted({a.strip() for a in actions.split(",") if a.strip()})
+        version, decisions = evaluate(claims, requested, policy_path=policy_path)
+        etag = manifest_etag(version, claims, requested)
+        headers = {"ETag": etag, "Cache-Control": "private, no-cache", "Vary": "Authorization"}
+        if _etag_matches(if_none_match, etag):
+            return Response(status_code=304, headers=headers)
+        return JSONResponse(
+            {
+                "policy_version": version,
+                "role": claims.get("role"),
+                "allowed": [a for a, ok in decisions.items() if ok],
+                "denied": [a for a, ok in decisions.items() if not ok],
+            },
+            headers=headers,
+        )
+
+    return router
+
+
+__all__ = [
+    "check",
+    "evaluate",
+    "manifest_etag",
+    "permissions_router",
+    "RBACError",
+    "load_policies",
+    "compile_policies",
+    "CompiledPolicies",
+    "PolicyStore",
+    "get_policy_store",
+    "install_reload_signal",
+]
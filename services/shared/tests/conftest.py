@@ -0,0 +1,7 @@
+import sys
+from pathlib import Path
+
+# shared modules are imported as ``services.shared.*`` by the services; mirror that here
+ROOT = Path(__file__).resolve().parents[3]
+if str(ROOT) not in sys.path:
+    sys.path.insert(0, str(ROOT))
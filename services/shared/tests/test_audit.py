@@ -0,0 +1,126 @@
+import asyncio
+import json
+import threading
+import time
+
+from services.shared.audit import AuditLogger
+
+
+def _lines(path):
+    return [json.loads(line) for line in path.read_text().splitlines()]
+
+
+def test_batches_by_size_and_drains_on_shutdown(tmp_path):
+    log = AuditLogger(str(tmp_path / "audit.log"), flush_interval=60, batch_size=10, fsync="never")
+    for i in range(25):
+        log.log("a", actor=f"u{i}")
+    log.shutdown()
+    assert [e["actor"] for e in _lines(tmp_path / "audit.log")] == [f"u{i}" for i in range(25)]
+    assert log.stats()["written"] == 25
+    assert log.stats()["batches"] >= 3
+
+
+def test_flushes_after_interval(tmp_path):
+    log = AuditLogger(str(tmp_path / "audit.log"), flush_interval=0.05, fsync="never")
+    log.log("a")
+    deadline = time.monotonic() + 2
+    while log.written == 0 and time.monotonic() < deadline:
+        time.sleep(0.01)
+    assert log.written == 1
+    log.shutdown()
+
+
+def test_rotates_by_size(tmp_path):
+    log = AuditLogger(str(tmp_path / "audit.log"), flush_interval=60, batch_size=1, max_bytes=300,
+                      compress=False, fsync="never")
+    for i in range(10):
+        log.log("a", details={"i": i})
+    log.shutdown()
+    assert log.rotations >= 1
+    rotated = sorted(tmp_path.glob("audit.log.*"))
+    assert len(rotated) == log.rotations
+    events = [e for path in rotated for e in _lines(path)] + _lines(tmp_path / "audit.log")
+    assert [e["details"]["i"] for e in events] == list(range(10))
+    assert all(path.stat().st_size <= 300 for path in [*rotated, tmp_path / "audit.log"])
+
+
+def test_drop_overflow_counts_instead_of_blocking(tmp_path):
+    log = AuditLogger(str(tmp_path / "audit.log"), max_queue=2, overflow="drop", fsync="never")
+    gate = threading.Event()
+    original = log._write
+    log._write = lambda batch: (gate.wait(), original(batch))
+    started = time.perf_counter()
+    for _ in range(20):
+        log.log("a")
+    assert time.perf_counter() - started < 0.5
+    assert log.dropped > 0
+    assert log.enqueued + log.dropped == 20
+    gate.set()
+    log.shutdown()
+    assert log.written == log.enqueued
+
+
+def test_block_overflow_never_waits_on_the_event_loop(tmp_path):
+    log = AuditLogger(str(tmp_path / "audit.log"), max_queue=2, overflow="block", block_timeout=0.2,
+                      batch_size=1, fsync="never")
+    gate = threading.Event()
+    original = log._write
+    log._write = lambda batch: (gate.wait(), original(batch))
+
+    async def view():
+        for _ in range(10):
+            log.log("a")
+
+    started = time.perf_counter()
+    asyncio.run(view())
+    assert time.perf_counter() - started < 0.2
+    assert log.dropped > 0 and log.enqueued + log.dropped == 10
+    dropped = log.dropped
+    for _ in range(5):  # off the loop a full queue still waits before dropping
+        started = time.perf_counter()
+        log.log("b")
+        if log.dropped > dropped:
+            break
+    assert log.dropped == dropped + 1 and time.perf_counter() - started >= 0.2
+    gate.set()
+    log.shutdown()
+
+
+def test_unserializable_details_do_not_stop_the_writer(tmp_path):
+    log = AuditLogger(str(tmp_path / "audit.log"), flush_interval=0.01, fsync="never")
+    log.log("a", details={"obj": object()})
+    log.log("b")
+    log.shutdown()
+    events = _lines(tmp_path / "audit.log")
+    assert [e["action"] for e in events] == ["a", "b"]
+    assert events[0]["details"]["obj"].startswith("<object")
+
+
+def test_write_error_costs_only_that_batch(tmp_path):
+    log = AuditLogger(str(tmp_path / "audit.log"), flush_interval=60, batch_size=1, fsync="never")
+    original, calls = log._write, []
+
+    def flaky(batch):
+        calls.append(batch)
+        if len(calls) == 1:
+            raise RuntimeError("boom")
+        original(batch)
+
+    log._write = flaky
+    log.log("lost")
+    log.log("kept")
+    log.shutdown()
+    assert log.write_errors == 1
+    assert [e["action"] for e in _lines(tmp_path / "audit.log")] == ["kept"]
+
+
+def test_shutdown_returns_when_queue_stays_full(tmp_path):
+    log = AuditLogger(str(tmp_path / "audit.log"), max_queue=1, block_timeout=0.01, fsync="never")
+    gate = threading.Event()
+    log._write = lambda batch: gate.wait()
+    log.log("a")
+    log.log("b")  # fills the queue while the writer is stuck
+    started = time.perf_counter()
+    log.shutdown(timeout=0.2)
+    assert time.perf_counter() - started < 1.0
+    gate.set()
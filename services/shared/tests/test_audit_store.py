@@ -0,0 +1,76 @@
+import calendar
+
+import pytest
+
+from services.shared.audit import AuditEvent
+from services.shared.audit_store import AuditStore, segment_month
+
+
+def _ts(year, month, day, hour=0):
+    return float(calendar.timegm((year, month, day, hour, 0, 0)))
+
+
+@pytest.fixture
+def store(tmp_path):
+    store = AuditStore(str(tmp_path))
+    events = []
+    for month in (1, 2, 3):
+        for day in range(1, 6):
+            for actor in ("alice", "bob"):
+                events.append(AuditEvent(ts=_ts(2026, month, day), actor=actor, action="chart.read",
+                                         resource=f"patient:{day}", details={"m": month}))
+    events.append(AuditEvent(ts=_ts(2026, 2, 3), actor="alice", action="chart.write", resource="patient:3"))
+    store.append(events)
+    yield store
+    store.close()
+
+
+def test_one_segment_per_month(store):
+    assert [p.name for p in store.segments()] == [f"audit-2026-0{m}.sqlite" for m in (1, 2, 3)]
+    assert [p.name for p in store.segments(_ts(2026, 2, 10), _ts(2026, 3, 1))] == [
+        "audit-2026-02.sqlite", "audit-2026-03.sqlite"]
+    assert segment_month(_ts(2026, 12, 31, 23)) == "2026-12"
+
+
+def test_filters_and_time_range(store):
+    events, cursor = store.query(actor="alice", since=_ts(2026, 2, 1), until=_ts(2026, 3, 1))
+    assert cursor is None
+    assert len(events) == 6
+    assert {e["action"] for e in events} == {"chart.read", "chart.write"}
+    assert all(e["actor"] == "alice" for e in events)
+    writes, _ = store.query(action="chart.write")
+    assert writes[0]["resource"] == "patient:3" and writes[0]["details"] is None
+    assert store.query(resource="patient:5", actor="bob")[0][0]["details"] == {"m": 1}
+
+
+def test_cursor_pages_across_segments_without_gaps(store):
+    seen, cursor, pages = [], None, 0
+    while True:
+        events, cursor = store.query(limit=4, cursor=cursor)
+        seen.extend((e["ts"], e["actor"], e["action"]) for e in events)
+        pages += 1
+        if cursor is None:
+            break
+    everything, _ = store.query(limit=1000)
+    assert seen == [(e["ts"], e["actor"], e["action"]) for e in everything]
+    assert len(seen) == 31 and pages == 8
+    assert seen == sorted(seen, key=lambda item: item[0])
+
+
+def test_query_reads_only_overlapping_segments(store, monkeypatch):
+    opened = []
+    real = store.segments
+
+    def segments(since=None, until=None):
+        found = real(since, until)
+        opened.extend(p.name for p in found)
+        return found
+
+    monkeypatch.setattr(store, "segments", segments)
+    store.query(since=_ts(2026, 3, 2), until=_ts(2026, 3, 4))
+    assert opened == ["audit-2026-03.sqlite"]
+
+
+def test_bad_cursor(store):
+    with pytest.raises(ValueError):
+        store.query(cursor="nonsense")
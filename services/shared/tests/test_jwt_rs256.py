@@ -0,0 +1,115 @@
+import asyncio
+import time
+from types import SimpleNamespace
+
+import httpx
+import pytest
+
+from services.shared import jwt_rs256
+from services.shared.bench.fixtures import AUDIENCE, ISSUER, JWKS_URL, LocalIssuer
+from services.shared.jwks import JWKSClient, KeyRing
+from services.shared.jwt_rs256 import CLAIMS_EXPIRY_MARGIN, ClaimsCache, JWTVerifier, VerifierSettings
+
+
+@pytest.fixture(scope="module")
+def issuer():
+    return LocalIssuer(bits=1024)
+
+
+@pytest.fixture
+def keys(issuer):
+    return [issuer.public_jwk]
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    now = [time.time()]
+    monkeypatch.setattr(jwt_rs256, "time", SimpleNamespace(time=lambda: now[0]))
+    return now
+
+
+def _verifier(keys, leeway=0, size=1024):
+    verifier = JWTVerifier(VerifierSettings(
+        jwks_url=JWKS_URL, issuer=ISSUER, audience=AUDIENCE, leeway=leeway, claims_cache_size=size,
+    ))
+    transport = httpx.MockTransport(lambda request: httpx.Response(200, json={"keys": list(keys)}))
+    verifier.jwks = JWKSClient(JWKS_URL, client=httpx.AsyncClient(transport=transport))
+    verifier.keyring = KeyRing(verifier.jwks)
+    return verifier
+
+
+def _verify(verifier, token, times=1):
+    async def run():
+        return [await verifier.verify(token) for _ in range(times)]
+
+    return asyncio.run(run())
+
+
+@pytest.mark.parametrize("leeway", [0, 30])
+def test_cached_until_exp_plus_leeway_minus_margin(issuer, keys, clock, leeway):
+    exp = int(clock[0]) + 60
+    verifier = _verifier(keys, leeway=leeway)
+    token = issuer.token(exp=exp)
+    _verify(verifier, token, times=2)
+    assert verifier.cache_stats()["hits"] == 1
+
+    clock[0] = exp + leeway - CLAIMS_EXPIRY_MARGIN - 0.1
+    _verify(verifier, token)
+    assert verifier.cache_stats()["hits"] == 2
+
+    clock[0] = exp + leeway - CLAIMS_EXPIRY_MARGIN
+    _verify(verifier, token)  # entry expired: verified again, and too close to exp to re-cache
+    assert verifier.cache_stats() == {"hits": 2, "misses": 2, "evictions": 0, "size": 0}
+
+
+def test_returns_copies(issuer, keys):
+    verifier = _verifier(keys)
+    token = issuer.token()
+    first, = _verify(verifier, token)
+    first["role"] = "admin"
+    assert _verify(verifier, token)[0]["role"] == "provider"
+
+
+def test_key_set_change_clears_cache(issuer, keys):
+    verifier = _verifier(keys)
+    token = issuer.token()
+    _verify(verifier, token, times=2)
+    assert verifier.cache_stats()["size"] == 1
+
+    keys.append({**issuer.public_jwk, "kid": "rotated"})
+
+    async def rotate_then_verify():
+        await verifier.jwks.refresh()
+        return await verifier.verify(token)
+
+    asyncio.run(rotate_then_verify())
+    stats = verifier.cache_stats()
+    assert (stats["hits"], stats["misses"], stats["size"]) == (1, 2, 1)
+
+
+def test_tokens_without_exp_are_not_cached(issuer, keys):
+    verifier = _verifier(keys)
+    token = issuer.token(exp=None)
+    assert _verify(verifier, token, times=2)[1]["sub"] == "bench-user"
+    assert verifier.cache_stats() == {"hits": 0, "misses": 2, "evictions": 0, "size": 0}
+
+
+def test_lru_eviction_and_stats():
+    cache = ClaimsCache(maxsize=2)
+    until = time.time() + 60
+    cache.put(b"a", {"sub": "a"}, until)
+    cache.put(b"b", {"sub": "b"}, until)
+    assert cache.get(b"a") == {"sub": "a"}  # a is now most recently used
+    cache.put(b"c", {"sub": "c"}, until)
+    assert cache.get(b"b") is None
+    assert cache.get(b"a") is not None and cache.get(b"c") is not None
+    assert cache.stats() == {"hits": 3, "misses": 1, "evictions": 1, "size": 2}
+    cache.clear()
+    assert cache.stats()["size"] == 0
+
+
+def test_size_zero_disables_cache():
+    cache = ClaimsCache(maxsize=0)
+    cache.put(b"a", {"sub": "a"}, time.time() + 60)
+    assert cache.get(b"a") is None
+    assert cache.stats()["size"] == 0
@@ -0,0 +1,74 @@
+import re
+
+import pytest
+from fastapi import Depends, FastAPI
+from fastapi.testclient import TestClient
+
+from services.shared import middleware
+from services.shared.metrics import timed
+
+
+class FakeVerifier:
+    def __init__(self, claims=None, error=None):
+        self.claims, self.error = claims, error
+
+    async def verify(self, authorization):
+        if self.error is not None:
+            raise self.error
+        return dict(self.claims)
+
+
+@pytest.fixture
+def client(monkeypatch):
+    monkeypatch.delenv("TRACE_EXPORTER", raising=False)
+    verifier = FakeVerifier({"sub": "u1", "role": "patient"})
+    app = middleware.instrument(FastAPI(title="test"))
+    provider_only = middleware.require_auth({"provider"}, verifier=lambda: verifier)
+
+    @app.get("/items/{item_id}")
+    async def item(item_id: str):
+        with timed("db"):
+            pass
+        return {"id": item_id}
+
+    @app.get("/private")
+    async def private(claims=Depends(provider_only)):
+        return claims
+
+    client = TestClient(app)
+    client.verifier = verifier
+    return client
+
+
+def test_requests_are_labelled_by_route_template(client):
+    before = middleware.REQUESTS.value(route="/items/{item_id}", method="GET", status="200")
+    for item_id in ("1", "2", "3"):
+        assert client.get(f"/items/{item_id}").status_code == 200
+    unmatched = middleware.REQUESTS.value(route="unmatched", method="GET", status="404")
+    assert client.get("/nope").status_code == 404
+    assert middleware.REQUESTS.value(route="/items/{item_id}", method="GET", status="200") == before + 3
+    assert middleware.REQUESTS.value(route="unmatched", method="GET", status="404") == unmatched + 1
+    assert middleware.DURATION.count(route="/items/{item_id}", method="GET") >= 3
+    assert middleware.IN_FLIGHT.value(route="/items/{item_id}") == 0
+    body = client.get("/metrics").text
+    assert 'http_requests_total{route="/items/{item_id}",method="GET",status="200"}' in body
+    assert "/items/1" not in body
+
+
+def test_server_timing_lists_stages_and_total(client):
+    header = client.get("/items/7").headers["server-timing"]
+    assert re.fullmatch(r"db;dur=\d+\.\d{3}, total;dur=\d+\.\d{3}", header)
+    header = client.get("/private", headers={"Authorization": "Bearer x"}).headers["server-timing"]
+    assert [part.split(";")[0] for part in header.split(", ")] == ["jwt", "total"]
+
+
+def test_require_auth_status_codes(client):
+    assert client.get("/private").status_code == 403  # role not allowed
+    client.verifier.claims = {"sub": "u1", "role": "provider"}
+    assert client.get("/private").json()["role"] == "provider"
+    client.verifier.claims = {"sub": "u1"}
+    assert client.get("/private").json()["detail"] == "Missing role claim"
+    client.verifier.error = ValueError("Missing bearer token")
+    assert client.get("/private").status_code == 401
+    client.verifier.error = middleware.JWKSUnavailable("issuer down")
+    assert client.get("/private").status_code == 503
@@ -0,0 +1,116 @@
+import json
+import logging
+import os
+
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from services.shared import rbac
+
+POLICIES = {
+    "assist.summary": {"roles": ["provider", "admin"]},
+    "assist.psych": {"roles": ["provider"], "specialties_any": ["psychiatry"]},
+    "literacy.explain": {"roles": ["patient", "provider"]},
+}
+
+
+@pytest.fixture
+def policy_file(tmp_path):
+    path = tmp_path / "policies.json"
+    path.write_text(json.dumps(POLICIES))
+    return path
+
+
+def _rewrite(path, data):
+    path.write_text(data if isinstance(data, str) else json.dumps(data))
+    st = path.stat()
+    os.utime(path, ns=(st.st_atime_ns, st.st_mtime_ns + 1_000_000_000))  # a distinct stamp even on coarse clocks
+
+
+def test_compile_and_decide():
+    compiled = rbac.compile_policies(json.dumps(POLICIES).encode())
+    assert compiled.decide("assist.summary", "admin") is None
+    assert "not permitted" in compiled.decide("assist.summary", "patient")
+    assert compiled.decide("assist.psych", "provider") == "Required specialty missing"
+    assert compiled.decide("assist.psych", "provider", ("psychiatry",)) is None
+    assert compiled.decide("nope", "admin") == "No policy for action nope"
+    assert compiled.allowed("provider") == {"assist.summary", "literacy.explain"}
+    assert compiled.allowed("provider", ["psychiatry"]) == {"assist.summary", "assist.psych", "literacy.explain"}
+
+
+@pytest.mark.parametrize("bad", [
+    b"[]",
+    b'{"a": ["provider"]}',
+    b'{"a": {"roles": "provider"}}',
+    b'{"a": {"roles": ["provider"], "specialties_any": [1]}}',
+    b"{not json",
+])
+def test_compile_rejects_malformed_files(bad):
+    with pytest.raises(ValueError):
+        rbac.compile_policies(bad)
+
+
+def test_reload_swaps_on_change_and_keeps_policies_on_error(policy_file, caplog):
+    store = rbac.PolicyStore(str(policy_file), reload_interval=0)
+    first = store.compiled
+    assert store.reload() is False  # unchanged file
+
+    _rewrite(policy_file, {**POLICIES, "assist.plan": {"roles": ["admin"]}})
+    assert store.reload() is True
+    assert store.compiled.version != first.version
+    assert "assist.plan" in store.compiled.rules
+
+    good = store.compiled
+    _rewrite(policy_file, {"assist.summary": ["provider"]})
+    with caplog.at_level(logging.ERROR, logger="webqx.rbac"):
+        assert store.reload() is False
+        assert store.reload() is False  # the same broken file is not retried
+    assert store.compiled is good
+    assert len([r for r in caplog.records if "reload" in r.getMessage()]) == 1
+
+
+def test_check(policy_file):
+    path = str(policy_file)
+    assert rbac.check("assist.summary", {"role": "provider"}, policy_path=path) is True
+    with pytest.raises(rbac.RBACError):
+        rbac.check("assist.summary", {"role": "patient"}, policy_path=path)
+
+
+def test_evaluate(policy_file):
+    path = str(policy_file)
+    version, decisions = rbac.evaluate({"role": "patient"}, policy_path=path)
+    assert version == rbac.get_policy_store(path).compiled.version
+    assert decisions == {"assist.psych": False, "assist.summary": False, "literacy.explain": True}
+    assert rbac.evaluate({"role": "patient"}, ["literacy.explain"], policy_path=path)[1] == {"literacy.explain": True}
+
+
+def test_manifest_etag_varies_with_inputs():
+    claims = {"role": "provider", "specialties": ["psychiatry"]}
+    etag = rbac.manifest_etag("v1", claims)
+    assert etag == rbac.manifest_etag("v1", {"role": "provider", "specialties": ("psychiatry",)})
+    assert etag != rbac.manifest_etag("v2", claims)
+    assert etag != rbac.manifest_etag("v1", {"role": "admin"})
+    assert etag != rbac.manifest_etag("v1", claims, ["assist.summary"])
+    assert rbac._etag_matches(f"W/{etag}, \"other\"", etag)
+    assert not rbac._etag_matches(None, etag)
+
+
+def test_permissions_endpoint_and_conditional_get(policy_file):
+    app = FastAPI()
+    app.include_router(rbac.permissions_router(lambda: {"role": "patient"}, policy_path=str(policy_file)))
+    client = TestClient(app)
+
+    r = client.get("/v1/permissions")
+    assert r.status_code == 200
+    assert r.json()["allowed"] == ["literacy.explain"]
+    assert r.headers["cache-control"] == "private, no-cache"
+    etag = r.headers["etag"]
+
+    r = client.get("/v1/permissions", headers={"if-none-match": etag})
+    assert r.status_code == 304 and r.headers["etag"] == etag
+
+    r = client.get("/v1/permissions?actions=assist.summary", headers={"if-none-match": etag})
+    assert r.status_code == 200
+    assert r.json() == {"policy_version": r.json()["policy_version"], "role": "patient",
+                        "allowed": [], "denied": ["assist.summary"]}
@@ -1,11 +1,14 @@
 import asyncio
 import os
+import struct
 import tempfile
 import subprocess
-from typing import Tuple
+from typing import Optional, Sequence, Tuple
 
+import numpy as np
 import soundfile as sf
 
+from .tracing import span
 
 FFMPEG_BIN = os.getenv("FFMPEG_BIN", "ffmpeg")
 
@@ -14,13 +17,16 @@ class AudioProcessingError(Exception):
     pass
 
 
-async def transcode_to_wav_16k(file_path: str) -> Tuple[str, float]:
-    """Transcode input media file to 16k mono wav PCM. Returns (wav_path, duration_seconds)."""
+async def transcode_to_wav_16k(file_path: str, input_args: Sequence[str] = ()) -> Tuple[str, float]:
+    """Transcode input media file to 16k mono wav PCM. Returns (wav_path, duration_seconds).
+
+    ``input_args`` are passed before ``-i`` (e.g. ``-f s16le -ar 48000 -ac 2`` for raw PCM)."""
     out_fd, out_path = tempfile.mkstemp(suffix=".wav")
     os.close(out_fd)
     cmd = [
         FFMPEG_BIN,
         "-y",
+        *input_args,
         "-i",
         file_path,
         "-ac",
@@ -31,11 +37,14 @@ async def transcode_to_wav_16k(file_path: str) -> Tuple[str, float]:
         "wav",
         out_path,
     ]
-    proc = await asyncio.create_subprocess_exec(
-        *cmd, stdout=asyncio.subprocess.PIPE, stderr=asyncio.subprocess.PIPE
-    )
-    _stdout, stderr = await proc.communicate()
+    with span("ffmpeg.transcode", {"ffmpeg.input_args": " ".join(input_args)}) as s:
+        proc = await asyncio.create_subprocess_exec(
+            *cmd, stdout=asyncio.subprocess.PIPE, stderr=asyncio.subprocess.PIPE
+        )
+        _stdout, stderr = await proc.communicate()
+        s.set_attribute("ffmpeg.returncode", proc.returncode)
     if proc.returncode != 0:
+        os.remove(out_path)
         raise AudioProcessingError(f"ffmpeg failed: {stderr.decode(errors='ignore')[:400]}")
     # Read duration with soundfile
     try:
@@ -46,3 +55,204 @@ async def transcode_to_wav_16k(file_path: str) -> Tuple[str, float]:
     except Exception as e:  # pragma: no cover
         raise AudioProcessingError(f"Failed reading transcoded wav: {e}")
     return out_path, duration
+
+
+def pcm16_wav_layout(path: str) -> Optional[Tuple[int, int, int]]:
+    """(data_offset, n_samples, samplerate) for mono PCM16 RIFF/WAVE files, else None."""
+    with open(path, "rb") as f:
+        header = f.read(12)
+        if len(header) < 12 or header[:4] != b"RIFF" or header[8:12] != b"WAVE":
+            return None
+        fmt = None
+        while True:
+            chunk = f.read(8)
+            if len(chunk) < 8:
+                return None
+            cid, size = chunk[:4], struct.unpack("<I", chunk[4:])[0]
+            if cid == b"fmt ":
+                body = f.read(size)
+                if len(body) < 16:
+                    return None
+                fmt = struct.unpack("<HHIIHH", body[:16])
+            elif cid == b"data":
+                if fmt is None:
+                    return None
+                tag, channels, rate, _byte_rate, _align, bits = fmt
+                # 0xFFFE is WAVE_FORMAT_EXTENSIBLE, which ffmpeg uses for the same PCM layout
+                if tag not in (1, 0xFFFE) or channels != 1 or bits != 16:
+                    return None
+                offset = f.tell()
+                available = os.fstat(f.fileno()).st_size - offset
+                return offset, min(size, available) // 2, rate
+            else:
+                f.seek(size + (size & 1), os.SEEK_CUR)
+
+
+def read_pcm16(path: str) -> Tuple[np.ndarray, int]:
+    """Mono int16 samples and rate; mono PCM16 WAV is memory-mapped instead of read."""
+    layout = pcm16_wav_layout(path)
+    if layout is not None:
+        offset, n, rate = layout
+        if n == 0:
+            return np.zeros(0, dtype=np.int16), rate
+        return np.memmap(path, dtype="<i2", mode="r", offset=offset, shape=(n,)), rate
+    samples, rate = sf.read(path, dtype="int16")
+    if samples.ndim > 1:
+        samples = samples[:, 0].copy()
+    return samples, rate
+
+
+class PcmBuffer:
+    """Preallocated int16 sample buffer for 16 kHz mono PCM16 streams.
+
+    Grows by doubling up to ``max_seconds`` so appends stay amortised O(1) with no
+    per-frame allocation; a trailing odd byte is carried over to the next frame.
+    """
+
+    SAMPLE_RATE = 16000
+
+    def __init__(self, max_seconds: float, initial_seconds: float = 30.0):
+        self.max_samples = int(max_seconds * self.SAMPLE_RATE)
+        self._data = np.empty(min(self.max_samples, int(initial_seconds * self.SAMPLE_RATE)), dtype=np.int16)
+        self._len = 0
+        self._carry = b""
+
+    def __len__(self) -> int:
+        return self._len
+
+    @property
+    def duration(self) -> float:
+        return self._len / float(self.SAMPLE_RATE)
+
+    def append(self, frame: bytes) -> None:
+        if self._carry:
+            frame = self._carry + frame
+            self._carry = b""
+        if len(frame) % 2:
+            self._carry = frame[-1:]
+            frame = frame[:-1]
+        samples = np.frombuffer(frame, dtype="<i2")
+        needed = self._len + len(samples)
+        if needed > self.max_samples:
+            raise AudioProcessingError(f"Audio too long (>{self.max_samples // self.SAMPLE_RATE}s)")
+        if needed > len(self._data):
+            grown = np.empty(min(self.max_samples, max(needed, 2 * len(self._data))), dtype=np.int16)
+            grown[: self._len] = self._data[: self._len]
+            self._data = grown
+        self._data[self._len:needed] = samples
+        self._len = needed
+
+    def samples(self) -> np.ndarray:
+        return self._data[: self._len]
+
+    def as_float32(self) -> np.ndarray:
+        """Normalised float32 view expected by faster-whisper (no ffmpeg round trip)."""
+        return self._data[: self._len].astype(np.float32) / 32768.0
+
+
+class StreamDecoder:
+    """Long-lived ffmpeg process decoding a compressed stream into a ``PcmBuffer``.
+
+    Frames are written to ffmpeg's stdin as they arrive and 16 kHz mono PCM16 is
+    read off stdout concurrently, so decode cost is spread across the session
+    instead of spiking at the end. Call ``finish`` to flush, ``aclose`` to tear down.
+    """
+
+    READ_SIZE = 64 * 1024
+    STDERR_LIMIT = 4096
+
+    def __init__(self, pcm: PcmBuffer, input_args: Sequence[str] = ()):
+        self.pcm = pcm
+        self.input_args = list(input_args)
+        self.proc: "asyncio.subprocess.Process | None" = None
+        self._reader: "asyncio.Task | None" = None
+        self._stderr_task: "asyncio.Task | None" = None
+        self._stderr = bytearray()
+        self._error: "Exception | None" = None
+
+    async def start(self) -> None:
+        cmd = [
+            FFMPEG_BIN,
+            "-hide_banner",
+            "-loglevel",
+            "error",
+            *self.input_args,
+            "-i",
+            "pipe:0",
+            "-ac",
+            "1",
+            "-ar",
+            "16000",
+            "-f",
+            "s16le",
+            "pipe:1",
+        ]
+        self.proc = await asyncio.create_subprocess_exec(
+            *cmd, stdin=asyncio.subprocess.PIPE, stdout=asyncio.subprocess.PIPE, stderr=asyncio.subprocess.PIPE
+        )
+        self._reader = asyncio.create_task(self._read_stdout())
+        self._stderr_task = asyncio.create_task(self._read_stderr())
+
+    async def _read_stdout(self) -> None:
+        assert self.proc is not None and self.proc.stdout is not None
+        try:
+            while True:
+                chunk = await self.proc.stdout.read(self.READ_SIZE)
+                if not chunk:
+                    return
+                self.pcm.append(chunk)
+        except AudioProcessingError as e:
+            self._error = e
+            self.kill()
+
+    async def _read_stderr(self) -> None:
+        assert self.proc is not None and self.proc.stderr is not None
+        while True:
+            chunk = await self.proc.stderr.read(1024)
+            if not chunk:
+                return
+            if len(self._stderr) < self.STDERR_LIMIT:
+                self._stderr.extend(chunk[: self.STDERR_LIMIT - len(self._stderr)])
+
+    async def feed(self, data: bytes) -> None:
+        if self._error is not None:
+            raise self._error
+        assert self.proc is not None and self.proc.stdin is not None
+        try:
+            self.proc.stdin.write(data)
+            await self.proc.stdin.drain()  # backpressure if ffmpeg falls behind
+        except (BrokenPipeError, ConnectionResetError):
+            raise AudioProcessingError(f"ffmpeg failed: {self._stderr.decode(errors='ignore')[:400]}")
+
+    async def finish(self) -> None:
+        """Close stdin and wait until every decoded sample is in the buffer."""
+        assert self.proc is not None and self.proc.stdin is not None
+        try:
+            self.proc.stdin.close()
+        except (BrokenPipeError, ConnectionResetError):  # pragma: no cover - process already gone
+            pass
+        await asyncio.gather(*(t for t in (self._reader, self._stderr_task) if t is not None))
+        returncode = await self.proc.wait()
+        if self._error is not None:
+            raise self._error
+        if returncode != 0:
+            raise AudioProcessingError(f"ffmpeg failed: {self._stderr.decode(errors='ignore')[:400]}")
+
+    def kill(self) -> None:
+        if self.proc is not None and self.proc.returncode is None:
+            try:
+                self.proc.kill()
+            except ProcessLookupError:  # pragma: no cover
+                pass
+
+    async def aclose(self) -> None:
+        """Tear down on disconnect: kill ffmpeg and reap it so no zombie is left."""
+        self.kill()
+        for task in (self._reader, self._stderr_task):
+            if task is not None and not task.done():
+                task.cancel()
+        if self.proc is not None:
+            try:
+                await self.proc.wait()
+            except Exception:  # pragma: no cover
+                pass
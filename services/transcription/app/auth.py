@@ -1,54 +1,66 @@
-import time
-from typing import Any, Dict
-import httpx
+from typing import Any, Dict, Optional
 from jose import jwt
 from fastapi import HTTPException, Header
 
 from .config import get_settings
+from .jwks import JWKSClient, JWKSUnavailable, KeyRing, UnknownKid
+from .tracing import span
 
-_JWKS_CACHE: Dict[str, Any] = {"keys": None, "fetched_at": 0}
+_jwks_client: Optional[JWKSClient] = None
+_keyring: Optional[KeyRing] = None
 
 
-async def _fetch_jwks():  # pragma: no cover - external call
-    settings = get_settings()
-    if not settings.jwks_url:
-        raise RuntimeError("JWKS_URL not configured")
-    async with httpx.AsyncClient(timeout=5.0) as client:
-        r = await client.get(settings.jwks_url)
-        r.raise_for_status()
-        return r.json()
+def get_jwks_client() -> JWKSClient:
+    global _jwks_client
+    if _jwks_client is None:
+        settings = get_settings()
+        if not settings.jwks_url:
+            raise RuntimeError("JWKS_URL not configured")
+        _jwks_client = JWKSClient(settings.jwks_url, ttl=settings.jwks_cache_ttl, max_stale=settings.jwks_max_stale)
+    return _jwks_client
+
+
+def get_keyring() -> KeyRing:
+    global _keyring
+    if _keyring is None:
+        _keyring = KeyRing(get_jwks_client())
+    return _keyring
+
+
+async def close_jwks() -> None:
+    if _jwks_client is not None:
+        await _jwks_client.aclose()
 
 
 async def get_jwks():
-    now = time.time()
-    if _JWKS_CACHE["keys"] and now - _JWKS_CACHE["fetched_at"] < 300:
-        return _JWKS_CACHE["keys"]
-    data = await _fetch_jwks()
-    _JWKS_CACHE["keys"] = data
-    _JWKS_CACHE["fetched_at"] = now
-    return data
+    return await get_jwks_client().get()
 
 
 async def verify_jwt(authorization: str = Header(None)) -> Dict[str, Any]:
+    with span("jwt.verify"):
+        return await _verify(authorization)
+
+
+async def _verify(authorization: Optional[str]) -> Dict[str, Any]:
     if not authorization or not authorization.lower().startswith("bearer "):
         raise HTTPException(status_code=401, detail="Missing bearer token")
     token = authorization.split(" ", 1)[1].strip()
     settings = get_settings()
-    jwks = await get_jwks()
-    unverified = jwt.get_unverified_header(token)
-    kid = unverified.get("kid")
-    key = None
-    for k in jwks.get("keys", []):
-        if k.get("kid") == kid:
-            key = k
-            break
-    if not key:
+    try:
+        kid = jwt.get_unverified_header(token).get("kid")
+    except Exception as e:
+        raise HTTPException(status_code=401, detail=f"Invalid token: {e}")
+    try:
+        alg, key = await get_keyring().get(kid)
+    except UnknownKid:
         raise HTTPException(status_code=401, detail="Signing key not found")
+    except JWKSUnavailable as e:
+        raise HTTPException(status_code=503, detail=str(e))
     try:
         claims = jwt.decode(
             token,
             key,
-            algorithms=[key.get("alg", "RS256")],
+            algorithms=[alg],
             audience=settings.jwt_audience,
             issuer=settings.jwt_issuer,
         )
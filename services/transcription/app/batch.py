@@ -0,0 +1,211 @@
+"""Request parsing for ``POST /v1/transcribe/batch``.
+
+A batch arrives either as a multipart body with any number of file parts or as
+a single tar (optionally compressed) or zip stream. Every file is spooled to
+its own temp path before processing starts, so the per-file pipeline can run
+concurrently and independently of the request body.
+
+Both are read from ``request.stream()`` with the file and byte budget applied
+per chunk: multipart parts are written straight to their temp files (not
+buffered by the framework first), so an oversized body is cut off as soon as
+it crosses ``max_bytes``.
+"""
+from __future__ import annotations
+import os
+import tarfile
+import tempfile
+import zipfile
+from typing import BinaryIO, List, Optional, Tuple
+
+from fastapi import Request
+from fastapi.concurrency import run_in_threadpool
+from multipart.multipart import MultipartParser, parse_options_header
+
+TAR_TYPES = {"application/x-tar", "application/tar", "application/gzip", "application/x-gzip",
+             "application/x-bzip2", "application/x-xz"}
+ZIP_TYPES = {"application/zip", "application/x-zip-compressed"}
+_CHUNK = 1024 * 1024
+
+
+class BatchError(Exception):
+    def __init__(self, detail: str, status_code: int = 400):
+        super().__init__(detail)
+        self.detail = detail
+        self.status_code = status_code
+
+
+class _Budget:
+    def __init__(self, max_files: int, max_bytes: int):
+        self.max_files = max_files
+        self.max_bytes = max_bytes
+        self.files = 0
+        self.bytes = 0
+
+    def add_file(self) -> None:
+        self.files += 1
+        if self.files > self.max_files:
+            raise BatchError(f"Too many files in batch (max {self.max_files})", 413)
+
+    def add_bytes(self, n: int) -> None:
+        self.bytes += n
+        if self.bytes > self.max_bytes:
+            raise BatchError(f"Batch exceeds {self.max_bytes} bytes", 413)
+
+
+def _spool(src: BinaryIO, budget: _Budget) -> str:
+    fd, path = tempfile.mkstemp()
+    try:
+        with os.fdopen(fd, "wb") as out:
+            while True:
+                chunk = src.read(_CHUNK)
+                if not chunk:
+                    break
+                budget.add_bytes(len(chunk))
+                out.write(chunk)
+    except BaseException:
+        os.remove(path)
+        raise
+    return path
+
+
+def _extract(archive_path: str, is_zip: bool, budget: _Budget, items: List[Tuple[str, str]]) -> None:
+    try:
+        if is_zip:
+            with zipfile.ZipFile(archive_path) as zf:
+                for info in zf.infolist():
+                    if info.is_dir():
+                        continue
+                    budget.add_file()
+                    with zf.open(info) as src:
+                        items.append((info.filename, _spool(src, budget)))
+        else:
+            with tarfile.open(archive_path, "r:*") as tf:
+                for member in tf:
+                    if not member.isfile():
+                        continue  # links and devices are never followed
+                    budget.add_file()
+                    src = tf.extractfile(member)
+                    if src is not None:
+                        items.append((member.name, _spool(src, budget)))
+    except (zipfile.BadZipFile, tarfile.TarError) as e:
+        raise BatchError(f"Unreadable archive: {e}")
+
+
+class _MultipartSpooler:
+    """python-multipart callbacks writing each file part to its own temp file."""
+
+    def __init__(self, boundary: bytes, budget: _Budget, items: List[Tuple[str, str]]):
+        self.budget = budget
+        self.items = items
+        self._headers: List[Tuple[bytes, bytes]] = []
+        self._field = b""
+        self._value = b""
+        self._out: Optional[BinaryIO] = None
+        self._path: Optional[str] = None
+        self._filename = ""
+        self.parser = MultipartParser(boundary, {
+            "on_part_begin": self._part_begin,
+            "on_header_field": self._header_field,
+            "on_header_value": self._header_value,
+            "on_header_end": self._header_end,
+            "on_headers_finished": self._headers_finished,
+            "on_part_data": self._part_data,
+            "on_part_end": self._part_end,
+        })
+
+    def _part_begin(self) -> None:
+        self._headers = []
+
+    def _header_field(self, data: bytes, start: int, end: int) -> None:
+        self._field += data[start:end]
+
+    def _header_value(self, data: bytes, start: int, end: int) -> None:
+        self._value += data[start:end]
+
+    def _header_end(self) -> None:
+        self._headers.append((self._field.lower(), self._value))
+        self._field = self._value = b""
+
+    def _headers_finished(self) -> None:
+        disposition = dict(self._headers).get(b"content-disposition", b"")
+        _, options = parse_options_header(disposition)
+        if b"filename" not in options:
+            return  # plain form fields are ignored (their bytes still count)
+        self.budget.add_file()
+        self._filename = options[b"filename"].decode("utf-8", "replace") or f"file-{len(self.items)}"
+        fd, self._path = tempfile.mkstemp()
+        self._out = os.fdopen(fd, "wb")
+
+    def _part_data(self, data: bytes, start: int, end: int) -> None:
+        self.budget.add_bytes(end - start)
+        if self._out is not None:
+            self._out.write(data[start:end])
+
+    def _part_end(self) -> None:
+        if self._out is not None:
+            self._out.close()
+            self.items.append((self._filename, self._path))  # type: ignore[arg-type]
+            self._out = self._path = None
+
+    def feed(self, chunk: bytes) -> None:
+        self.parser.write(chunk)
+
+    def close(self) -> None:
+        """Drop a part cut off mid-body (the completed ones are in ``items``)."""
+        if self._out is not None:
+            self._out.close()
+            os.remove(self._path)  # type: ignore[arg-type]
+            self._out = self._path = None
+
+
+async def receive_batch(request: Request, max_files: int, max_bytes: int) -> List[Tuple[str, str]]:
+    """Spool every file in the request to disk; returns ``(filename, temp_path)`` pairs.
+
+    Extracted bytes count against ``max_bytes`` as well, which bounds archive bombs.
+    The caller owns the temp files; on error they are removed here.
+    """
+    content_type = request.headers.get("content-type", "").split(";")[0].strip().lower()
+    budget = _Budget(max_files, max_bytes)
+    items: List[Tuple[str, str]] = []
+    try:
+        if content_type == "multipart/form-data":
+            _, params = parse_options_header(request.headers["content-type"])
+            if b"boundary" not in params:
+                raise BatchError("Multipart body without a boundary")
+            spooler = _MultipartSpooler(params[b"boundary"], budget, items)
+            try:
+                async for chunk in request.stream():
+                    spooler.feed(chunk)
+                spooler.parser.finalize()
+            except ValueError as e:  # python-multipart parse errors
+                raise BatchError(f"Malformed multipart body: {e}")
+            finally:
+                spooler.close()
+        elif content_type in TAR_TYPES or content_type in ZIP_TYPES:
+            archive_budget = _Budget(1, max_bytes)
+            fd, archive_path = tempfile.mkstemp()
+            try:
+                with os.fdopen(fd, "wb") as out:
+                    async for chunk in request.stream():
+                        archive_budget.add_bytes(len(chunk))
+                        out.write(chunk)
+                await run_in_threadpool(_extract, archive_path, content_type in ZIP_TYPES, budget, items)
+            finally:
+                os.remove(archive_path)
+        else:
+            raise BatchError("Expected multipart/form-data, tar or zip body", 415)
+    except BaseException:
+        cleanup(items)
+        raise
+    return items
+
+
+def cleanup(items: List[Tuple[str, str]]) -> None:
+    for _name, path in items:
+        try:
+            os.remove(path)
+        except OSError:
+            pass
+
+
+__all__ = ["BatchError", "receive_batch", "cleanup", "TAR_TYPES", "ZIP_TYPES"]
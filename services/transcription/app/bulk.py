@@ -0,0 +1,292 @@
+"""Offline bulk transcription.
+
+Backfills archived recordings without going through HTTP. Files are transcoded
+and transcribed across a process pool (one model replica per worker) using the
+same ``transcode_to_wav_16k`` / ``run_transcription`` / redaction functions as the
+online path, so records match ``POST /v1/transcribe`` responses field for field.
+
+    python -m app.bulk /archive/2023 --output /data/backfill --workers 4
+    python -m app.bulk manifest.jsonl --output /data/backfill   # {"path": ..., "id": ...} per line
+
+Results go to ``<output>/part-NNNNN.jsonl.gz`` (a new part per run, so an
+interrupted run can only truncate its own part; every record is sync-flushed
+before it is checkpointed and stays readable with ``zcat``), and every finished
+file is appended to ``<output>/checkpoint.jsonl``. Re-running the same command
+skips files already in the checkpoint whose size and mtime are unchanged.
+"""
+from __future__ import annotations
+import argparse
+import asyncio
+import gzip
+import json
+import logging
+import multiprocessing
+import os
+import sys
+import time
+from concurrent.futures import FIRST_COMPLETED, Future, ProcessPoolExecutor, wait
+from concurrent.futures.process import BrokenProcessPool
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+from .audio import transcode_to_wav_16k, AudioProcessingError
+from .config import get_settings
+from .model import run_transcription, get_model
+from .redaction import redact_segments, redact_text
+from .schemas import TranscriptionResponse, Segment
+
+logger = logging.getLogger("transcription.bulk")
+
+AUDIO_EXTENSIONS = {".wav", ".mp3", ".m4a", ".mp4", ".webm", ".ogg", ".opus", ".flac", ".aac", ".amr", ".wma"}
+
+
+class Entry:
+    __slots__ = ("key", "path")
+
+    def __init__(self, key: str, path: Path):
+        self.key = key
+        self.path = path
+
+    def fingerprint(self) -> Dict[str, int]:
+        try:
+            st = self.path.stat()
+        except OSError:
+            return {}
+        return {"size": st.st_size, "mtime_ns": st.st_mtime_ns}
+
+
+def discover(source: Path) -> Iterator[Entry]:
+    """Yield entries from a directory tree or a manifest (plain path list or JSONL)."""
+    if source.is_dir():
+        for p in sorted(source.rglob("*")):
+            if p.is_file() and p.suffix.lower() in AUDIO_EXTENSIONS:
+                yield Entry(p.relative_to(source).as_posix(), p)
+        return
+    base = source.parent
+    with source.open("r", encoding="utf-8") as fh:
+        for line in fh:
+            line = line.strip()
+            if not line or line.startswith("#"):
+                continue
+            if line.startswith("{"):
+                item = json.loads(line)
+                path = Path(item["path"])
+                key = str(item.get("id") or item["path"])
+            else:
+                path = Path(line)
+                key = line
+            yield Entry(key, path if path.is_absolute() else base / path)
+
+
+class Checkpoint:
+    """Append-only record of finished files; last entry per key wins."""
+
+    def __init__(self, path: Path):
+        self.path = path
+        self._done: Dict[str, Dict[str, Any]] = {}
+        if path.exists():
+            with path.open("r", encoding="utf-8") as fh:
+                for line in fh:
+                    try:
+                        rec = json.loads(line)
+                    except ValueError:
+                        continue  # torn final line from a crash
+                    self._done[rec["key"]] = rec
+        self._fh = path.open("a", encoding="utf-8")
+
+    def is_done(self, entry: Entry, retry_errors: bool = False) -> bool:
+        rec = self._done.get(entry.key)
+        if rec is None:
+            return False
+        if retry_errors and rec.get("status") != "ok":
+            return False
+        return rec.get("fingerprint") == entry.fingerprint()
+
+    def mark(self, entry: Entry, fingerprint: Dict[str, int], status: str, part: str):
+        rec = {"key": entry.key, "status": status, "fingerprint": fingerprint, "part": part, "ts": time.time()}
+        self._fh.write(json.dumps(rec, separators=(",", ":")) + "\n")
+        self._fh.flush()
+        os.fsync(self._fh.fileno())
+        self._done[entry.key] = rec
+
+    def close(self):
+        self._fh.close()
+
+
+def _init_worker(model_size: Optional[str], cpu_threads: Optional[int]):
+    settings = get_settings()
+    if model_size:
+        settings.model_size = model_size
+    if cpu_threads is not None:
+        settings.cpu_threads = cpu_threads
+    get_model()  # load the replica once per worker, before the first file
+
+
+def transcribe_file(path: str, max_seconds: Optional[float]) -> Dict[str, Any]:
+    """Transcode + transcribe + redact one file exactly like the online endpoint."""
+    settings = get_settings()
+    wav_path = None
+    try:
+        wav_path, duration = asyncio.run(transcode_to_wav_16k(path))
+        if max_seconds is not None and duration > max_seconds:
+            return {"status": "error", "error": f"Audio too long (>{max_seconds}s)"}
+        result = run_transcription(wav_path)
+        segments = result["segments"]
+        text = result["text"]
+        redaction_applied = False
+        if settings.enable_redaction:
+            segments = redact_segments(segments)
+            text = redact_text(text)
+            redaction_applied = True
+        response = TranscriptionResponse(
+            filename=os.path.basename(path),
+            language=result["language"],
+            duration_seconds=result["duration"],
+            model=result["model_size"],
+            processing_ms=result["processing_ms"],
+            redaction_applied=redaction_applied,
+            text=text,
+            segments=[Segment(**s) for s in segments],
+        )
+        payload = response.model_dump()
+        payload.pop("timings", None)
+        return {"status": "ok", "result": payload}
+    except AudioProcessingError as e:
+        return {"status": "error", "error": str(e)}
+    finally:
+        if wav_path:
+            try:
+                os.remove(wav_path)
+            except OSError:
+                pass
+
+
+def _next_part(out_dir: Path) -> Path:
+    existing = sorted(out_dir.glob("part-*.jsonl.gz"))
+    n = int(existing[-1].name[5:10]) + 1 if existing else 0
+    return out_dir / f"part-{n:05d}.jsonl.gz"
+
+
+def _default_workers(cpu_threads: int) -> int:
+    per_replica = cpu_threads or 4
+    return max(1, (os.cpu_count() or 1) // per_replica)
+
+
+def run(entries: List[Entry], out_dir: Path, *, workers: int, model_size: Optional[str] = None,
+        cpu_threads: Optional[int] = None, max_seconds: Optional[float] = None,
+        retry_errors: bool = False) -> Dict[str, int]:
+    out_dir.mkdir(parents=True, exist_ok=True)
+    checkpoint = Checkpoint(out_dir / "checkpoint.jsonl")
+    pending = [e for e in entries if not checkpoint.is_done(e, retry_errors)]
+    stats = {"total": len(entries), "skipped": len(entries) - len(pending), "ok": 0, "error": 0}
+    if not pending:
+        checkpoint.close()
+        return stats
+    part = _next_part(out_dir)
+    started = time.time()
+
+    def _record(out, entry: Entry, fingerprint: Dict[str, int], outcome: Dict[str, Any]):
+        status = outcome["status"]
+        rec = {"key": entry.key, "path": str(entry.path), "status": status}
+        if status == "ok":
+            rec.update(outcome["result"])
+        else:
+            rec["error"] = outcome.get("error")
+        out.write(json.dumps(rec, ensure_ascii=False, separators=(",", ":")) + "\n")
+        out.flush()  # sync-flush the gzip stream so the record is durable before checkpointing
+        checkpoint.mark(entry, fingerprint, status, part.name)
+        stats[status if status == "ok" else "error"] += 1
+        done = stats["ok"] + stats["error"]
+        if done % 50 == 0 or done == len(pending):
+            logger.info("bulk progress %d/%d (%.1f files/s)", done, len(pending), done / max(time.time() - started, 1e-6))
+
+    try:
+        with gzip.open(part, "wt", encoding="utf-8") as out:
+            if workers <= 0:
+                _init_worker(model_size, cpu_threads)
+                for entry in pending:
+                    fp = entry.fingerprint()
+                    try:
+                        outcome = transcribe_file(str(entry.path), max_seconds)
+                    except Exception as e:  # model failure: same handling as the pool path
+                        outcome = {"status": "error", "error": f"{type(e).__name__}: {e}"}
+                    _record(out, entry, fp, outcome)
+            else:
+                ctx = multiprocessing.get_context("spawn")
+
+                def new_pool() -> ProcessPoolExecutor:
+                    return ProcessPoolExecutor(max_workers=workers, mp_context=ctx, initializer=_init_worker,
+                                               initargs=(model_size, cpu_threads))
+
+                pool = new_pool()
+                try:
+                    inflight: Dict[Future, Tuple[Entry, Dict[str, int]]] = {}
+                    queue = iter(pending)
+                    while True:
+                        while len(inflight) < workers * 2:
+                            entry = next(queue, None)
+                            if entry is None:
+                                break
+                            try:
+                                fut = pool.submit(transcribe_file, str(entry.path), max_seconds)
+                            except BrokenProcessPool:
+                                # A worker died (e.g. OOM-killed in the model); its in-flight futures
+                                # fail below and the rest of the run continues on a fresh pool
+                                logger.warning("bulk worker pool broke; starting a new one")
+                                pool.shutdown(wait=False, cancel_futures=True)
+                                pool = new_pool()
+                                fut = pool.submit(transcribe_file, str(entry.path), max_seconds)
+                            inflight[fut] = (entry, entry.fingerprint())
+                        if not inflight:
+                            break
+                        finished, _ = wait(inflight, return_when=FIRST_COMPLETED)
+                        for fut in finished:
+                            entry, fp = inflight.pop(fut)
+                            try:
+                                outcome = fut.result()
+                            except Exception as e:  # worker crash or model failure
+                                outcome = {"status": "error", "error": f"{type(e).__name__}: {e}"}
+                            _record(out, entry, fp, outcome)
+                finally:
+                    pool.shutdown()
+    finally:
+        checkpoint.close()
+    return stats
+
+
+def _parse_args(argv=None):
+    p = argparse.ArgumentParser(prog="python -m app.bulk", description="Offline bulk transcription")
+    p.add_argument("source", type=Path, help="Directory of audio files or manifest (paths or JSONL with path/id)")
+    p.add_argument("--output", "-o", type=Path, required=True, help="Output directory for parts + checkpoint")
+    p.add_argument("--workers", "-j", type=int, default=None,
+                   help="Model replicas (processes); 0 runs in-process. Default: cores / threads per replica")
+    p.add_argument("--cpu-threads", type=int, default=None, help="CTranslate2 threads per replica")
+    p.add_argument("--model-size", default=None, help="Override MODEL_SIZE")
+    p.add_argument("--max-seconds", type=float, default=None,
+                   help="Skip files longer than this (default: MAX_AUDIO_SECONDS; 0 disables)")
+    p.add_argument("--retry-errors", action="store_true", help="Re-run files whose last attempt failed")
+    return p.parse_args(argv)
+
+
+def main(argv=None) -> int:
+    args = _parse_args(argv)
+    settings = get_settings()
+    logging.basicConfig(level=settings.log_level.upper())
+    cpu_threads = args.cpu_threads if args.cpu_threads is not None else settings.cpu_threads
+    workers = args.workers if args.workers is not None else _default_workers(cpu_threads)
+    if args.max_seconds is None:
+        max_seconds: Optional[float] = settings.max_audio_seconds
+    else:
+        max_seconds = args.max_seconds or None
+    entries = list(discover(args.source))
+    stats = run(entries, args.output, workers=workers, model_size=args.model_size, cpu_threads=cpu_threads,
+                max_seconds=max_seconds, retry_errors=args.retry_errors)
+    print(json.dumps(stats))
+    return 0 if stats["error"] == 0 else 2
+
+
+__all__ = ["discover", "Checkpoint", "transcribe_file", "run", "main"]
+
+
+if __name__ == "__main__":
+    sys.exit(main())
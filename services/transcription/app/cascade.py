@@ -0,0 +1,213 @@
+"""Two-tier model cascade for live WebSocket sessions.
+
+While audio streams in, the small ``PARTIAL_MODEL_SIZE`` model re-decodes the
+uncommitted tail every ``CASCADE_PARTIAL_INTERVAL_SECONDS`` and the result is
+pushed to the client as a ``partial`` caption. Once the tail grows past
+``CASCADE_COMMIT_SECONDS`` it is committed at a segment boundary and the
+committed window is re-decoded in the background with the configured (large)
+model. The final transcript stitches those second-pass windows together with a
+large-model decode of whatever is left at ``end``.
+
+Under load (inference queue deeper than ``CASCADE_MAX_QUEUE_DEPTH`` or too many
+second passes already running) a committed window keeps its small-model
+segments instead, so live captions never wait behind the accuracy pass.
+"""
+from __future__ import annotations
+import asyncio
+import logging
+from dataclasses import dataclass, field
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+
+import numpy as np
+
+from .audio import PcmBuffer
+from .config import get_settings
+from .incremental import MIN_TAIL_SECONDS, quietest_frame
+from .metrics import REGISTRY, Counter, QUEUE_DEPTH, StageTimer, run_timed
+from .model import run_partial_transcription, run_transcription
+from .redaction import redact_segments, redact_text
+
+logger = logging.getLogger(__name__)
+
+# Keep this much unconfirmed audio after a commit point; the last words of a partial are the least stable
+COMMIT_GUARD_SECONDS = 1.0
+
+CASCADE_PASSES: Counter = REGISTRY.register(  # type: ignore[assignment]
+    Counter("transcription_cascade_passes_total", "Live cascade decodes by pass.", ["kind"])
+)
+
+_second_pass_inflight = 0
+
+
+def second_pass_allowed() -> bool:
+    """Budget check: skip the accuracy pass when inference is already backed up."""
+    settings = get_settings()
+    return (
+        QUEUE_DEPTH.value() <= settings.cascade_max_queue_depth
+        and _second_pass_inflight < settings.cascade_max_second_pass
+    )
+
+
+@dataclass
+class _Window:
+    start: int  # samples
+    end: int
+    segments: List[Dict[str, Any]]  # absolute times
+    model_size: str
+    language: Optional[str] = None
+    task: Optional["asyncio.Task[None]"] = field(default=None, repr=False)
+
+
+def _shift(segments: List[Dict[str, Any]], offset: float) -> List[Dict[str, Any]]:
+    return [{**s, "start": s["start"] + offset, "end": s["end"] + offset} for s in segments]
+
+
+def _redacted(segments: List[Dict[str, Any]], text: str):
+    if get_settings().enable_redaction:
+        return redact_segments(segments), redact_text(text)
+    return segments, text
+
+
+def _join(segments: List[Dict[str, Any]]) -> str:
+    return " ".join(s["text"] for s in segments if s.get("text")).strip()
+
+
+class CascadeStreamer:
+    """Partial captions and windowed second-pass decoding for one ``PcmBuffer``."""
+
+    def __init__(self, pcm: PcmBuffer, send: Callable[[Dict[str, Any]], Awaitable[None]]):
+        self.pcm = pcm
+        self.send = send
+        self.rate = PcmBuffer.SAMPLE_RATE
+        self.committed = 0
+        self.last_partial = 0
+        self.partial_task: Optional["asyncio.Task[None]"] = None
+        self.windows: List[_Window] = []
+        self.language: Optional[str] = None
+        # Background decodes go through run_timed so they count towards QUEUE_DEPTH (the load shedder's input)
+        self.timer = StageTimer("/v1/ws")
+
+    def _audio(self, start: int, end: int) -> np.ndarray:
+        return self.pcm.samples()[start:end].astype(np.float32) / 32768.0
+
+    def on_audio(self) -> None:
+        """Called after samples are appended; starts a partial decode when one is due."""
+        if self.partial_task is not None and not self.partial_task.done():
+            return  # a slow partial model throttles itself rather than queueing
+        n = len(self.pcm)
+        if n - self.last_partial < get_settings().cascade_partial_interval_seconds * self.rate:
+            return
+        self.last_partial = n
+        self.partial_task = asyncio.create_task(self._partial(n))
+
+    async def _partial(self, upto: int) -> None:
+        start = self.committed
+        try:
+            result = await run_timed(self.timer, "partial", run_partial_transcription, self._audio(start, upto))
+            CASCADE_PASSES.inc(kind="partial")
+            self.language = self.language or result.get("language")
+            segments = _shift(result["segments"], start / self.rate)
+            shown, text = _redacted(segments, result["text"])
+            await self.send({"type": "partial", "start": start / self.rate, "end": upto / self.rate,
+                             "text": text, "segments": shown})
+            if (upto - start) / self.rate >= get_settings().cascade_commit_seconds:
+                self._commit(start, upto, segments, result["model_size"])
+        except asyncio.CancelledError:
+            raise
+        except Exception:
+            logger.warning("Partial caption decode failed", exc_info=True)
+
+    def _cut(self, start: int, upto: int, segments: List[Dict[str, Any]]) -> Optional[int]:
+        """Commit point in samples: the quiet gap after the last stable segment."""
+        limit = upto / self.rate - COMMIT_GUARD_SECONDS
+        ends = [float(s["end"]) for s in segments if float(s["end"]) <= limit]
+        if ends:
+            end = max(ends)
+            gap = min((float(s["start"]) for s in segments if float(s["start"]) >= end), default=limit)
+            cut = quietest_frame(self.pcm.samples(), self.rate, end, max(end, min(gap, limit)))
+            return int((cut if cut is not None else end) * self.rate)
+        if not segments or (upto - start) / self.rate >= 2 * get_settings().cascade_commit_seconds:
+            # Nothing said, or one unbroken utterance: force a commit to bound the partial window
+            return int(limit * self.rate)
+        return None
+
+    def _commit(self, start: int, upto: int, segments: List[Dict[str, Any]], model_size: str) -> None:
+        cut = self._cut(start, upto, segments)
+        if cut is None or cut <= start:
+            return
+        kept = [s for s in segments if float(s["end"]) <= cut / self.rate]
+        window = _Window(start, cut, kept, model_size, self.language)
+        self.committed = cut
+        self.windows.append(window)
+        if second_pass_allowed():
+            window.task = asyncio.create_task(self._second_pass(window))
+        else:
+            CASCADE_PASSES.inc(kind="skipped")
+            window.task = asyncio.create_task(self._announce(window, second_pass=False))
+
+    async def _second_pass(self, window: _Window) -> None:
+        global _second_pass_inflight
+        _second_pass_inflight += 1
+        try:
+            result = await run_timed(self.timer, "second_pass", run_transcription,
+                                     self._audio(window.start, window.end))
+        except Exception:
+            logger.warning("Second-pass decode failed; keeping partial segments", exc_info=True)
+            await self._announce(window, second_pass=False)
+            return
+        finally:
+            _second_pass_inflight -= 1
+        CASCADE_PASSES.inc(kind="second")
+        window.segments = _shift(result["segments"], window.start / self.rate)
+        window.model_size = result["model_size"]
+        window.language = result.get("language") or window.language
+        await self._announce(window, second_pass=True)
+
+    async def _announce(self, window: _Window, second_pass: bool) -> None:
+        shown, text = _redacted(window.segments, _join(window.segments))
+        try:
+            await self.send({"type": "committed", "start": window.start / self.rate, "end": window.end / self.rate,
+                             "text": text, "segments": shown, "model_size": window.model_size,
+                             "second_pass": second_pass})
+        except Exception:
+            pass  # client gone; the window still counts towards the final transcript
+
+    async def finish(self, timer: StageTimer) -> Dict[str, Any]:
+        """Decode the uncommitted tail with the large model and stitch the final result."""
+        if self.partial_task is not None:
+            self.partial_task.cancel()
+        n = len(self.pcm)
+        tail: List[Dict[str, Any]] = []
+        model_size = get_settings().model_size
+        language = None
+        processing_ms = 0
+        if (n - self.committed) / self.rate >= MIN_TAIL_SECONDS or not self.windows:
+            result = await run_timed(timer, "inference", run_transcription, self._audio(self.committed, n))
+            tail = _shift(result["segments"], self.committed / self.rate)
+            model_size, language, processing_ms = result["model_size"], result["language"], result["processing_ms"]
+        pending = [w.task for w in self.windows if w.task is not None]
+        if pending:
+            with timer.stage("second_pass_wait"):
+                await asyncio.gather(*pending, return_exceptions=True)
+        segments: List[Dict[str, Any]] = []
+        for window in self.windows:
+            segments.extend(window.segments)
+            language = language or window.language
+        segments.extend(tail)
+        segments = [{**s, "id": i} for i, s in enumerate(segments)]
+        return {
+            "language": language or self.language or "en",
+            "duration": n / self.rate,
+            "segments": segments,
+            "text": _join(segments),
+            "processing_ms": processing_ms,
+            "model_size": model_size,
+        }
+
+    def cancel(self) -> None:
+        for task in [self.partial_task] + [w.task for w in self.windows]:
+            if task is not None and not task.done():
+                task.cancel()
+
+
+__all__ = ["CascadeStreamer", "second_pass_allowed", "CASCADE_PASSES", "COMMIT_GUARD_SECONDS"]
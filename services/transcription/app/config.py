@@ -5,11 +5,45 @@ from functools import lru_cache
 class Settings:
     model_size: str = os.getenv("MODEL_SIZE", "base")
     device: str = os.getenv("DEVICE", "cpu")
+    cpu_threads: int = int(os.getenv("CPU_THREADS", "0"))  # 0 = CTranslate2 default
     enable_redaction: bool = os.getenv("ENABLE_REDACTION", "false").lower() == "true"
     max_audio_seconds: int = int(os.getenv("MAX_AUDIO_SECONDS", "900"))  # 15 min default
+    enable_incremental: bool = os.getenv("ENABLE_INCREMENTAL", "false").lower() == "true"
+    incremental_window_seconds: float = float(os.getenv("INCREMENTAL_WINDOW_SECONDS", "1.0"))
+    incremental_min_reuse_seconds: float = float(os.getenv("INCREMENTAL_MIN_REUSE_SECONDS", "30"))
+    ws_stream_decode: bool = os.getenv("WS_STREAM_DECODE", "true").lower() == "true"
+    ws_max_channels: int = int(os.getenv("WS_MAX_CHANNELS", "8"))
+    ws_channel_queue_frames: int = int(os.getenv("WS_CHANNEL_QUEUE_FRAMES", "64"))
+    ws_channel_max_bytes: int = int(os.getenv("WS_CHANNEL_MAX_BYTES", str(64 * 1024 * 1024)))
+    ws_ack_bytes: int = int(os.getenv("WS_ACK_BYTES", str(64 * 1024)))
+    ws_resume_ttl_seconds: int = int(os.getenv("WS_RESUME_TTL_SECONDS", "120"))
+    ws_resume_max_sessions: int = int(os.getenv("WS_RESUME_MAX_SESSIONS", "256"))
+    partial_model_size: str = os.getenv("PARTIAL_MODEL_SIZE", "tiny")
+    cascade_partial_interval_seconds: float = float(os.getenv("CASCADE_PARTIAL_INTERVAL_SECONDS", "1.0"))
+    cascade_commit_seconds: float = float(os.getenv("CASCADE_COMMIT_SECONDS", "15"))
+    cascade_max_queue_depth: int = int(os.getenv("CASCADE_MAX_QUEUE_DEPTH", "2"))
+    cascade_max_second_pass: int = int(os.getenv("CASCADE_MAX_SECOND_PASS", "2"))
+    transcript_store_path: str = os.getenv("TRANSCRIPT_STORE_PATH", "")  # empty = store disabled
+    ingest_root: str = os.getenv("INGEST_ROOT", "")  # empty = file-reference ingestion disabled
+    ingest_scope: str = os.getenv("INGEST_SCOPE", "transcribe:ingest")
+    rate_limit_per_minute: int = int(os.getenv("RATE_LIMIT_PER_MINUTE", "20"))  # per user; a batch costs one per file
+    batch_max_files: int = int(os.getenv("BATCH_MAX_FILES", "20"))
+    batch_max_bytes: int = int(os.getenv("BATCH_MAX_BYTES", str(256 * 1024 * 1024)))
+    batch_concurrency: int = int(os.getenv("BATCH_CONCURRENCY", "4"))
+    workers: int = int(os.getenv("WEB_CONCURRENCY", "0"))  # app.serve; 0 = auto from cores and memory
+    worker_memory_mb: int = int(os.getenv("WORKER_MEMORY_MB", "0"))  # 0 = estimate from MODEL_SIZE
+    graceful_timeout: int = int(os.getenv("GRACEFUL_TIMEOUT", "30"))
+    worker_boot_timeout: int = int(os.getenv("WORKER_BOOT_TIMEOUT", "300"))
+    memory_sample_seconds: float = float(os.getenv("MEMORY_SAMPLE_SECONDS", "5"))
+    max_rss_mb: int = int(os.getenv("MAX_RSS_MB", "0"))  # 0 = no RSS watermark
+    max_requests: int = int(os.getenv("MAX_REQUESTS", "0"))  # 0 = no request-count recycling
+    max_requests_jitter: int = int(os.getenv("MAX_REQUESTS_JITTER", "0"))
+    profiler_role: str = os.getenv("PROFILER_ROLE", "admin")
     jwt_issuer: str | None = os.getenv("JWT_ISSUER")
     jwt_audience: str | None = os.getenv("JWT_AUDIENCE")
     jwks_url: str | None = os.getenv("JWKS_URL")
+    jwks_cache_ttl: int = int(os.getenv("JWKS_CACHE_TTL", "300"))  # when the issuer sends no max-age
+    jwks_max_stale: int = int(os.getenv("JWKS_MAX_STALE", "3600"))  # serve last good keys while issuer is down
     redis_url: str | None = os.getenv("REDIS_URL", "redis://localhost:6379/0")
     log_level: str = os.getenv("LOG_LEVEL", "info")
 
@@ -0,0 +1,228 @@
+"""Incremental re-transcription for growing recordings.
+
+Recording clients re-upload the same session file as it grows (10 min, then 12,
+then 15). The decoded 16 kHz PCM is fingerprinted in fixed windows; when a new
+upload for the same ``sub`` shares a window prefix with a recently transcribed
+one, cached segments up to a safe silence boundary inside that prefix are reused
+and only the tail is sent to the model.
+
+The cache is per-process and in memory: it holds un-redacted transcript text, so
+it is deliberately not written to Redis or disk.
+"""
+from __future__ import annotations
+import hashlib
+import os
+import tempfile
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+import numpy as np
+import soundfile as sf
+
+from .audio import read_pcm16
+from .config import get_settings
+
+FRAME_SECONDS = 0.02
+SILENCE_RMS = 0.01  # ~ -40 dBFS
+MIN_TAIL_SECONDS = 0.25
+
+
+@dataclass
+class CachedRecording:
+    fingerprints: Tuple[str, ...]
+    window_samples: int
+    samplerate: int
+    duration: float
+    language: str
+    model_size: str
+    segments: List[Dict[str, Any]]
+    stored_at: float
+
+
+def fingerprint_windows(samples: np.ndarray, window_samples: int) -> Tuple[str, ...]:
+    """Digest of every full window of PCM16 samples (partial trailing window ignored)."""
+    n = len(samples) // window_samples
+    raw = samples[: n * window_samples].tobytes()
+    step = window_samples * samples.itemsize
+    return tuple(
+        hashlib.blake2b(raw[i * step:(i + 1) * step], digest_size=8).hexdigest() for i in range(n)
+    )
+
+
+def shared_prefix(a: Tuple[str, ...], b: Tuple[str, ...]) -> int:
+    n = 0
+    for x, y in zip(a, b):
+        if x != y:
+            break
+        n += 1
+    return n
+
+
+class FingerprintCache:
+    """Bounded LRU of recent recordings per user."""
+
+    def __init__(self, max_users: int = 512, per_user: int = 4, ttl_seconds: float = 6 * 3600):
+        self.max_users = max_users
+        self.per_user = per_user
+        self.ttl_seconds = ttl_seconds
+        self._data: "OrderedDict[str, List[CachedRecording]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def lookup(self, sub: str, fingerprints: Tuple[str, ...]) -> Tuple[Optional[CachedRecording], int]:
+        now = time.time()
+        best: Optional[CachedRecording] = None
+        best_n = 0
+        with self._lock:
+            entries = self._data.get(sub)
+            if not entries:
+                return None, 0
+            entries[:] = [e for e in entries if now - e.stored_at < self.ttl_seconds]
+            self._data.move_to_end(sub)
+            for entry in entries:
+                n = shared_prefix(entry.fingerprints, fingerprints)
+                if n > best_n:
+                    best, best_n = entry, n
+        return best, best_n
+
+    def store(self, sub: str, entry: CachedRecording) -> None:
+        with self._lock:
+            entries = self._data.setdefault(sub, [])
+            # A longer upload of the same session supersedes the shorter one
+            entries[:] = [e for e in entries if shared_prefix(e.fingerprints, entry.fingerprints) < len(e.fingerprints)]
+            entries.append(entry)
+            del entries[: -self.per_user]
+            self._data.move_to_end(sub)
+            while len(self._data) > self.max_users:
+                self._data.popitem(last=False)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._data.clear()
+
+
+_CACHE = FingerprintCache()
+
+
+def get_cache() -> FingerprintCache:
+    return _CACHE
+
+
+def quietest_frame(samples: np.ndarray, rate: int, start: float, end: float) -> Optional[float]:
+    """Centre time of the lowest-RMS frame in [start, end) if it is below the silence threshold."""
+    frame = max(1, int(FRAME_SECONDS * rate))
+    a, b = int(start * rate), int(end * rate)
+    if b - a < frame:
+        return None
+    region = samples[a:b].astype(np.float32) / 32768.0
+    n = len(region) // frame
+    rms = np.sqrt(np.mean(region[: n * frame].reshape(n, frame) ** 2, axis=1))
+    i = int(np.argmin(rms))
+    if rms[i] > SILENCE_RMS:
+        return None
+    return (a + i * frame + frame // 2) / rate
+
+
+def find_safe_cut(cached: CachedRecording, samples: np.ndarray, prefix_seconds: float) -> Optional[float]:
+    """Latest silent point after a cached segment end, inside the shared prefix."""
+    segs = cached.segments
+    for i in range(len(segs) - 1, -1, -1):
+        end = float(segs[i]["end"])
+        if end > prefix_seconds:
+            continue
+        limit = prefix_seconds
+        if i + 1 < len(segs):
+            limit = min(limit, float(segs[i + 1]["start"]))
+        cut = quietest_frame(samples, cached.samplerate, end, limit)
+        if cut is not None:
+            return cut
+    return None
+
+
+def _transcribe_tail(samples: np.ndarray, rate: int, cut: float, run_fn: Callable[[str], Dict[str, Any]]):
+    fd, tail_path = tempfile.mkstemp(suffix=".wav")
+    os.close(fd)
+    try:
+        sf.write(tail_path, samples[int(cut * rate):], rate, subtype="PCM_16")
+        return run_fn(tail_path)
+    finally:
+        try:
+            os.remove(tail_path)
+        except OSError:
+            pass
+
+
+def transcribe_incremental(wav_path: str, sub: str, run_fn: Callable[[str], Dict[str, Any]],
+                           cache: Optional[FingerprintCache] = None) -> Dict[str, Any]:
+    """Drop-in for ``run_transcription`` that reuses cached prefix segments.
+
+    The returned dict has the usual ``run_transcription`` keys plus
+    ``reused_seconds`` (0.0 when the full file was transcribed).
+    """
+    settings = get_settings()
+    cache = cache or get_cache()
+    samples, rate = read_pcm16(wav_path)
+    window = max(1, int(settings.incremental_window_seconds * rate))
+    fps = fingerprint_windows(samples, window)
+    duration = len(samples) / float(rate)
+
+    cached, shared = cache.lookup(sub, fps)
+    cut: Optional[float] = None
+    if cached is not None and cached.samplerate == rate and cached.window_samples == window:
+        prefix_seconds = shared * window / float(rate)
+        if prefix_seconds >= settings.incremental_min_reuse_seconds:
+            cut = find_safe_cut(cached, samples, prefix_seconds)
+
+    if cached is None or cut is None:
+        result = run_fn(wav_path)
+        result["reused_seconds"] = 0.0
+    else:
+        reused = [dict(s) for s in cached.segments if float(s["end"]) <= cut]
+        if duration - cut >= MIN_TAIL_SECONDS:
+            tail = _transcribe_tail(samples, rate, cut, run_fn)
+            tail_segments = tail["segments"]
+            processing_ms = tail["processing_ms"]
+        else:
+            tail_segments, processing_ms = [], 0
+        segments = reused
+        for seg in tail_segments:
+            segments.append({**seg, "start": seg["start"] + cut, "end": seg["end"] + cut})
+        for idx, seg in enumerate(segments):
+            seg["id"] = idx
+        result = {
+            "language": cached.language,
+            "duration": duration,
+            "segments": segments,
+            "text": " ".join(s["text"] for s in segments if s.get("text")).strip(),
+            "processing_ms": processing_ms,
+            "model_size": cached.model_size,
+            "reused_seconds": round(cut, 3),
+        }
+
+    cache.store(
+        sub,
+        CachedRecording(
+            fingerprints=fps,
+            window_samples=window,
+            samplerate=rate,
+            duration=duration,
+            language=result["language"],
+            model_size=result["model_size"],
+            segments=[dict(s) for s in result["segments"]],
+            stored_at=time.time(),
+        ),
+    )
+    return result
+
+
+__all__ = [
+    "FingerprintCache",
+    "CachedRecording",
+    "fingerprint_windows",
+    "find_safe_cut",
+    "quietest_frame",
+    "transcribe_incremental",
+    "get_cache",
+]
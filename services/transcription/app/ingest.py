@@ -0,0 +1,51 @@
+"""File-reference ingestion from a shared volume.
+
+Gateways that already write recordings under ``INGEST_ROOT`` can submit a path
+instead of re-uploading the bytes. The path is resolved (symlinks included)
+and must stay inside the root; the file is then read where it lies: mono
+16 kHz PCM16 WAV is memory-mapped straight into the model input, anything else
+is handed to ffmpeg by path.
+"""
+from __future__ import annotations
+import os
+import stat
+from typing import Optional, Tuple
+
+import numpy as np
+
+from .audio import pcm16_wav_layout, read_pcm16
+
+
+class IngestPathError(Exception):
+    """The reference is malformed or points outside the allow-listed root."""
+
+
+def resolve_ingest_path(root: str, reference: str) -> str:
+    """Real path of ``reference`` (relative to ``root`` or absolute) if it is a regular file under root."""
+    if not reference or "\x00" in reference:
+        raise IngestPathError("Invalid path")
+    root_real = os.path.realpath(root)
+    candidate = os.path.realpath(os.path.join(root_real, reference))
+    if os.path.commonpath([root_real, candidate]) != root_real or candidate == root_real:
+        raise IngestPathError("Path outside ingest root")
+    st = os.stat(candidate)  # FileNotFoundError propagates as "not found"
+    if not stat.S_ISREG(st.st_mode):
+        raise IngestPathError("Not a regular file")
+    return candidate
+
+
+def model_ready_duration(path: str) -> Optional[float]:
+    """Duration if the file is already mono 16 kHz PCM16 WAV (ffmpeg can be skipped), else None."""
+    layout = pcm16_wav_layout(path)
+    if layout is None or layout[2] != 16000:
+        return None
+    return layout[1] / 16000.0
+
+
+def load_mapped(path: str) -> Tuple[np.ndarray, float]:
+    """Float32 model input from a memory-mapped PCM16 WAV, plus its duration."""
+    samples, rate = read_pcm16(path)
+    return samples.astype(np.float32) / 32768.0, len(samples) / float(rate)
+
+
+__all__ = ["IngestPathError", "resolve_ingest_path", "model_ready_duration", "load_mapped"]
@@ -1,28 +1,54 @@
-from fastapi import FastAPI, UploadFile, File, HTTPException, Depends, WebSocket
-from fastapi.responses import JSONResponse
-from fastapi.middleware.cors import CORSMiddleware
+from fastapi import FastAPI, UploadFile, File, HTTPException, Depends, WebSocket, Query, Request
 from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import JSONResponse, PlainTextResponse, Response, StreamingResponse
+from typing import Any, Dict
+from fastapi.middleware.cors import CORSMiddleware
+from starlette.background import BackgroundTask
+import json
 import tempfile
 import shutil
 import os
 import logging
-import asyncio  # noqa: F401 (reserved for future streaming improvements)
+import asyncio
+from contextlib import asynccontextmanager
 
 from .config import get_settings
 from .audio import transcode_to_wav_16k, AudioProcessingError
 from .model import run_transcription
+from .incremental import transcribe_incremental
+from .batch import BatchError, receive_batch, cleanup as batch_cleanup
+from .ingest import IngestPathError, resolve_ingest_path, model_ready_duration, load_mapped
 from .redaction import redact_segments, redact_text
-from .schemas import TranscriptionResponse, Segment
-from .auth import verify_jwt
+from .schemas import TranscriptionResponse, Segment, StoredTranscript, TranscriptSearchResponse, FileReference
+from .auth import verify_jwt, close_jwks
 from .rate_limit import rate_limit
 from .websocket import websocket_endpoint
+from .store import get_store
+from .recycle import start_recycler
+from .profiler import ProfilerBusy, render_collapsed, render_speedscope, sample as profile_sample
+from .metrics import StageTimer, run_timed, render_latest, CONTENT_TYPE_LATEST, INFLIGHT
+from .tracing import TracingMiddleware, configure as configure_tracing, get_tracer
 
 settings = get_settings()
 
 logging.basicConfig(level=settings.log_level.upper())
 logger = logging.getLogger("transcription")
 
-app = FastAPI(title="Transcription Service", version="0.2.0")
+
+@asynccontextmanager
+async def lifespan(_app: FastAPI):
+    recycler = start_recycler()
+    try:
+        yield
+    finally:
+        recycler.cancel()
+        await close_jwks()
+        tracer = get_tracer()
+        if tracer is not None:  # forked workers leave through os._exit, which skips atexit
+            tracer.shutdown()
+
+
+app = FastAPI(title="Transcription Service", version="0.2.0", lifespan=lifespan)
 
 cors_origins_env = os.getenv("TRANSCRIPTION_ALLOWED_ORIGINS")
 if cors_origins_env:
@@ -40,6 +66,8 @@ app.add_middleware(
     allow_methods=["*"],
     allow_headers=["*"],
 )
+if configure_tracing(os.getenv("TRACE_SERVICE_NAME", "transcription")) is not None:
+    app.add_middleware(TracingMiddleware)
 
 
 @app.get("/healthz")
@@ -53,34 +81,52 @@ async def health_alias():
     return {"status": "ok", "model": settings.model_size}
 
 
-@app.post("/v1/transcribe", response_model=TranscriptionResponse)
-async def transcribe(file: UploadFile = File(...), claims: dict = Depends(verify_jwt)):
-    if not file.filename:
-        raise HTTPException(status_code=400, detail="Filename required")
+@app.get("/metrics")
+async def metrics():
+    """Prometheus scrape endpoint (stage histograms, queue depth, active sessions)."""
+    return Response(content=render_latest(), media_type=CONTENT_TYPE_LATEST)
 
-    # Persist upload to temp file first
-    tmp_fd, tmp_in_path = tempfile.mkstemp()
-    os.close(tmp_fd)
-    try:
-        with open(tmp_in_path, "wb") as out_f:
-            shutil.copyfileobj(file.file, out_f)
-        # Transcode
-        try:
-            wav_path, duration = await transcode_to_wav_16k(tmp_in_path)
-        except AudioProcessingError as e:
-            logger.exception("Audio processing failed")
-            raise HTTPException(status_code=400, detail=str(e))
+
+def _run_mapped(wav_path: str):
+    return run_transcription(load_mapped(wav_path)[0])
+
+
+def _admit(timer: StageTimer, claims: dict, duration: float, cost: int = 1) -> None:
+    """Length cap and rate limits; ``cost=0`` when a batch was already charged up front."""
+    with timer.stage("admission"):
         if duration > settings.max_audio_seconds:
             raise HTTPException(status_code=413, detail=f"Audio too long (>{settings.max_audio_seconds}s)")
-        # Rate limit
-        sub = claims.get("sub", "anon")
-        try:
-            rate_limit(f"user:{sub}", limit=20, window_sec=60)
-            rate_limit("global:transcribe", limit=200, window_sec=60)
-        except HTTPException as rl_exc:
-            raise rl_exc
-        # Run model (blocking) in thread pool
-        result = await run_in_threadpool(run_transcription, wav_path)
+        if cost:
+            _charge(claims, cost)
+
+
+def _charge(claims: dict, cost: int) -> None:
+    sub = claims.get("sub", "anon")
+    extra = {"cost": cost} if cost > 1 else {}
+    rate_limit(f"user:{sub}", limit=settings.rate_limit_per_minute, window_sec=60, **extra)
+    rate_limit("global:transcribe", limit=200, window_sec=60, **extra)
+
+
+async def _infer(
+    timer: StageTimer,
+    claims: dict,
+    filename: str,
+    wav_path: str,
+    include_timings: bool,
+    mapped: bool = False,
+) -> Dict[str, Any]:
+    """Inference, redaction, storage and response payload for a 16 kHz wav.
+
+    ``mapped`` feeds the model memory-mapped samples instead of letting it decode the path.
+    """
+    sub = claims.get("sub", "anon")
+    # Run model (blocking) in thread pool; growing re-uploads only transcribe the new tail
+    run_fn = _run_mapped if mapped else run_transcription
+    if settings.enable_incremental:
+        result = await run_timed(timer, "inference", transcribe_incremental, wav_path, sub, run_fn)
+    else:
+        result = await run_timed(timer, "inference", run_fn, wav_path)
+    with timer.stage("postprocess"):
         segments = result["segments"]
         text = result["text"]
         redaction_applied = False
@@ -88,18 +134,117 @@ async def transcribe(file: UploadFile = File(...), claims: dict = Depends(verify
             segments = redact_segments(segments)
             text = redact_text(text)
             redaction_applied = True
+    transcript_id = None
+    store = get_store()
+    if store is not None and claims.get("sub"):
+        with timer.stage("store"):
+            transcript_id = await run_in_threadpool(store.save, claims["sub"], {
+                "filename": filename,
+                "language": result["language"],
+                "duration_seconds": result["duration"],
+                "model": result["model_size"],
+                "processing_ms": result["processing_ms"],
+                "redaction_applied": redaction_applied,
+                "reused_seconds": result.get("reused_seconds", 0.0),
+                "text": text,
+                "segments": segments,
+                "timings": timer.as_dict(),
+            })
+    with timer.stage("serialize"):
         response = TranscriptionResponse(
-            filename=file.filename,
+            filename=filename,
             language=result["language"],
             duration_seconds=result["duration"],
             model=result["model_size"],
             processing_ms=result["processing_ms"],
             redaction_applied=redaction_applied,
+            reused_seconds=result.get("reused_seconds", 0.0),
             text=text,
             segments=[Segment(**s) for s in segments],
+            timings=timer.as_dict() if include_timings else None,
+            transcript_id=transcript_id,
         )
-        return JSONResponse(response.model_dump())
+        payload = response.model_dump()
+        if not include_timings:
+            payload.pop("timings", None)
+        if transcript_id is None:
+            payload.pop("transcript_id", None)
+    return payload
+
+
+async def _transcribe_wav(
+    timer: StageTimer,
+    claims: dict,
+    filename: str,
+    wav_path: str,
+    duration: float,
+    include_timings: bool,
+    mapped: bool = False,
+) -> Response:
+    timer.audio_seconds = duration
+    _admit(timer, claims, duration)
+    payload = await _infer(timer, claims, filename, wav_path, include_timings, mapped)
+    with timer.stage("serialize"):
+        body = json.dumps(payload, ensure_ascii=False, separators=(",", ":"))
+    return Response(
+        content=body,
+        media_type="application/json",
+        headers={"Server-Timing": timer.server_timing()},
+    )
+
+
+@app.get("/debug/profile")
+async def debug_profile(
+    seconds: float = Query(10.0, gt=0, le=60),
+    format: str = Query("collapsed", pattern="^(collapsed|speedscope)$"),
+    interval_ms: float = Query(10.0, ge=1, le=1000),
+    claims: dict = Depends(verify_jwt),
+):
+    """Sample all threads of this worker for ``seconds`` (admin role only, one at a time)."""
+    if claims.get("role") != settings.profiler_role:
+        raise HTTPException(status_code=403, detail="Profiler requires admin role")
+    logger.info("Profiling worker %d for %.1fs at the request of %s", os.getpid(), seconds, claims.get("sub"))
+    try:
+        samples = await run_in_threadpool(profile_sample, seconds, interval_ms / 1000.0)
+    except ProfilerBusy as e:
+        raise HTTPException(status_code=409, detail=str(e))
+    if format == "speedscope":
+        return JSONResponse(render_speedscope(samples, interval_ms / 1000.0, name=f"transcription-{os.getpid()}"))
+    return PlainTextResponse(render_collapsed(samples))
+
+
+@app.post("/v1/transcribe", response_model=TranscriptionResponse)
+async def transcribe(
+    file: UploadFile = File(...),
+    include_timings: bool = Query(False, alias="timings"),
+    claims: dict = Depends(verify_jwt),
+):
+    if not file.filename:
+        raise HTTPException(status_code=400, detail="Filename required")
+
+    timer = StageTimer("/v1/transcribe")
+    status = "error"
+    INFLIGHT.inc()
+    # Persist upload to temp file first
+    tmp_fd, tmp_in_path = tempfile.mkstemp()
+    os.close(tmp_fd)
+    try:
+        with timer.stage("receive"):
+            with open(tmp_in_path, "wb") as out_f:
+                shutil.copyfileobj(file.file, out_f)
+        # Transcode
+        try:
+            with timer.stage("transcode"):
+                wav_path, duration = await transcode_to_wav_16k(tmp_in_path)
+        except AudioProcessingError as e:
+            logger.exception("Audio processing failed")
+            raise HTTPException(status_code=400, detail=str(e))
+        response = await _transcribe_wav(timer, claims, file.filename, wav_path, duration, include_timings)
+        status = "ok"
+        return response
     finally:
+        INFLIGHT.dec()
+        timer.observe(status)
         try:
             os.remove(tmp_in_path)
         except OSError:
@@ -108,6 +253,169 @@ async def transcribe(file: UploadFile = File(...), claims: dict = Depends(verify
         # We could search for leftover temp wav but rely on OS tmp cleaner.
 
 
+@app.post("/v1/transcribe/file", response_model=TranscriptionResponse)
+async def transcribe_file(
+    ref: FileReference,
+    include_timings: bool = Query(False, alias="timings"),
+    claims: dict = Depends(verify_jwt),
+):
+    """Transcribe a file already on the shared ingest volume, read in place."""
+    if not settings.ingest_root:
+        raise HTTPException(status_code=404, detail="File ingestion not enabled")
+    if settings.ingest_scope and settings.ingest_scope not in str(claims.get("scope", "")).split():
+        raise HTTPException(status_code=403, detail=f"Scope {settings.ingest_scope} required")
+
+    timer = StageTimer("/v1/transcribe/file")
+    status = "error"
+    INFLIGHT.inc()
+    transcoded = None
+    try:
+        with timer.stage("receive"):
+            try:
+                path = resolve_ingest_path(settings.ingest_root, ref.path)
+            except IngestPathError as e:
+                raise HTTPException(status_code=403, detail=str(e))
+            except FileNotFoundError:
+                raise HTTPException(status_code=404, detail="File not found")
+        try:
+            with timer.stage("transcode"):
+                duration = model_ready_duration(path)
+                if duration is None:
+                    transcoded, duration = await transcode_to_wav_16k(path)
+        except AudioProcessingError as e:
+            logger.exception("Audio processing failed")
+            raise HTTPException(status_code=400, detail=str(e))
+        response = await _transcribe_wav(
+            timer, claims, ref.path, transcoded or path, duration, include_timings, mapped=True
+        )
+        status = "ok"
+        return response
+    finally:
+        INFLIGHT.dec()
+        timer.observe(status)
+        if transcoded:
+            try:
+                os.remove(transcoded)
+            except OSError:
+                pass
+
+
+async def _batch_item(index: int, filename: str, raw_path: str, claims: dict, include_timings: bool,
+                      slots: asyncio.Semaphore) -> Dict[str, Any]:
+    timer = StageTimer("/v1/transcribe/batch")
+    status = "error"
+    wav_path = None
+    try:
+        async with slots:
+            INFLIGHT.inc()
+            try:
+                with timer.stage("transcode"):
+                    wav_path, duration = await transcode_to_wav_16k(raw_path)
+                timer.audio_seconds = duration
+                _admit(timer, claims, duration, cost=0)
+                payload = await _infer(timer, claims, filename, wav_path, include_timings)
+            finally:
+                INFLIGHT.dec()
+        status = "ok"
+        return {"index": index, "filename": filename, "status": "ok", "result": payload}
+    except AudioProcessingError as e:
+        return {"index": index, "filename": filename, "status": "error", "status_code": 400, "detail": str(e)}
+    except HTTPException as e:
+        return {"index": index, "filename": filename, "status": "error", "status_code": e.status_code,
+                "detail": e.detail}
+    except Exception:
+        logger.exception("Batch item %s failed", index)
+        return {"index": index, "filename": filename, "status": "error", "status_code": 500,
+                "detail": "Transcription failed"}
+    finally:
+        timer.observe(status)
+        for path in (raw_path, wav_path):
+            if path:
+                try:
+                    os.remove(path)
+                except OSError:
+                    pass
+
+
+@app.post("/v1/transcribe/batch")
+async def transcribe_batch(
+    request: Request,
+    include_timings: bool = Query(False, alias="timings"),
+    claims: dict = Depends(verify_jwt),
+):
+    """Transcribe many files from one multipart, tar or zip body.
+
+    The token is verified and the rate limit charged once for the whole batch. Files run
+    concurrently (``BATCH_CONCURRENCY``) and one NDJSON line is streamed per file as it
+    finishes, in completion order; a failed file yields an error line, not a failed batch.
+    """
+    # A batch larger than the per-user budget could never be charged: reject it as 413 while parsing
+    max_files = min(settings.batch_max_files, settings.rate_limit_per_minute)
+    try:
+        items = await receive_batch(request, max_files, settings.batch_max_bytes)
+    except BatchError as e:
+        raise HTTPException(status_code=e.status_code, detail=e.detail)
+    if not items:
+        raise HTTPException(status_code=400, detail="No files in batch")
+    try:
+        _charge(claims, len(items))
+    except HTTPException:
+        batch_cleanup(items)
+        raise
+
+    async def lines():
+        slots = asyncio.Semaphore(settings.batch_concurrency)
+        tasks = [
+            asyncio.create_task(_batch_item(i, name, path, claims, include_timings, slots))
+            for i, (name, path) in enumerate(items)
+        ]
+        try:
+            for done in asyncio.as_completed(tasks):
+                line = await done
+                yield json.dumps(line, ensure_ascii=False, separators=(",", ":")) + "\n"
+        finally:
+            # Client went away: stop outstanding work and drop files that never started
+            for task in tasks:
+                task.cancel()
+            batch_cleanup(items)
+
+    # Also runs when the body is never iterated (client gone before the response started)
+    return StreamingResponse(lines(), media_type="application/x-ndjson",
+                             headers={"X-Batch-Files": str(len(items))},
+                             background=BackgroundTask(batch_cleanup, items))
+
+
+def _require_store():
+    store = get_store()
+    if store is None:
+        raise HTTPException(status_code=404, detail="Transcript store not enabled")
+    return store
+
+
+@app.get("/v1/transcripts/search", response_model=TranscriptSearchResponse)
+async def search_transcripts(
+    q: str = Query(..., min_length=1),
+    limit: int = Query(20, ge=1, le=100),
+    offset: int = Query(0, ge=0),
+    claims: dict = Depends(verify_jwt),
+):
+    """Segment-level full-text search over the caller's stored transcripts."""
+    store = _require_store()
+    if not claims.get("sub"):
+        raise HTTPException(status_code=403, detail="Token has no subject")
+    return await run_in_threadpool(store.search, claims["sub"], q, limit, offset)
+
+
+@app.get("/v1/transcripts/{transcript_id}", response_model=StoredTranscript)
+async def get_transcript(transcript_id: str, claims: dict = Depends(verify_jwt)):
+    """Return a stored transcript without re-running inference."""
+    store = _require_store()
+    record = await run_in_threadpool(store.get, claims.get("sub") or "", transcript_id)
+    if record is None:
+        raise HTTPException(status_code=404, detail="Transcript not found")
+    return record
+
+
 @app.websocket("/v1/ws")
 async def ws_endpoint(ws: WebSocket, claims: dict = Depends(verify_jwt)):
     await websocket_endpoint(ws, claims)
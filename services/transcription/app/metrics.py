@@ -0,0 +1,351 @@
+"""Lightweight in-process metrics for the transcription service.
+
+Exposes counters, gauges and histograms in the Prometheus text exposition
+format without pulling in an extra client dependency, plus a per-request
+``StageTimer`` used to build ``Server-Timing`` headers.
+"""
+from __future__ import annotations
+import os
+import resource
+import threading
+import time
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple
+
+from fastapi.concurrency import run_in_threadpool
+
+# Buckets (seconds) sized for stage latencies from sub-millisecond up to long inference runs.
+DEFAULT_BUCKETS: Tuple[float, ...] = (
+    0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 120.0, 300.0,
+)
+AUDIO_BUCKETS: Tuple[float, ...] = (1.0, 5.0, 15.0, 30.0, 60.0, 120.0, 300.0, 600.0, 900.0, 1800.0)
+RTF_BUCKETS: Tuple[float, ...] = (0.01, 0.02, 0.05, 0.1, 0.2, 0.3, 0.5, 0.75, 1.0, 1.5, 2.0, 5.0)
+MIB = 1024 * 1024
+RSS_BUCKETS: Tuple[float, ...] = tuple(float(m * MIB) for m in (0.25, 1, 4, 16, 64, 128, 256, 512, 1024, 2048))
+
+STAGES = (
+    "receive",
+    "transcode",
+    "admission",
+    "queue_wait",
+    "inference",
+    "postprocess",
+    "serialize",
+)
+
+
+def _fmt_labels(names: Tuple[str, ...], values: Tuple[str, ...], extra: str = "") -> str:
+    parts = [f'{n}="{v}"' for n, v in zip(names, values)]
+    if extra:
+        parts.append(extra)
+    return "{" + ",".join(parts) + "}" if parts else ""
+
+
+def _fmt_value(v: float) -> str:
+    if v == float("inf"):
+        return "+Inf"
+    return repr(float(v)) if not float(v).is_integer() else str(int(v))
+
+
+class _Metric:
+    kind = "untyped"
+
+    def __init__(self, name: str, documentation: str, labelnames: Iterable[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()
+
+    def _key(self, labels: Dict[str, str]) -> Tuple[str, ...]:
+        return tuple(str(labels.get(n, "")) for n in self.labelnames)
+
+    def samples(self) -> List[str]:  # pragma: no cover - overridden
+        return []
+
+    def render(self) -> str:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.kind}"]
+        lines.extend(self.samples())
+        return "\n".join(lines)
+
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def __init__(self, name: str, documentation: str, labelnames: Iterable[str] = ()):
+        super().__init__(name, documentation, labelnames)
+        self._values: Dict[Tuple[str, ...], float] = {}
+
+    def inc(self, amount: float = 1.0, **labels: str) -> None:
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+    def value(self, **labels: str) -> float:
+        return self._values.get(self._key(labels), 0.0)
+
+    def total(self) -> float:
+        with self._lock:
+            return sum(self._values.values())
+
+    def samples(self) -> List[str]:
+        with self._lock:
+            items = list(self._values.items())
+        return [f"{self.name}{_fmt_labels(self.labelnames, k)} {_fmt_value(v)}" for k, v in items]
+
+
+class Gauge(_Metric):
+    kind = "gauge"
+
+    def __init__(self, name: str, documentation: str, labelnames: Iterable[str] = ()):
+        super().__init__(name, documentation, labelnames)
+        self._values: Dict[Tuple[str, ...], float] = {}
+        if not self.labelnames:
+            self._values[()] = 0.0
+
+    def set(self, value: float, **labels: str) -> None:
+        with self._lock:
+            self._values[self._key(labels)] = float(value)
+
+    def inc(self, amount: float = 1.0, **labels: str) -> None:
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+    def dec(self, amount: float = 1.0, **labels: str) -> None:
+        self.inc(-amount, **labels)
+
+    def value(self, **labels: str) -> float:
+        return self._values.get(self._key(labels), 0.0)
+
+    def samples(self) -> List[str]:
+        with self._lock:
+            items = list(self._values.items())
+        return [f"{self.name}{_fmt_labels(self.labelnames, k)} {_fmt_value(v)}" for k, v in items]
+
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(
+        self,
+        name: str,
+        documentation: str,
+        labelnames: Iterable[str] = (),
+        buckets: Tuple[float, ...] = DEFAULT_BUCKETS,
+    ):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets))
+        # key -> [bucket counts..., sum, count]
+        self._values: Dict[Tuple[str, ...], List[float]] = {}
+
+    def observe(self, value: float, **labels: str) -> None:
+        key = self._key(labels)
+        with self._lock:
+            row = self._values.get(key)
+            if row is None:
+                row = [0.0] * (len(self.buckets) + 2)
+                self._values[key] = row
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    row[i] += 1
+            row[-2] += value
+            row[-1] += 1
+
+    def count(self, **labels: str) -> int:
+        row = self._values.get(self._key(labels))
+        return int(row[-1]) if row else 0
+
+    def samples(self) -> List[str]:
+        out: List[str] = []
+        with self._lock:
+            items = [(k, list(v)) for k, v in self._values.items()]
+        for key, row in items:
+            for i, bound in enumerate(self.buckets):
+                labels = _fmt_labels(self.labelnames, key, f'le="{_fmt_value(bound)}"')
+                out.append(f"{self.name}_bucket{labels} {_fmt_value(row[i])}")
+            labels = _fmt_labels(self.labelnames, key, 'le="+Inf"')
+            out.append(f"{self.name}_bucket{labels} {_fmt_value(row[-1])}")
+            out.append(f"{self.name}_sum{_fmt_labels(self.labelnames, key)} {_fmt_value(row[-2])}")
+            out.append(f"{self.name}_count{_fmt_labels(self.labelnames, key)} {_fmt_value(row[-1])}")
+        return out
+
+
+class Registry:
+    def __init__(self):
+        self._metrics: Dict[str, _Metric] = {}
+
+    def register(self, metric: _Metric) -> _Metric:
+        self._metrics[metric.name] = metric
+        return metric
+
+    def render(self) -> str:
+        return "\n".join(m.render() for m in self._metrics.values()) + "\n"
+
+
+REGISTRY = Registry()
+CONTENT_TYPE_LATEST = "text/plain; version=0.0.4; charset=utf-8"
+
+STAGE_SECONDS: Histogram = REGISTRY.register(  # type: ignore[assignment]
+    Histogram("transcription_stage_seconds", "Per-stage request latency in seconds.", ["path", "stage"])
+)
+REQUEST_SECONDS: Histogram = REGISTRY.register(  # type: ignore[assignment]
+    Histogram("transcription_request_seconds", "End-to-end request latency in seconds.", ["path"])
+)
+AUDIO_SECONDS: Histogram = REGISTRY.register(  # type: ignore[assignment]
+    Histogram("transcription_audio_seconds", "Decoded audio duration per request.", ["path"], AUDIO_BUCKETS)
+)
+REAL_TIME_FACTOR: Histogram = REGISTRY.register(  # type: ignore[assignment]
+    Histogram("transcription_real_time_factor", "Inference seconds per second of audio.", ["path"], RTF_BUCKETS)
+)
+REQUESTS_TOTAL: Counter = REGISTRY.register(  # type: ignore[assignment]
+    Counter("transcription_requests_total", "Completed transcription requests.", ["path", "status"])
+)
+QUEUE_DEPTH: Gauge = REGISTRY.register(  # type: ignore[assignment]
+    Gauge("transcription_queue_depth", "Inference jobs waiting for a worker thread.")
+)
+INFLIGHT: Gauge = REGISTRY.register(  # type: ignore[assignment]
+    Gauge("transcription_inflight_requests", "Transcription requests currently being processed.")
+)
+ACTIVE_SESSIONS: Gauge = REGISTRY.register(  # type: ignore[assignment]
+    Gauge("transcription_active_sessions", "Open WebSocket streaming sessions.")
+)
+WS_CONNECTIONS: Gauge = REGISTRY.register(  # type: ignore[assignment]
+    Gauge("transcription_ws_connections", "Open WebSocket connections (each may carry several sessions).")
+)
+DECODER_PROCESSES: Gauge = REGISTRY.register(  # type: ignore[assignment]
+    Gauge("transcription_decoder_processes", "Live per-session ffmpeg decoder processes.")
+)
+PROCESS_RSS: Gauge = REGISTRY.register(  # type: ignore[assignment]
+    Gauge("transcription_process_rss_bytes", "Resident set size of this worker process.")
+)
+REQUEST_RSS_GROWTH: Histogram = REGISTRY.register(  # type: ignore[assignment]
+    Histogram(
+        "transcription_request_rss_growth_bytes",
+        "Worker RSS growth between request start and end (includes concurrent requests).",
+        ["path"],
+        RSS_BUCKETS,
+    )
+)
+
+_PAGE_SIZE = os.sysconf("SC_PAGE_SIZE") if hasattr(os, "sysconf") else 4096
+
+
+def rss_bytes() -> int:
+    """Current resident set size; peak RSS where /proc is unavailable."""
+    try:
+        with open("/proc/self/statm", "rb") as f:
+            return int(f.read().split()[1]) * _PAGE_SIZE
+    except (OSError, IndexError, ValueError):  # pragma: no cover - non-Linux
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
+
+
+class StageTimer:
+    """Collects per-stage wall-clock timings for a single request."""
+
+    def __init__(self, path: str):
+        self.path = path
+        self.started = time.perf_counter()
+        self.stages: Dict[str, float] = {}
+        self.audio_seconds: Optional[float] = None
+        self.rss_start = rss_bytes()
+
+    @contextmanager
+    def stage(self, name: str):
+        t0 = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.add(name, time.perf_counter() - t0)
+
+    def add(self, name: str, seconds: float) -> None:
+        self.stages[name] = self.stages.get(name, 0.0) + seconds
+
+    @property
+    def rtf(self) -> Optional[float]:
+        inference = self.stages.get("inference")
+        if inference is None or not self.audio_seconds:
+            return None
+        return inference / self.audio_seconds
+
+    def as_dict(self) -> Dict[str, Any]:
+        data: Dict[str, Any] = {f"{k}_ms": round(v * 1000, 3) for k, v in self.stages.items()}
+        data["total_ms"] = round((time.perf_counter() - self.started) * 1000, 3)
+        if self.audio_seconds is not None:
+            data["audio_seconds"] = round(self.audio_seconds, 3)
+        rtf = self.rtf
+        if rtf is not None:
+            data["rtf"] = round(rtf, 4)
+        return data
+
+    def server_timing(self) -> str:
+        parts = [f"{k};dur={v * 1000:.3f}" for k, v in self.stages.items()]
+        parts.append(f"total;dur={(time.perf_counter() - self.started) * 1000:.3f}")
+        if self.audio_seconds is not None:
+            parts.append(f'audio;desc="{self.audio_seconds:.3f}s"')
+        rtf = self.rtf
+        if rtf is not None:
+            parts.append(f'rtf;desc="{rtf:.4f}"')
+        return ", ".join(parts)
+
+    def observe(self, status: str = "ok") -> None:
+        """Flush this request's timings into the process-wide histograms."""
+        for name, seconds in self.stages.items():
+            STAGE_SECONDS.observe(seconds, path=self.path, stage=name)
+        REQUEST_SECONDS.observe(time.perf_counter() - self.started, path=self.path)
+        if self.audio_seconds is not None:
+            AUDIO_SECONDS.observe(self.audio_seconds, path=self.path)
+        rtf = self.rtf
+        if rtf is not None:
+            REAL_TIME_FACTOR.observe(rtf, path=self.path)
+        REQUESTS_TOTAL.inc(path=self.path, status=status)
+        rss = rss_bytes()
+        PROCESS_RSS.set(rss)
+        REQUEST_RSS_GROWTH.observe(max(0, rss - self.rss_start), path=self.path)
+
+
+async def run_timed(timer: StageTimer, stage: str, fn: Callable[..., Any], *args: Any) -> Any:
+    """Run a blocking callable in the threadpool, recording queue wait and execution time."""
+    submitted = time.perf_counter()
+    QUEUE_DEPTH.inc()
+    state = {"dequeued": False}
+
+    def _call():
+        started = time.perf_counter()
+        QUEUE_DEPTH.dec()
+        state["dequeued"] = True
+        timer.add("queue_wait", started - submitted)
+        try:
+            return fn(*args)
+        finally:
+            timer.add(stage, time.perf_counter() - started)
+
+    try:
+        return await run_in_threadpool(_call)
+    finally:
+        if not state["dequeued"]:
+            QUEUE_DEPTH.dec()
+
+
+def render_latest() -> str:
+    return REGISTRY.render()
+
+
+__all__ = [
+    "Counter",
+    "Gauge",
+    "Histogram",
+    "Registry",
+    "REGISTRY",
+    "CONTENT_TYPE_LATEST",
+    "StageTimer",
+    "run_timed",
+    "render_latest",
+    "QUEUE_DEPTH",
+    "INFLIGHT",
+    "ACTIVE_SESSIONS",
+    "DECODER_PROCESSES",
+    "WS_CONNECTIONS",
+    "PROCESS_RSS",
+    "REQUEST_RSS_GROWTH",
+    "rss_bytes",
+]
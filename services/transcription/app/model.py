@@ -1,11 +1,13 @@
 from __future__ import annotations
 import time
-from typing import Any, Dict, List
+from typing import Any, Dict, List, Union
 from functools import lru_cache
 
+import numpy as np
 from faster_whisper import WhisperModel  # type: ignore
 
 from .config import get_settings
+from .tracing import span
 
 
 @lru_cache
@@ -17,21 +19,26 @@ def get_model() -> WhisperModel:
         settings.model_size,
         device=settings.device,
         compute_type=compute_type,
+        cpu_threads=settings.cpu_threads,
     )
 
 
-def run_transcription(wav_path: str) -> Dict[str, Any]:
-    """Run Whisper transcription returning structured data.
-    Returns a dict containing language, segments list, and concatenated text."""
-    model = get_model()
-    started = time.time()
-    segments_iter, info = model.transcribe(
-        wav_path,
-        beam_size=5,
-        best_of=5,
-        vad_filter=True,
-        temperature=[0.0, 0.2, 0.4],
+@lru_cache
+def get_partial_model() -> WhisperModel:
+    """Small model used for rolling live captions (``PARTIAL_MODEL_SIZE``)."""
+    settings = get_settings()
+    if settings.partial_model_size == settings.model_size:
+        return get_model()
+    compute_type = "int8" if settings.device == "cpu" else "float16"
+    return WhisperModel(
+        settings.partial_model_size,
+        device=settings.device,
+        compute_type=compute_type,
+        cpu_threads=settings.cpu_threads,
     )
+
+
+def _collect(segments_iter, info, started: float, model_size: str) -> Dict[str, Any]:
     segments: List[Dict[str, Any]] = []
     full_text_parts: List[str] = []
     for idx, seg in enumerate(segments_iter):
@@ -53,5 +60,44 @@ def run_transcription(wav_path: str) -> Dict[str, Any]:
         "segments": segments,
         "text": " ".join(full_text_parts).strip(),
         "processing_ms": processing_ms,
-        "model_size": get_settings().model_size,
+        "model_size": model_size,
     }
+
+
+def run_transcription(audio: Union[str, np.ndarray]) -> Dict[str, Any]:
+    """Run Whisper transcription returning structured data.
+    ``audio`` is a 16k mono wav path or a float32 sample array at 16 kHz.
+    Returns a dict containing language, segments list, and concatenated text."""
+    model = get_model()
+    model_size = get_settings().model_size
+    with span("inference", {"model.size": model_size, "model.pass": "final"}) as s:
+        started = time.time()
+        segments_iter, info = model.transcribe(
+            audio,
+            beam_size=5,
+            best_of=5,
+            vad_filter=True,
+            temperature=[0.0, 0.2, 0.4],
+        )
+        result = _collect(segments_iter, info, started, model_size)  # segments decode lazily, so inside the span
+        s.set_attribute("audio.duration_s", result["duration"])
+        s.set_attribute("transcript.segments", len(result["segments"]))
+    return result
+
+
+def run_partial_transcription(audio: Union[str, np.ndarray]) -> Dict[str, Any]:
+    """Fast greedy pass with the partial model for live captions; same result shape."""
+    model = get_partial_model()
+    model_size = get_settings().partial_model_size
+    with span("inference", {"model.size": model_size, "model.pass": "partial"}) as s:
+        started = time.time()
+        segments_iter, info = model.transcribe(
+            audio,
+            beam_size=1,
+            vad_filter=True,
+            temperature=0.0,
+            condition_on_previous_text=False,
+        )
+        result = _collect(segments_iter, info, started, model_size)
+        s.set_attribute("audio.duration_s", result["duration"])
+    return result
@@ -20,7 +20,8 @@ def get_client() -> Optional[redis.Redis]:  # pragma: no cover
     return _redis_client
 
 
-def rate_limit(key: str, limit: int, window_sec: int) -> None:
+def rate_limit(key: str, limit: int, window_sec: int, cost: int = 1) -> None:
+    """Fixed-window limiter; ``cost`` charges several units in one round trip (batches)."""
     client = get_client()
     if client is None:
         return  # fail open if redis unavailable
@@ -28,7 +29,7 @@ def rate_limit(key: str, limit: int, window_sec: int) -> None:
     hashed = hashlib.sha256(key.encode()).hexdigest()[:32]
     redis_key = f"rl:{hashed}:{now_bucket}"
     pipe = client.pipeline()
-    pipe.incr(redis_key, 1)
+    pipe.incr(redis_key, cost)
     pipe.expire(redis_key, window_sec)
     count, _ = pipe.execute()
     if count > limit:
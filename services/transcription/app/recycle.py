@@ -0,0 +1,82 @@
+"""Worker recycling on memory growth or request count.
+
+A background task samples this process's RSS every ``MEMORY_SAMPLE_SECONDS``
+into ``transcription_process_rss_bytes``. Once RSS crosses ``MAX_RSS_MB`` or
+the worker has completed ``MAX_REQUESTS`` (plus a per-process random jitter so
+workers do not all retire together) it retires exactly once:
+
+- under ``python -m app.serve`` it asks the master for a replacement; the
+  master waits for the successor to be ready, then gracefully stops this worker
+- standalone, it sends itself SIGTERM so uvicorn drains in-flight requests and
+  exits, leaving the restart to the container runtime
+"""
+from __future__ import annotations
+import asyncio
+import logging
+import os
+import random
+import signal
+from typing import Callable, Optional
+
+from .config import get_settings
+from .metrics import PROCESS_RSS, REQUESTS_TOTAL, rss_bytes
+
+logger = logging.getLogger("transcription.recycle")
+
+
+def _terminate_self() -> None:
+    os.kill(os.getpid(), signal.SIGTERM)
+
+
+_retire_hook: Callable[[], None] = _terminate_self
+
+
+def set_retire_hook(hook: Callable[[], None]) -> None:
+    """Installed by the launcher so retirement becomes a rolling replacement."""
+    global _retire_hook
+    _retire_hook = hook
+
+
+class Recycler:
+    def __init__(self, max_rss_mb: int = 0, max_requests: int = 0, jitter: int = 0):
+        self.max_rss = max_rss_mb * 1024 * 1024
+        self.max_requests = max_requests + (random.randint(0, jitter) if max_requests and jitter else 0)
+        self.retired: Optional[str] = None
+
+    @property
+    def enabled(self) -> bool:
+        return bool(self.max_rss or self.max_requests)
+
+    def reason(self, rss: int, requests: float) -> Optional[str]:
+        if self.max_rss and rss >= self.max_rss:
+            return f"rss {rss // (1024 * 1024)} MiB >= {self.max_rss // (1024 * 1024)} MiB"
+        if self.max_requests and requests >= self.max_requests:
+            return f"{int(requests)} requests >= {self.max_requests}"
+        return None
+
+    def check(self) -> Optional[str]:
+        """Sample RSS and retire once if a limit is crossed; returns the reason if it did."""
+        rss = rss_bytes()
+        PROCESS_RSS.set(rss)
+        if self.retired is not None or not self.enabled:
+            return None
+        reason = self.reason(rss, REQUESTS_TOTAL.total())
+        if reason is not None:
+            self.retired = reason
+            logger.warning("Recycling worker %d: %s", os.getpid(), reason)
+            _retire_hook()
+        return reason
+
+    async def run(self, interval: float) -> None:
+        while True:
+            self.check()
+            await asyncio.sleep(interval)
+
+
+def start_recycler() -> "asyncio.Task[None]":
+    settings = get_settings()
+    recycler = Recycler(settings.max_rss_mb, settings.max_requests, settings.max_requests_jitter)
+    return asyncio.create_task(recycler.run(settings.memory_sample_seconds))
+
+
+__all__ = ["Recycler", "start_recycler", "set_retire_hook"]
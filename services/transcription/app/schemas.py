@@ -1,5 +1,5 @@
 from pydantic import BaseModel, Field
-from typing import List, Optional
+from typing import Any, Dict, List, Optional
 
 
 class Segment(BaseModel):
@@ -19,5 +19,33 @@ class TranscriptionResponse(BaseModel):
     model: str
     processing_ms: int
     redaction_applied: bool = Field(default=False)
+    reused_seconds: float = Field(default=0.0)
     text: str
     segments: List[Segment]
+    timings: Optional[Dict[str, Any]] = None
+    transcript_id: Optional[str] = None
+
+
+class FileReference(BaseModel):
+    path: str = Field(..., description="File under INGEST_ROOT (relative, or absolute inside the root)")
+
+
+class StoredTranscript(TranscriptionResponse):
+    transcript_id: str
+    created_at: float
+    source: str
+
+
+class SegmentHit(BaseModel):
+    transcript_id: str
+    segment_id: int
+    start: float
+    end: float
+    text: str
+    filename: str
+    created_at: float
+
+
+class TranscriptSearchResponse(BaseModel):
+    results: List[SegmentHit]
+    next_offset: Optional[int] = None
@@ -0,0 +1,350 @@
+"""Preload-and-fork launcher for the transcription service.
+
+    python -m app.serve --port 8085            # worker count from cores and memory
+    WEB_CONCURRENCY=3 python -m app.serve
+
+The master imports ``app.main`` and everything it pulls in (FastAPI, numpy,
+faster-whisper, CTranslate2, PyAV), resolves the model files, freezes the GC
+so those objects are never written to again, binds the listening socket and
+then forks the workers. Workers share the preloaded pages copy-on-write and
+accept on the inherited socket.
+
+Model weights are loaded in each worker after the fork: CTranslate2 starts its
+thread pools when a model is constructed, and threads do not survive ``fork``.
+A worker reports ready only once its replica is loaded, which is what makes
+restarts rolling.
+
+Signals to the master:
+    SIGHUP           rolling restart: start a replacement, wait until it is ready,
+                     then gracefully stop one old worker, one at a time
+    SIGTERM/SIGINT   graceful shutdown (in-flight requests finish, up to
+                     ``GRACEFUL_TIMEOUT`` seconds)
+
+A worker that dies unexpectedly is replaced. A worker that crosses its
+``MAX_RSS_MB`` / ``MAX_REQUESTS`` limit (see ``app.recycle``) asks the master,
+over its status pipe, to be replaced the same way as a rolling restart.
+"""
+from __future__ import annotations
+import argparse
+import gc
+import logging
+import os
+import select
+import signal
+import socket
+import sys
+import time
+from typing import Dict, List, Optional
+
+from .config import get_settings
+
+logger = logging.getLogger("transcription.serve")
+
+# Resident set of one worker with its model replica loaded (int8, CPU), in MB
+MODEL_MEMORY_MB = {"tiny": 400, "base": 600, "small": 1200, "medium": 2600, "large-v2": 4800, "large-v3": 4800}
+MASTER_RESERVE_MB = 512
+
+
+def cpu_count() -> int:
+    """CPUs usable by this process, honouring affinity and a cgroup v2 quota."""
+    try:
+        cores = len(os.sched_getaffinity(0))
+    except AttributeError:  # pragma: no cover - non-Linux
+        cores = os.cpu_count() or 1
+    try:
+        with open("/sys/fs/cgroup/cpu.max") as f:
+            quota, period = f.read().split()
+        if quota != "max":
+            cores = min(cores, max(1, int(int(quota) / int(period))))
+    except (OSError, ValueError):
+        pass
+    return cores
+
+
+def memory_limit_mb() -> Optional[int]:
+    """Container memory limit (cgroup v2, then v1) or total RAM."""
+    for path in ("/sys/fs/cgroup/memory.max", "/sys/fs/cgroup/memory/memory.limit_in_bytes"):
+        try:
+            with open(path) as f:
+                raw = f.read().strip()
+        except OSError:
+            continue
+        if raw.isdigit() and int(raw) < 1 << 60:
+            return int(raw) // (1024 * 1024)
+    try:
+        with open("/proc/meminfo") as f:
+            for line in f:
+                if line.startswith("MemTotal:"):
+                    return int(line.split()[1]) // 1024
+    except OSError:
+        pass
+    return None
+
+
+def auto_workers() -> int:
+    """One worker per ``CPU_THREADS`` cores, capped by how many replicas fit in memory."""
+    settings = get_settings()
+    by_cpu = max(1, cpu_count() // (settings.cpu_threads or 4))
+    per_worker = settings.worker_memory_mb or MODEL_MEMORY_MB.get(settings.model_size, 1200)
+    limit = memory_limit_mb()
+    if limit is None:
+        return by_cpu
+    by_memory = max(1, (limit - MASTER_RESERVE_MB) // per_worker)
+    return min(by_cpu, by_memory)
+
+
+def process_local_features() -> List[str]:
+    """Enabled features whose state lives in one worker's memory."""
+    settings = get_settings()
+    features = []
+    if settings.ws_resume_ttl_seconds > 0:
+        features.append("WS_RESUME_TTL_SECONDS")  # resumable WebSocket sessions
+    if settings.enable_incremental:
+        features.append("ENABLE_INCREMENTAL")  # fingerprint cache of earlier uploads
+    return features
+
+
+def resolve_workers(requested: int) -> int:
+    """Worker count for ``--workers``/``WEB_CONCURRENCY`` (0 = auto).
+
+    Auto picks a single worker while process-local features are on: a reconnect or
+    re-upload landing on another worker would miss its session or cache. An explicit
+    count above one is honoured, but needs sticky routing in front of the service.
+    """
+    local = process_local_features()
+    if requested:
+        if requested > 1 and local:
+            logger.warning("%d workers with %s: route each client to one worker (sticky sessions)",
+                           requested, ", ".join(local))
+        return requested
+    if local:
+        logger.info("One worker because %s keep per-process state; set WEB_CONCURRENCY (with sticky "
+                    "routing) or disable them to scale out", ", ".join(local))
+        return 1
+    return auto_workers()
+
+
+def _preload() -> None:
+    from . import main  # noqa: F401  (imports FastAPI app, numpy, faster-whisper, CTranslate2)
+
+    settings = get_settings()
+    try:
+        from faster_whisper.utils import download_model  # type: ignore
+
+        download_model(settings.model_size)  # fetch once here, not concurrently in every worker
+    except Exception as e:  # offline with a local path, or no network: workers resolve it themselves
+        logger.info("Model files not prefetched (%s)", e)
+    gc.collect()
+    gc.freeze()  # keep preloaded objects out of GC passes, which would dirty their COW pages
+
+
+def _bind(host: str, port: int) -> socket.socket:
+    family = socket.AF_INET6 if ":" in host else socket.AF_INET
+    sock = socket.socket(family, socket.SOCK_STREAM)
+    sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+    sock.bind((host, port))
+    sock.listen(2048)
+    sock.set_inheritable(True)
+    return sock
+
+
+class Worker:
+    def __init__(self, pid: int, status_fd: int):
+        self.pid = pid
+        self.status_fd = status_fd
+        self.ready = False
+        self.retiring = False
+        self.retire_requested = False
+        self.started = time.monotonic()
+
+
+def _worker_main(sock: socket.socket, status_fd: int, warm: bool) -> None:
+    """Runs in the forked child; writes b"1" to ``status_fd`` when ready and b"r" to retire."""
+    import uvicorn
+
+    from .main import app
+
+    from .recycle import set_retire_hook
+
+    for sig in (signal.SIGHUP, signal.SIGTERM, signal.SIGINT, signal.SIGCHLD):
+        signal.signal(sig, signal.SIG_DFL)
+    # Preloaded objects stay in the permanent generation: unfreezing them would let the
+    # next full collection write their GC headers and un-share the pages. Only objects
+    # created from here on are collected.
+    gc.enable()
+    set_retire_hook(lambda: os.write(status_fd, b"r"))
+    if warm:
+        from .model import get_model
+
+        get_model()
+
+    class _Server(uvicorn.Server):
+        async def startup(self, sockets=None):
+            await super().startup(sockets=sockets)
+            if self.started:
+                os.write(status_fd, b"1")
+
+    settings = get_settings()
+    config = uvicorn.Config(app, log_level=settings.log_level, timeout_graceful_shutdown=settings.graceful_timeout)
+    _Server(config).run(sockets=[sock])
+
+
+class Arbiter:
+    def __init__(self, sock: socket.socket, workers: int, warm: bool = True):
+        settings = get_settings()
+        self.sock = sock
+        self.target = workers
+        self.warm = warm
+        self.graceful_timeout = settings.graceful_timeout
+        self.boot_timeout = settings.worker_boot_timeout
+        self.workers: Dict[int, Worker] = {}
+        self.stopping = False
+        self.reload = False
+
+    def spawn(self) -> Worker:
+        status_r, status_w = os.pipe()
+        pid = os.fork()
+        if pid == 0:
+            os.close(status_r)
+            for other in self.workers.values():
+                if other.status_fd >= 0:
+                    os.close(other.status_fd)
+            code = 0
+            try:
+                _worker_main(self.sock, status_w, self.warm)
+            except BaseException:
+                logger.exception("Worker crashed")
+                code = 1
+            finally:
+                os._exit(code)
+        os.close(status_w)
+        worker = Worker(pid, status_r)
+        self.workers[pid] = worker
+        logger.info("Spawned worker %d", pid)
+        return worker
+
+    def _on_signal(self, signum, _frame) -> None:
+        if signum == signal.SIGHUP:
+            self.reload = True
+        else:
+            self.stopping = True
+
+    def _poll(self, timeout: float) -> None:
+        """Collect status reports (ready / retire requests) and reap exited workers."""
+        fds = [w.status_fd for w in self.workers.values() if w.status_fd >= 0]
+        if fds:
+            readable, _, _ = select.select(fds, [], [], timeout)
+            for w in list(self.workers.values()):
+                if w.status_fd < 0 or w.status_fd not in readable:
+                    continue
+                data = os.read(w.status_fd, 64)
+                if not data:  # worker exited; reaped below
+                    os.close(w.status_fd)
+                    w.status_fd = -1
+                    continue
+                if b"1" in data and not w.ready:
+                    w.ready = True
+                    logger.info("Worker %d ready after %.1fs", w.pid, time.monotonic() - w.started)
+                if b"r" in data:
+                    w.retire_requested = True
+        else:
+            time.sleep(timeout)
+        while True:
+            try:
+                pid, status = os.waitpid(-1, os.WNOHANG)
+            except ChildProcessError:
+                return
+            if pid == 0:
+                return
+            w = self.workers.pop(pid, None)
+            if w is None:
+                continue
+            if w.status_fd >= 0:
+                os.close(w.status_fd)
+            if not w.retiring and not self.stopping:
+                logger.warning("Worker %d exited unexpectedly (status %d)", pid, status)
+
+    def _stop(self, w: Worker, sig: int = signal.SIGTERM) -> None:
+        w.retiring = True
+        try:
+            os.kill(w.pid, sig)
+        except ProcessLookupError:
+            pass
+
+    def _wait_gone(self, pids: List[int], timeout: float) -> None:
+        deadline = time.monotonic() + timeout
+        while any(p in self.workers for p in pids) and time.monotonic() < deadline:
+            self._poll(0.1)
+        for pid in pids:
+            if pid in self.workers:
+                logger.warning("Worker %d ignored graceful stop; killing", pid)
+                self._stop(self.workers[pid], signal.SIGKILL)
+        while any(p in self.workers for p in pids):
+            self._poll(0.1)
+
+    def replace(self, old: Worker) -> bool:
+        """Start a successor, wait for it to be ready, then drain ``old``."""
+        new = self.spawn()
+        deadline = time.monotonic() + self.boot_timeout
+        while not new.ready and new.pid in self.workers and time.monotonic() < deadline and not self.stopping:
+            self._poll(0.2)
+        if not new.ready:
+            logger.error("Replacement worker %d failed to start; keeping %d", new.pid, old.pid)
+            if new.pid in self.workers:
+                self._stop(new, signal.SIGKILL)
+            return False
+        self._stop(old)
+        self._wait_gone([old.pid], self.graceful_timeout + 5)
+        return True
+
+    def rolling_restart(self) -> None:
+        logger.info("Rolling restart of %d workers", len(self.workers))
+        for old in [w for w in self.workers.values() if not w.retiring]:
+            if self.stopping or not self.replace(old):
+                return
+
+    def shutdown(self) -> None:
+        pids = list(self.workers)
+        for w in list(self.workers.values()):
+            self._stop(w)
+        self._wait_gone(pids, self.graceful_timeout + 5)
+
+    def run(self) -> None:
+        for sig in (signal.SIGHUP, signal.SIGTERM, signal.SIGINT):
+            signal.signal(sig, self._on_signal)
+        while not self.stopping:
+            live = [w for w in self.workers.values() if not w.retiring]
+            for _ in range(self.target - len(live)):
+                self.spawn()
+            self._poll(1.0)
+            for w in [w for w in self.workers.values() if w.retire_requested and not w.retiring]:
+                w.retire_requested = False
+                if self.stopping or not self.replace(w):
+                    break
+            if self.reload and not self.stopping:
+                self.reload = False
+                self.rolling_restart()
+        logger.info("Shutting down %d workers", len(self.workers))
+        self.shutdown()
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    settings = get_settings()
+    parser = argparse.ArgumentParser(prog="python -m app.serve", description=__doc__.split("\n")[0])
+    parser.add_argument("--host", default=os.getenv("HOST", "0.0.0.0"))
+    parser.add_argument("--port", type=int, default=int(os.getenv("PORT", "8085")))
+    parser.add_argument("--workers", type=int, default=settings.workers, help="0 = auto from cores and memory")
+    parser.add_argument("--no-warm", action="store_true", help="load the model lazily on first request")
+    args = parser.parse_args(argv)
+    logging.basicConfig(level=settings.log_level.upper(), format="%(asctime)s %(name)s %(levelname)s %(message)s")
+
+    workers = resolve_workers(args.workers)
+    _preload()
+    sock = _bind(args.host, args.port)
+    logger.info("Master %d listening on %s:%d with %d workers", os.getpid(), args.host, args.port, workers)
+    Arbiter(sock, workers, warm=not args.no_warm).run()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
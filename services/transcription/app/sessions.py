@@ -0,0 +1,101 @@
+"""Retention of interrupted WebSocket sessions for resumption.
+
+When a socket drops mid-stream the ``StreamSession`` (buffered audio, live
+decoder, or an already computed final result) is parked here under its
+``session_id`` for ``WS_RESUME_TTL_SECONDS``. A reconnecting client that
+authenticates as the same ``sub`` can claim it and continue from the last
+acknowledged byte offset. Expired or evicted sessions are closed.
+"""
+from __future__ import annotations
+import asyncio
+import time
+from collections import OrderedDict
+from typing import Any, Optional, Tuple
+
+from .config import get_settings
+from .metrics import REGISTRY, Gauge
+
+PARKED_SESSIONS: Gauge = REGISTRY.register(  # type: ignore[assignment]
+    Gauge("transcription_parked_sessions", "Disconnected WebSocket sessions awaiting resumption.")
+)
+
+
+class SessionRegistry:
+    def __init__(self, ttl_seconds: Optional[float] = None, max_sessions: Optional[int] = None):
+        settings = get_settings()
+        self.ttl_seconds = ttl_seconds if ttl_seconds is not None else settings.ws_resume_ttl_seconds
+        self.max_sessions = max_sessions if max_sessions is not None else settings.ws_resume_max_sessions
+        # session_id -> (session, expires_at, timer handle)
+        self._parked: "OrderedDict[str, Tuple[Any, float, Optional[asyncio.TimerHandle]]]" = OrderedDict()
+
+    def __len__(self) -> int:
+        return len(self._parked)
+
+    def park(self, session: Any) -> None:
+        sid = session.session_id
+        if not sid or self.ttl_seconds <= 0:
+            _close(session)
+            return
+        self._drop(sid, close=True)
+        handle = None
+        try:
+            handle = asyncio.get_running_loop().call_later(self.ttl_seconds, self._drop, sid, True)
+        except RuntimeError:  # pragma: no cover - no loop; rely on lazy expiry in claim()
+            pass
+        self._parked[sid] = (session, time.monotonic() + self.ttl_seconds, handle)
+        PARKED_SESSIONS.set(len(self._parked))
+        while len(self._parked) > self.max_sessions:
+            oldest = next(iter(self._parked))
+            self._drop(oldest, close=True)
+
+    def claim(self, session_id: str, sub: Optional[str]) -> Optional[Any]:
+        """Hand a parked session to a reconnecting client owned by the same ``sub``."""
+        entry = self._parked.get(session_id)
+        if entry is None:
+            return None
+        session, expires_at, _handle = entry
+        if time.monotonic() >= expires_at:
+            self._drop(session_id, close=True)
+            return None
+        if not sub or session.owner != sub:
+            return None
+        return self._drop(session_id, close=False)
+
+    def clear(self) -> None:
+        for sid in list(self._parked):
+            self._drop(sid, close=True)
+
+    def _drop(self, session_id: str, close: bool) -> Optional[Any]:
+        entry = self._parked.pop(session_id, None)
+        PARKED_SESSIONS.set(len(self._parked))
+        if entry is None:
+            return None
+        session, _expires, handle = entry
+        if handle is not None:
+            handle.cancel()
+        if close:
+            _close(session)
+            return None
+        return session
+
+
+def _close(session: Any) -> None:
+    try:
+        asyncio.get_running_loop()
+    except RuntimeError:
+        session.close_nowait()  # outside the event loop (e.g. shutdown): kill without reaping
+        return
+    asyncio.ensure_future(session.aclose())
+
+
+_registry: Optional[SessionRegistry] = None
+
+
+def get_registry() -> SessionRegistry:
+    global _registry
+    if _registry is None:
+        _registry = SessionRegistry()
+    return _registry
+
+
+__all__ = ["SessionRegistry", "get_registry", "PARKED_SESSIONS"]
@@ -0,0 +1,212 @@
+"""Optional transcript store with segment-level full-text search.
+
+Enabled by ``TRANSCRIPT_STORE_PATH``: every finished transcription (upload or
+WebSocket) is written to an embedded SQLite database together with its
+segments and stage timings, so it can be fetched again by id without
+re-running inference and searched by phrase with segment timestamps. Text is
+stored exactly as returned to the client (redacted when redaction is on) and
+every read is scoped to the owning ``sub``.
+
+The tables use portable column types; ``POSTGRES_SCHEMA`` is the equivalent
+DDL for deployments that mirror the store into PostgreSQL, where the FTS5 table
+is replaced by a ``tsvector`` column with a GIN index.
+"""
+from __future__ import annotations
+import json
+import secrets
+import sqlite3
+import threading
+import time
+from typing import Any, Dict, List, Optional
+
+from .config import get_settings
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS transcripts (
+    id TEXT PRIMARY KEY,
+    sub TEXT NOT NULL,
+    created_at REAL NOT NULL,
+    source TEXT NOT NULL,
+    filename TEXT NOT NULL,
+    language TEXT NOT NULL,
+    duration_seconds REAL NOT NULL,
+    model TEXT NOT NULL,
+    processing_ms INTEGER NOT NULL,
+    redaction_applied INTEGER NOT NULL,
+    reused_seconds REAL NOT NULL,
+    text TEXT NOT NULL,
+    timings TEXT
+);
+CREATE INDEX IF NOT EXISTS transcripts_sub_created ON transcripts (sub, created_at);
+CREATE TABLE IF NOT EXISTS segments (
+    transcript_id TEXT NOT NULL REFERENCES transcripts (id) ON DELETE CASCADE,
+    idx INTEGER NOT NULL,
+    start_s REAL NOT NULL,
+    end_s REAL NOT NULL,
+    text TEXT NOT NULL,
+    avg_logprob REAL,
+    no_speech_prob REAL,
+    temperature REAL,
+    PRIMARY KEY (transcript_id, idx)
+);
+"""
+
+FTS_SCHEMA = """
+CREATE VIRTUAL TABLE IF NOT EXISTS segments_fts USING fts5(text, content='segments', content_rowid='rowid');
+"""
+
+POSTGRES_SCHEMA = SCHEMA.replace("REAL", "DOUBLE PRECISION") + """
+ALTER TABLE segments ADD COLUMN IF NOT EXISTS tsv tsvector GENERATED ALWAYS AS (to_tsvector('simple', text)) STORED;
+CREATE INDEX IF NOT EXISTS segments_tsv ON segments USING GIN (tsv);
+"""
+
+_TRANSCRIPT_COLUMNS = (
+    "id", "sub", "created_at", "source", "filename", "language", "duration_seconds", "model",
+    "processing_ms", "redaction_applied", "reused_seconds", "text", "timings",
+)
+
+
+def _match_query(query: str) -> str:
+    """Quote every term so user input is matched literally, never parsed as FTS syntax."""
+    return " ".join('"' + term.replace('"', '""') + '"' for term in query.split())
+
+
+def _like_pattern(query: str) -> str:
+    """Substring LIKE pattern with ``%``, ``_`` and the escape character matched literally."""
+    return "%" + query.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_") + "%"
+
+
+class TranscriptStore:
+    def __init__(self, path: str):
+        self.path = path
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._conn.row_factory = sqlite3.Row
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA foreign_keys=ON")
+        self._conn.executescript(SCHEMA)
+        try:
+            self._conn.executescript(FTS_SCHEMA)
+            self.fts = True
+        except sqlite3.OperationalError:  # SQLite built without FTS5: fall back to LIKE scans
+            self.fts = False
+
+    def save(self, sub: str, record: Dict[str, Any], source: str = "upload") -> str:
+        """Persist a finished transcription and return its id."""
+        transcript_id = secrets.token_urlsafe(12)
+        timings = record.get("timings")
+        row = (
+            transcript_id, sub, time.time(), source, record["filename"], record["language"],
+            float(record["duration_seconds"]), record["model"], int(record["processing_ms"]),
+            int(bool(record.get("redaction_applied"))), float(record.get("reused_seconds") or 0.0),
+            record["text"], json.dumps(timings) if timings is not None else None,
+        )
+        segments = [
+            (transcript_id, int(s.get("id", i)), float(s["start"]), float(s["end"]), s.get("text") or "",
+             s.get("avg_logprob"), s.get("no_speech_prob"), s.get("temperature"))
+            for i, s in enumerate(record["segments"])
+        ]
+        with self._lock:
+            self._conn.execute("BEGIN")
+            try:
+                self._conn.execute(
+                    f"INSERT INTO transcripts ({', '.join(_TRANSCRIPT_COLUMNS)}) "
+                    f"VALUES ({', '.join('?' * len(_TRANSCRIPT_COLUMNS))})",
+                    row,
+                )
+                self._conn.executemany("INSERT INTO segments VALUES (?, ?, ?, ?, ?, ?, ?, ?)", segments)
+                if self.fts:
+                    self._conn.execute(
+                        "INSERT INTO segments_fts (rowid, text) "
+                        "SELECT rowid, text FROM segments WHERE transcript_id = ?",
+                        (transcript_id,),
+                    )
+                self._conn.execute("COMMIT")
+            except Exception:
+                self._conn.execute("ROLLBACK")
+                raise
+        return transcript_id
+
+    def get(self, sub: str, transcript_id: str) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT * FROM transcripts WHERE id = ? AND sub = ?", (transcript_id, sub)
+            ).fetchone()
+            if row is None:
+                return None
+            segs = self._conn.execute(
+                "SELECT * FROM segments WHERE transcript_id = ? ORDER BY idx", (transcript_id,)
+            ).fetchall()
+        return {
+            "transcript_id": row["id"],
+            "created_at": row["created_at"],
+            "source": row["source"],
+            "filename": row["filename"],
+            "language": row["language"],
+            "duration_seconds": row["duration_seconds"],
+            "model": row["model"],
+            "processing_ms": row["processing_ms"],
+            "redaction_applied": bool(row["redaction_applied"]),
+            "reused_seconds": row["reused_seconds"],
+            "text": row["text"],
+            "segments": [
+                {"id": s["idx"], "start": s["start_s"], "end": s["end_s"], "text": s["text"],
+                 "avg_logprob": s["avg_logprob"], "no_speech_prob": s["no_speech_prob"],
+                 "temperature": s["temperature"]}
+                for s in segs
+            ],
+            "timings": json.loads(row["timings"]) if row["timings"] else None,
+        }
+
+    def search(self, sub: str, query: str, limit: int = 20, offset: int = 0) -> Dict[str, Any]:
+        """Matching segments across the caller's transcripts, best match first.
+
+        Fetches one extra row to report whether another page exists.
+        """
+        if not query.split():
+            return {"results": [], "next_offset": None}
+        select = (
+            "SELECT s.transcript_id, s.idx, s.start_s, s.end_s, s.text, t.filename, t.created_at "
+            "FROM segments s JOIN transcripts t ON t.id = s.transcript_id "
+        )
+        if self.fts:
+            sql = (
+                select + "JOIN segments_fts f ON f.rowid = s.rowid "
+                "WHERE segments_fts MATCH ? AND t.sub = ? ORDER BY f.rank, s.transcript_id, s.idx LIMIT ? OFFSET ?"
+            )
+            params: tuple = (_match_query(query), sub, limit + 1, offset)
+        else:
+            sql = (
+                select + "WHERE s.text LIKE ? ESCAPE '\\' AND t.sub = ? "
+                "ORDER BY t.created_at DESC, s.idx LIMIT ? OFFSET ?"
+            )
+            params = (_like_pattern(query), sub, limit + 1, offset)
+        with self._lock:
+            rows = self._conn.execute(sql, params).fetchall()
+        results: List[Dict[str, Any]] = [
+            {"transcript_id": r["transcript_id"], "segment_id": r["idx"], "start": r["start_s"], "end": r["end_s"],
+             "text": r["text"], "filename": r["filename"], "created_at": r["created_at"]}
+            for r in rows[:limit]
+        ]
+        return {"results": results, "next_offset": offset + limit if len(rows) > limit else None}
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
+
+
+_store: Optional[TranscriptStore] = None
+
+
+def get_store() -> Optional[TranscriptStore]:
+    """The process-wide store, or None when ``TRANSCRIPT_STORE_PATH`` is unset."""
+    global _store
+    path = get_settings().transcript_store_path
+    if not path:
+        return None
+    if _store is None or _store.path != path:
+        _store = TranscriptStore(path)
+    return _store
+
+
+__all__ = ["TranscriptStore", "get_store", "SCHEMA", "POSTGRES_SCHEMA"]
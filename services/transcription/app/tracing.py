@@ -0,0 +1,483 @@
+"""W3C Trace Context propagation and lightweight spans.
+
+Same tracer as ``services/shared/tracing.py``; the transcription image is built
+from this directory alone, so it keeps its own copy (as with ``jwks``).
+
+Usage:
+
+from app import tracing
+tracing.configure("transcription")             # reads TRACE_* (off unless an exporter is set)
+app.add_middleware(tracing.TracingMiddleware)  # server span per request from ``traceparent``
+with tracing.span("rbac.check", {"rbac.action": action}) as s:
+    s.set_attribute("rbac.allowed", True)
+headers = tracing.inject({})                   # outgoing ``traceparent``
+
+Configuration:
+
+- ``TRACE_EXPORTER``: ``none`` (default, tracing off), ``file``, ``otlp`` or ``file,otlp``
+- ``TRACE_FILE``: JSON-lines file for the ``file`` exporter (default ``traces.jsonl``)
+- ``TRACE_OTLP_ENDPOINT``: OTLP/HTTP JSON endpoint (default ``http://localhost:4318/v1/traces``)
+- ``TRACE_SAMPLE_RATIO``: share of new traces recorded (default 0.1); a request
+  arriving with a ``traceparent`` follows its sampled flag instead
+
+Each line of the trace file is an OTLP ``ExportTraceServiceRequest`` in JSON, the
+same document the ``otlp`` exporter POSTs, so the file can be read directly or
+replayed into any collector later; nothing needs to be running to record traces.
+
+Spans are queued and exported in batches by a background thread; a full queue
+drops spans rather than slowing requests. With tracing off ``span`` returns a
+shared no-op after one global check, and inside an unsampled trace after one
+context lookup.
+"""
+from __future__ import annotations
+import atexit
+import json
+import logging
+import os
+import random
+import re
+import threading
+import time
+import urllib.request
+from contextvars import ContextVar
+from queue import Empty, Full, Queue
+from typing import Any, Dict, List, MutableMapping, NamedTuple, Optional
+
+logger = logging.getLogger("transcription.tracing")
+
+INTERNAL, SERVER, CLIENT = 1, 2, 3
+STATUS_OK, STATUS_ERROR = 1, 2
+
+_TRACEPARENT = re.compile(r"^([0-9a-f]{2})-([0-9a-f]{32})-([0-9a-f]{16})-([0-9a-f]{2})(?:-.*)?$")
+_INVALID_TRACE_ID = "0" * 32
+_INVALID_SPAN_ID = "0" * 16
+
+
+class SpanContext(NamedTuple):
+    trace_id: str
+    span_id: str
+    sampled: bool
+
+
+def parse_traceparent(value: Optional[str]) -> Optional[SpanContext]:
+    """The context in a ``traceparent`` header, or None when absent or malformed."""
+    if not value:
+        return None
+    m = _TRACEPARENT.match(value.strip().lower())
+    if m is None:
+        return None
+    version, trace_id, span_id, flags = m.groups()
+    if version == "ff" or trace_id == _INVALID_TRACE_ID or span_id == _INVALID_SPAN_ID:
+        return None
+    if version == "00" and len(value.strip()) != 55:
+        return None
+    return SpanContext(trace_id, span_id, bool(int(flags, 16) & 1))
+
+
+def format_traceparent(ctx: SpanContext) -> str:
+    return f"00-{ctx.trace_id}-{ctx.span_id}-{'01' if ctx.sampled else '00'}"
+
+
+def _new_id(bits: int) -> str:
+    value = 0
+    while not value:
+        value = random.getrandbits(bits)
+    return f"{value:0{bits // 4}x}"
+
+
+_CURRENT: ContextVar[Optional[SpanContext]] = ContextVar("trace_context", default=None)
+
+
+def current_context() -> Optional[SpanContext]:
+    return _CURRENT.get()
+
+
+def inject(headers: MutableMapping[str, str]) -> MutableMapping[str, str]:
+    """Add ``traceparent`` for the current span to outgoing ``headers``."""
+    ctx = _CURRENT.get()
+    if ctx is not None:
+        headers["traceparent"] = format_traceparent(ctx)
+    return headers
+
+
+class _NoopSpan:
+    recording = False
+    context: Optional[SpanContext] = None
+
+    def __enter__(self) -> "_NoopSpan":
+        return self
+
+    def __exit__(self, exc_type, exc, tb) -> bool:
+        return False
+
+    def set_attribute(self, key: str, value: Any) -> None:
+        pass
+
+    def set_error(self, message: str) -> None:
+        pass
+
+    def update_name(self, name: str) -> None:
+        pass
+
+
+NOOP = _NoopSpan()
+
+
+class _ContextSpan(_NoopSpan):
+    """Not recorded, but makes ``context`` current so children inherit the decision."""
+
+    def __init__(self, context: SpanContext):
+        self.context = context
+        self._token = None
+
+    def __enter__(self) -> "_ContextSpan":
+        self._token = _CURRENT.set(self.context)
+        return self
+
+    def __exit__(self, exc_type, exc, tb) -> bool:
+        _CURRENT.reset(self._token)
+        return False
+
+
+class Span:
+    recording = True
+    __slots__ = ("tracer", "name", "context", "parent_id", "kind", "attributes", "start_ns", "end_ns",
+                 "status", "message", "_token")
+
+    def __init__(self, tracer: "Tracer", name: str, context: SpanContext, parent_id: Optional[str],
+                 kind: int, attributes: Optional[Dict[str, Any]]):
+        self.tracer = tracer
+        self.name = name
+        self.context = context
+        self.parent_id = parent_id
+        self.kind = kind
+        self.attributes = dict(attributes) if attributes else {}
+        self.start_ns = 0
+        self.end_ns = 0
+        self.status = 0
+        self.message = ""
+        self._token = None
+
+    def __enter__(self) -> "Span":
+        self.start_ns = time.time_ns()
+        self._token = _CURRENT.set(self.context)
+        return self
+
+    def __exit__(self, exc_type, exc, tb) -> bool:
+        self.end_ns = time.time_ns()
+        _CURRENT.reset(self._token)
+        if exc is not None and not self.status:
+            self.set_error(f"{exc_type.__name__}: {exc}")
+        self.tracer.export(self)
+        return False
+
+    def set_attribute(self, key: str, value: Any) -> None:
+        self.attributes[key] = value
+
+    def set_error(self, message: str) -> None:
+        self.status = STATUS_ERROR
+        self.message = message[:256]
+
+    def update_name(self, name: str) -> None:
+        self.name = name
+
+
+def _otlp_value(value: Any) -> Dict[str, Any]:
+    if isinstance(value, bool):
+        return {"boolValue": value}
+    if isinstance(value, int):
+        return {"intValue": str(value)}
+    if isinstance(value, float):
+        return {"doubleValue": value}
+    return {"stringValue": str(value)}
+
+
+def _otlp_span(s: Span) -> Dict[str, Any]:
+    out: Dict[str, Any] = {
+        "traceId": s.context.trace_id,
+        "spanId": s.context.span_id,
+        "name": s.name,
+        "kind": s.kind,
+        "startTimeUnixNano": str(s.start_ns),
+        "endTimeUnixNano": str(s.end_ns),
+        "attributes": [{"key": k, "value": _otlp_value(v)} for k, v in s.attributes.items()],
+    }
+    if s.parent_id:
+        out["parentSpanId"] = s.parent_id
+    if s.status:
+        out["status"] = {"code": s.status, "message": s.message} if s.message else {"code": s.status}
+    return out
+
+
+def encode_otlp(service_name: str, spans: List[Span]) -> bytes:
+    """An OTLP/HTTP JSON ``ExportTraceServiceRequest`` for ``spans``."""
+    doc = {"resourceSpans": [{
+        "resource": {"attributes": [
+            {"key": "service.name", "value": {"stringValue": service_name}},
+            {"key": "process.pid", "value": {"intValue": str(os.getpid())}},
+        ]},
+        "scopeSpans": [{"scope": {"name": "webqx.tracing"}, "spans": [_otlp_span(s) for s in spans]}],
+    }]}
+    return json.dumps(doc, separators=(",", ":")).encode("utf-8")
+
+
+class FileExporter:
+    """Appends one OTLP JSON document per batch to ``path`` with a single ``O_APPEND`` write."""
+
+    def __init__(self, path: str):
+        self.path = path
+        self._fd = -1
+
+    def export(self, payload: bytes) -> None:
+        if self._fd < 0:
+            self._fd = os.open(self.path, os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o640)
+        os.write(self._fd, payload + b"\n")
+
+    def close(self) -> None:
+        if self._fd >= 0:
+            os.close(self._fd)
+            self._fd = -1
+
+
+class OTLPExporter:
+    """POSTs batches to an OTLP/HTTP JSON endpoint (a collector or Jaeger/Tempo with OTLP enabled)."""
+
+    def __init__(self, endpoint: str, timeout: float = 5.0):
+        self.endpoint = endpoint
+        self.timeout = timeout
+
+    def export(self, payload: bytes) -> None:
+        req = urllib.request.Request(
+            self.endpoint, data=payload, method="POST", headers={"Content-Type": "application/json"}
+        )
+        with urllib.request.urlopen(req, timeout=self.timeout) as resp:
+            resp.read()
+
+    def close(self) -> None:
+        pass
+
+
+_STOP = object()
+
+
+class Tracer:
+    def __init__(self, service_name: str, exporters: List[Any], sample_ratio: float = 0.1,
+                 max_queue: int = 2048, batch_size: int = 512, flush_interval: float = 1.0):
+        self.service_name = service_name
+        self.exporters = exporters
+        self.sample_ratio = min(max(sample_ratio, 0.0), 1.0)
+        self._bound = int(self.sample_ratio * (1 << 64))
+        self.max_queue = max_queue
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.exported = 0
+        self.dropped = 0
+        self.export_errors = 0
+        self._start()
+
+    def _start(self) -> None:
+        self._q: Queue[Any] = Queue(maxsize=self.max_queue)
+        self._thread = threading.Thread(target=self._worker, name="trace-export", daemon=True)
+        self._thread.start()
+
+    def sampled(self, trace_id: str) -> bool:
+        # ratio on the low 64 bits of the trace id, so every service makes the same call
+        return int(trace_id[16:], 16) < self._bound
+
+    def span(self, name: str, attributes: Optional[Dict[str, Any]] = None, *, kind: int = INTERNAL,
+             parent: Optional[SpanContext] = None):
+        parent = parent if parent is not None else _CURRENT.get()
+        if parent is None:
+            trace_id = _new_id(128)
+            if not self.sampled(trace_id):
+                return _ContextSpan(SpanContext(trace_id, _new_id(64), False))
+            return Span(self, name, SpanContext(trace_id, _new_id(64), True), None, kind, attributes)
+        if not parent.sampled:
+            return _ContextSpan(parent) if kind == SERVER else NOOP
+        return Span(self, name, SpanContext(parent.trace_id, _new_id(64), True), parent.span_id, kind, attributes)
+
+    def export(self, span: Span) -> None:
+        try:
+            self._q.put_nowait(span)
+        except Full:
+            self.dropped += 1
+
+    def _worker(self) -> None:
+        stopping = False
+        while not stopping:
+            item = self._q.get()
+            if item is _STOP:
+                break
+            batch = [item]
+            deadline = time.monotonic() + self.flush_interval
+            while len(batch) < self.batch_size:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                try:
+                    item = self._q.get(timeout=remaining)
+                except Empty:
+                    break
+                if item is _STOP:
+                    stopping = True
+                    break
+                batch.append(item)
+            self._flush(batch)
+        rest = []
+        while True:
+            try:
+                item = self._q.get_nowait()
+            except Empty:
+                break
+            if item is not _STOP:
+                rest.append(item)
+        if rest:
+            self._flush(rest)
+        for exporter in self.exporters:
+            exporter.close()
+
+    def _flush(self, batch: List[Span]) -> None:
+        payload = encode_otlp(self.service_name, batch)
+        for exporter in self.exporters:
+            try:
+                exporter.export(payload)
+            except Exception as e:  # tracing must never take the service down
+                self.export_errors += 1
+                logger.warning("Exporting %d spans via %s failed: %s", len(batch), type(exporter).__name__, e)
+        self.exported += len(batch)
+
+    def stats(self) -> Dict[str, int]:
+        return {"exported": self.exported, "dropped": self.dropped, "export_errors": self.export_errors,
+                "queued": self._q.qsize()}
+
+    def shutdown(self, timeout: float = 5.0) -> None:
+        """Export everything queued and close the exporters."""
+        if not self._thread.is_alive():
+            return
+        self._q.put(_STOP)
+        self._thread.join(timeout=timeout)
+
+
+_tracer: Optional[Tracer] = None
+
+
+def _restart_after_fork() -> None:
+    # A tracer configured before fork (preloading servers) has no export thread in the child;
+    # spans queued in the parent are the parent's to export.
+    if _tracer is not None:
+        _tracer._start()
+
+
+if hasattr(os, "register_at_fork"):
+    os.register_at_fork(after_in_child=_restart_after_fork)
+
+
+def configure(service_name: str, exporter: Optional[str] = None, sample_ratio: Optional[float] = None) -> Optional[Tracer]:
+    """Install the process tracer from the arguments or ``TRACE_*``; None when tracing is off."""
+    global _tracer
+    if _tracer is not None:
+        return _tracer
+    names = [n.strip() for n in (exporter or os.getenv("TRACE_EXPORTER", "none")).split(",") if n.strip()]
+    exporters: List[Any] = []
+    for name in names:
+        if name == "file":
+            exporters.append(FileExporter(os.getenv("TRACE_FILE", "traces.jsonl")))
+        elif name == "otlp":
+            exporters.append(OTLPExporter(os.getenv("TRACE_OTLP_ENDPOINT", "http://localhost:4318/v1/traces")))
+        elif name != "none":
+            raise ValueError(f"Unknown TRACE_EXPORTER {name!r}")
+    if not exporters:
+        return None
+    ratio = sample_ratio if sample_ratio is not None else float(os.getenv("TRACE_SAMPLE_RATIO", "0.1"))
+    _tracer = Tracer(service_name, exporters, ratio)
+    atexit.register(_tracer.shutdown)
+    return _tracer
+
+
+def get_tracer() -> Optional[Tracer]:
+    return _tracer
+
+
+def span(name: str, attributes: Optional[Dict[str, Any]] = None, *, kind: int = INTERNAL,
+         parent: Optional[SpanContext] = None):
+    """Context manager timing a block as a child of the current span (a no-op when tracing is off)."""
+    tracer = _tracer
+    if tracer is None:
+        return NOOP
+    return tracer.span(name, attributes, kind=kind, parent=parent)
+
+
+def _route_name(scope: Dict[str, Any]) -> Optional[str]:
+    endpoint = scope.get("endpoint")
+    if endpoint is None:
+        return None
+    for route in getattr(scope.get("router"), "routes", ()):
+        if getattr(route, "endpoint", None) is endpoint:
+            return getattr(route, "path", None)
+    return None
+
+
+class TracingMiddleware:
+    """ASGI middleware: a server span per request, continuing an incoming ``traceparent``.
+
+    The response carries ``traceresponse`` (same format as ``traceparent``) so a
+    caller can find the trace for a slow request.
+    """
+
+    def __init__(self, app: Any):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] not in ("http", "websocket") or _tracer is None:
+            await self.app(scope, receive, send)
+            return
+        parent = None
+        for key, value in scope.get("headers", ()):
+            if key == b"traceparent":
+                parent = parse_traceparent(value.decode("latin-1"))
+                break
+        method = scope.get("method", "WS")
+        with span(f"{method} {scope['path']}", {"http.method": method, "http.target": scope["path"]},
+                  kind=SERVER, parent=parent) as s:
+            ctx = s.context
+
+            async def send_wrapper(message):
+                if message["type"] == "http.response.start":
+                    status = message["status"]
+                    s.set_attribute("http.status_code", status)
+                    if status >= 500:
+                        s.set_error(f"HTTP {status}")
+                    if ctx is not None:
+                        header = format_traceparent(ctx).encode("latin-1")
+                        message = {**message, "headers": [*message.get("headers", ()), (b"traceresponse", header)]}
+                await send(message)
+
+            try:
+                await self.app(scope, receive, send_wrapper)
+            finally:
+                if s.recording:
+                    route = _route_name(scope)
+                    if route is not None:
+                        s.update_name(f"{method} {route}")
+                        s.set_attribute("http.route", route)
+
+
+__all__ = [
+    "SpanContext",
+    "Span",
+    "Tracer",
+    "TracingMiddleware",
+    "FileExporter",
+    "OTLPExporter",
+    "configure",
+    "get_tracer",
+    "span",
+    "inject",
+    "current_context",
+    "parse_traceparent",
+    "format_traceparent",
+    "encode_otlp",
+    "INTERNAL",
+    "SERVER",
+    "CLIENT",
+]
@@ -1,68 +1,511 @@
+import asyncio
+import json
+import logging
 import os
+import secrets
 import tempfile
+from typing import Any, Awaitable, Callable, Dict, Optional
+
 from fastapi import WebSocket, WebSocketDisconnect
 from fastapi.concurrency import run_in_threadpool
+from starlette.websockets import WebSocketState
 
-from .audio import transcode_to_wav_16k, AudioProcessingError
+from .audio import transcode_to_wav_16k, AudioProcessingError, PcmBuffer, StreamDecoder
+from .cascade import CascadeStreamer
 from .model import run_transcription
 from .redaction import redact_segments, redact_text
 from .config import get_settings
+from .sessions import get_registry
+from .store import get_store
+from .metrics import StageTimer, run_timed, ACTIVE_SESSIONS, DECODER_PROCESSES, WS_CONNECTIONS
 
 settings = get_settings()
+logger = logging.getLogger("transcription.websocket")
+
+PCM_CODECS = {"pcm16", "pcm_s16le", "s16le"}
+# Formats ffmpeg can decode from a non-seekable pipe (mp4/m4a need the moov atom, so stay batch)
+STREAMABLE_CODECS = {"webm", "opus", "ogg", "mp3", "wav", "flac", "aac"} | PCM_CODECS
 
 
 class StreamSession:
-    def __init__(self, websocket: WebSocket, claims: dict):
+    """One streaming transcription.
+
+    Sessions default to container mode (arbitrary media bytes, decoded by ffmpeg at
+    ``__end__``). A ``{"type": "start", "codec": "pcm16", "sample_rate": 16000,
+    "channels": 1}`` message switches to the PCM fast lane: frames go straight into a
+    preallocated sample buffer and are handed to the model without ffmpeg. Other
+    streamable codecs (e.g. ``webm``/``opus``) get a per-session ffmpeg decoder
+    pipe that fills the same buffer incrementally while frames arrive.
+
+    Adding ``"partials": true`` to ``start`` (PCM or stream-decoded sessions only)
+    enables the two-tier cascade: small-model ``partial`` captions while audio
+    arrives, with committed windows re-decoded by the main model for the final.
+
+    Started sessions get a ``session_id``; ``bytes_applied`` is the byte offset
+    acknowledged to the client and the point a resumed stream continues from.
+    """
+
+    def __init__(
+        self,
+        websocket: WebSocket,
+        claims: dict,
+        channel: Optional[int] = None,
+        send: Optional[Callable[[Dict[str, Any]], Awaitable[None]]] = None,
+    ):
         self.ws = websocket
         self.claims = claims
+        self.channel = channel
+        self._send = send or websocket.send_json
         self.buffer = bytearray()
+        self.codec: Optional[str] = None
+        self.sample_rate = 16000
+        self.channels = 1
+        self.pcm: Optional[PcmBuffer] = None
+        self.decoder: Optional[StreamDecoder] = None
+        self.cascade: Optional[CascadeStreamer] = None
+        self.owner: Optional[str] = claims.get("sub")
+        self.session_id: Optional[str] = None
+        self.bytes_applied = 0
+        self.acked = 0
+        self.final_message: Optional[Dict[str, Any]] = None
+
+    def attach(self, websocket: WebSocket, claims: dict, channel: Optional[int],
+               send: Callable[[Dict[str, Any]], Awaitable[None]]) -> None:
+        """Rebind a resumed session to the client's new connection."""
+        self.ws = websocket
+        self.claims = claims
+        self.channel = channel
+        self._send = send
+
+    async def send(self, payload: Dict[str, Any]) -> None:
+        if self.channel is not None:
+            payload = {**payload, "channel": self.channel}
+        await self._send(payload)
+
+    @property
+    def mode(self) -> str:
+        if self.decoder is not None:
+            return "stream"
+        return "pcm" if self.pcm is not None else "container"
+
+    async def start(self, fmt: Dict[str, Any]) -> Dict[str, Any]:
+        if self.buffer or self.pcm is not None and len(self.pcm):
+            raise ValueError("start must precede audio frames")
+        codec = str(fmt.get("codec", "")).lower()
+        try:
+            self.sample_rate = int(fmt.get("sample_rate", 16000))
+            self.channels = int(fmt.get("channels", 1))
+        except (TypeError, ValueError):
+            raise ValueError("sample_rate and channels must be integers")
+        if self.sample_rate <= 0 or self.channels <= 0:
+            raise ValueError("sample_rate and channels must be positive")
+        self.codec = codec or None
+        await self.aclose()
+        self.pcm = None
+        if codec in PCM_CODECS and self.sample_rate == PcmBuffer.SAMPLE_RATE and self.channels == 1:
+            self.pcm = PcmBuffer(settings.max_audio_seconds)
+        elif codec in STREAMABLE_CODECS and settings.ws_stream_decode:
+            self.pcm = PcmBuffer(settings.max_audio_seconds)
+            self.decoder = StreamDecoder(self.pcm, self._input_args())
+            await self.decoder.start()
+            DECODER_PROCESSES.inc()
+        if fmt.get("partials") and self.pcm is not None:
+            self.cascade = CascadeStreamer(self.pcm, self.send)
+        ready = {"type": "ready", "mode": self.mode, "codec": self.codec, "sample_rate": self.sample_rate,
+                 "channels": self.channels, "partials": self.cascade is not None}
+        if self.owner and self.session_id is None:
+            self.session_id = secrets.token_urlsafe(18)
+        if self.session_id:
+            ready["session_id"] = self.session_id
+            ready["resume_ttl"] = settings.ws_resume_ttl_seconds
+        if self.channel is not None:
+            ready["channel"] = self.channel
+        return ready
 
     async def add_chunk(self, data: bytes):
-        self.buffer.extend(data)
+        if self.decoder is not None:
+            await self.decoder.feed(data)
+        elif self.pcm is not None:
+            self.pcm.append(data)
+        else:
+            self.buffer.extend(data)
+        self.bytes_applied += len(data)
+        if self.cascade is not None:
+            self.cascade.on_audio()
 
-    async def finalize(self):
+    async def maybe_ack(self, force: bool = False) -> None:
+        if self.session_id and self.bytes_applied > self.acked and (
+            force or self.bytes_applied - self.acked >= settings.ws_ack_bytes
+        ):
+            self.acked = self.bytes_applied
+            await self.send({"type": "ack", "offset": self.bytes_applied})
+
+    def _input_args(self):
+        # Raw PCM at another rate/layout still needs ffmpeg, but must be described up front
+        if self.codec in PCM_CODECS:
+            return ["-f", "s16le", "-ar", str(self.sample_rate), "-ac", str(self.channels)]
+        return []
+
+    async def _decode(self, timer: StageTimer):
+        """Return (audio, duration, cleanup_path) where audio is a wav path or sample array."""
+        if self.pcm is not None:
+            with timer.stage("transcode"):
+                if self.decoder is not None:
+                    # Only the undecoded tail is left to wait for here
+                    await self.decoder.finish()
+                # The cascade decodes its own windows; skip the full-length float copy
+                audio = self.pcm.as_float32() if self.cascade is None else None
+            return audio, self.pcm.duration, None
         fd, raw_path = tempfile.mkstemp()
         os.close(fd)
         try:
-            with open(raw_path, "wb") as f:
-                f.write(self.buffer)
-            wav_path, _ = await transcode_to_wav_16k(raw_path)
-            result = await run_in_threadpool(run_transcription, wav_path)
-            segments = result["segments"]
-            text = result["text"]
-            if settings.enable_redaction:
-                segments = redact_segments(segments)
-                text = redact_text(text)
-            await self.ws.send_json(
-                {
-                    "type": "final",
-                    "text": text,
-                    "segments": segments,
-                    "language": result["language"],
-                    "processing_ms": result["processing_ms"],
-                }
-            )
+            with timer.stage("receive"):
+                with open(raw_path, "wb") as f:
+                    f.write(self.buffer)
+            with timer.stage("transcode"):
+                wav_path, duration = await transcode_to_wav_16k(raw_path, self._input_args())
         finally:
             try:
                 os.remove(raw_path)
             except OSError:
                 pass
+        return wav_path, duration, wav_path
+
+    async def finalize(self):
+        timer = StageTimer("/v1/ws")
+        status = "error"
+        cleanup = None
+        try:
+            audio, duration, cleanup = await self._decode(timer)
+            timer.audio_seconds = duration
+            if self.cascade is not None:
+                result = await self.cascade.finish(timer)
+            else:
+                result = await run_timed(timer, "inference", run_transcription, audio)
+            with timer.stage("postprocess"):
+                segments = result["segments"]
+                text = result["text"]
+                if settings.enable_redaction:
+                    segments = redact_segments(segments)
+                    text = redact_text(text)
+            # Kept so a client that drops before receiving it can resume without re-inference
+            self.final_message = {
+                "type": "final",
+                "text": text,
+                "segments": segments,
+                "language": result["language"],
+                "processing_ms": result["processing_ms"],
+                "mode": self.mode,
+                "timings": timer.as_dict(),
+            }
+            if self.session_id:
+                self.final_message["session_id"] = self.session_id
+            store = get_store()
+            if store is not None and self.owner:
+                with timer.stage("store"):
+                    self.final_message["transcript_id"] = await run_in_threadpool(store.save, self.owner, {
+                        "filename": f"ws:{self.session_id or 'stream'}",
+                        "language": result["language"],
+                        "duration_seconds": duration,
+                        "model": result["model_size"],
+                        "processing_ms": result["processing_ms"],
+                        "redaction_applied": settings.enable_redaction,
+                        "text": text,
+                        "segments": segments,
+                        "timings": timer.as_dict(),
+                    }, "ws")
+            status = "ok"
+            await self.send(self.final_message)
+        finally:
+            timer.observe(status)
+            if cleanup:
+                try:
+                    os.remove(cleanup)
+                except OSError:
+                    pass
+
+    def close_nowait(self):
+        if self.cascade is not None:
+            self.cascade.cancel()
+        if self.decoder is not None:
+            decoder, self.decoder = self.decoder, None
+            DECODER_PROCESSES.dec()
+            decoder.kill()
+
+    async def aclose(self):
+        """Release the decoder process and cascade tasks, if any (also called on disconnect)."""
+        if self.cascade is not None:
+            cascade, self.cascade = self.cascade, None
+            cascade.cancel()
+        if self.decoder is not None:
+            decoder, self.decoder = self.decoder, None
+            DECODER_PROCESSES.dec()
+            await decoder.aclose()
+
+
+def _parse_control(text: str) -> Optional[Dict[str, Any]]:
+    if not text or not text.lstrip().startswith("{"):
+        return None
+    try:
+        msg = json.loads(text)
+    except ValueError:
+        return None
+    return msg if isinstance(msg, dict) else None
+
+
+_END = object()
+
+
+class _Channel:
+    """A ``StreamSession`` plus its own frame queue and consumer task.
+
+    Each channel drains its queue independently, so a slow decoder or a long
+    finalize on one channel never stalls frames for the others. The queue bound is
+    the per-channel flow-control window: crossing the high-water mark sends a
+    ``pause`` for that channel, dropping below the low-water mark sends ``resume``,
+    and overrunning it (or the byte cap) closes just that channel.
+    """
+
+    def __init__(self, mux: "ChannelMux", session: StreamSession):
+        self.mux = mux
+        self.session = session
+        self.queue: "asyncio.Queue[Any]" = asyncio.Queue(maxsize=settings.ws_channel_queue_frames)
+        self.bytes_received = session.bytes_applied
+        self.paused = False
+        self.ending = False
+        self.task = asyncio.create_task(self._run())
+
+    @property
+    def high_water(self) -> int:
+        return max(1, self.queue.maxsize * 3 // 4)
+
+    @property
+    def low_water(self) -> int:
+        return self.queue.maxsize // 4
+
+    async def _run(self):
+        park = False
+        try:
+            while True:
+                item = await self.queue.get()
+                if item is _END:
+                    try:
+                        await self.session.finalize()
+                    except AudioProcessingError as e:
+                        await self.session.send({"type": "error", "detail": str(e)})
+                    except Exception:
+                        # Socket gone after inference: keep the result for a resuming client
+                        park = self.session.final_message is not None
+                        if not park:
+                            logger.exception("Stream finalize failed")
+                            try:
+                                await self.session.send({"type": "error", "detail": "Transcription failed"})
+                            except Exception:
+                                pass  # socket already gone; nothing left to tell the client
+                    return
+                try:
+                    await self.session.add_chunk(item)
+                except AudioProcessingError as e:
+                    await self.session.send({"type": "error", "detail": str(e)})
+                    return
+                await self.session.maybe_ack()
+                if self.paused and self.queue.qsize() <= self.low_water:
+                    self.paused = False
+                    await self.session.send({"type": "flow", "state": "resume"})
+        except asyncio.CancelledError:
+            park = self.mux.detached
+            raise
+        finally:
+            self.mux._closed(self)
+            if park and self.session.session_id:
+                # Queued-but-unapplied frames are dropped; the client resends from the acked offset
+                get_registry().park(self.session)
+            else:
+                await self.session.aclose()
+
+    async def push(self, data: bytes) -> None:
+        self.bytes_received += len(data)
+        if self.bytes_received > settings.ws_channel_max_bytes:
+            await self.fail(f"Channel exceeded {settings.ws_channel_max_bytes} bytes")
+            return
+        try:
+            self.queue.put_nowait(data)
+        except asyncio.QueueFull:
+            await self.fail("Flow control window overrun; wait for resume")
+            return
+        if not self.paused and self.queue.qsize() >= self.high_water:
+            self.paused = True
+            await self.session.send({"type": "flow", "state": "pause", "offset": self.session.bytes_applied})
+
+    async def end(self) -> None:
+        if self.ending:
+            return
+        self.ending = True
+        await self.queue.put(_END)  # may wait for the consumer, never drops the end marker
+
+    async def fail(self, detail: str) -> None:
+        self.task.cancel()
+        await self.session.send({"type": "error", "detail": detail})
+
+
+class ChannelMux:
+    """Routes frames on one WebSocket to per-channel ``StreamSession``s.
+
+    Legacy clients never name a channel and get a single implicit session. Once a
+    ``start`` message carries ``"channel": <0-255>`` the connection is multiplexed:
+    binary frames are prefixed with one channel byte, ``{"type": "end", "channel": n}``
+    finalizes one channel, and results carry their ``channel``.
+    """
+
+    def __init__(self, ws: WebSocket, claims: dict):
+        self.ws = ws
+        self.claims = claims
+        self.multiplexed = False
+        self.detached = False
+        self.channels: Dict[Optional[int], _Channel] = {}
+        self._send_lock = asyncio.Lock()
+
+    async def send(self, payload: Dict[str, Any]) -> None:
+        async with self._send_lock:
+            await self.ws.send_json(payload)
+
+    def _open(self, channel: Optional[int], session: Optional[StreamSession] = None) -> _Channel:
+        if len(self.channels) >= settings.ws_max_channels:
+            raise ValueError(f"Too many channels (max {settings.ws_max_channels})")
+        if session is None:
+            session = StreamSession(self.ws, self.claims, channel=channel, send=self.send)
+        else:
+            session.attach(self.ws, self.claims, channel, self.send)
+        ch = _Channel(self, session)
+        self.channels[channel] = ch
+        ACTIVE_SESSIONS.inc()
+        return ch
+
+    def _closed(self, ch: _Channel) -> None:
+        ACTIVE_SESSIONS.dec()
+        if self.channels.get(ch.session.channel) is ch:
+            del self.channels[ch.session.channel]
+
+    @staticmethod
+    def _channel_id(value: Any) -> int:
+        if isinstance(value, bool) or not isinstance(value, int) or not 0 <= value <= 255:
+            raise ValueError("channel must be an integer 0-255")
+        return value
+
+    def _control_channel(self, control: Dict[str, Any]) -> Optional[int]:
+        channel: Optional[int] = None
+        if "channel" in control:
+            channel = self._channel_id(control["channel"])
+            if not self.multiplexed and None in self.channels:
+                raise ValueError("Cannot multiplex after unchannelled audio")
+            self.multiplexed = True
+        elif self.multiplexed:
+            raise ValueError("channel required on a multiplexed connection")
+        return channel
+
+    async def on_resume(self, control: Dict[str, Any]) -> None:
+        channel = self._control_channel(control)
+        if channel in self.channels:
+            raise ValueError("Channel already in use")
+        session = get_registry().claim(str(control.get("session_id", "")), self.claims.get("sub"))
+        if session is None:
+            raise ValueError("Unknown or expired session")
+        if session.final_message is not None:
+            # Inference already finished before the drop: deliver it, nothing to re-run
+            session.attach(self.ws, self.claims, channel, self.send)
+            await session.send({**session.final_message})
+            await session.aclose()
+            return
+        self._open(channel, session)
+        session.acked = session.bytes_applied
+        await session.send({"type": "resumed", "session_id": session.session_id, "offset": session.bytes_applied,
+                            "mode": session.mode})
+
+    async def on_start(self, control: Dict[str, Any]) -> None:
+        channel = self._control_channel(control)
+        ch = self.channels.get(channel)
+        if ch is None or ch.ending:
+            ch = self._open(channel)
+        elif ch.bytes_received:
+            raise ValueError("start must precede audio frames")
+        await self.send(await ch.session.start(control))
+
+    async def on_bytes(self, data: bytes) -> None:
+        channel: Optional[int] = None
+        if self.multiplexed:
+            channel, data = data[0], data[1:]
+        ch = self.channels.get(channel)
+        if ch is None:
+            if self.multiplexed:
+                await self.send({"type": "error", "channel": channel, "detail": "Unknown channel"})
+                return
+            ch = self._open(None)
+        if ch.ending:
+            await ch.session.send({"type": "error", "detail": "Channel already ended"})
+            return
+        await ch.push(data)
+
+    async def on_end(self, channel: Optional[int]) -> Optional[_Channel]:
+        ch = self.channels.get(channel)
+        if ch is None and channel is None and not self.multiplexed:
+            ch = self._open(None)  # legacy: __end__ with no audio still gets a reply
+        if ch is None:
+            await self.send({"type": "error", "channel": channel, "detail": "Unknown channel"})
+            return None
+        await ch.end()
+        return ch
+
+    async def drain(self) -> None:
+        tasks = [ch.task for ch in list(self.channels.values())]
+        if tasks:
+            await asyncio.gather(*tasks, return_exceptions=True)
+
+    def abort(self) -> None:
+        """Connection lost: park resumable channels, let in-progress finals complete."""
+        self.detached = True
+        for ch in list(self.channels.values()):
+            if not ch.ending:
+                ch.task.cancel()
 
 
 async def websocket_endpoint(ws: WebSocket, claims: dict):
     await ws.accept()
-    session = StreamSession(ws, claims)
+    mux = ChannelMux(ws, claims)
+    WS_CONNECTIONS.inc()
     try:
         while True:
             msg = await ws.receive()
+            if msg.get("type") == "websocket.disconnect":
+                return
             if "bytes" in msg and msg["bytes"]:
-                await session.add_chunk(msg["bytes"])
+                await mux.on_bytes(msg["bytes"])
             elif msg.get("text") == "__end__":
-                await session.finalize()
-                break
+                ch = await mux.on_end(None)
+                if ch is not None and not mux.multiplexed:
+                    await asyncio.gather(ch.task, return_exceptions=True)
+                    break
             else:
-                await ws.send_json({"type": "error", "detail": "Unsupported frame"})
+                control = _parse_control(msg.get("text") or "")
+                kind = control.get("type") if control is not None else None
+                try:
+                    if kind == "start":
+                        await mux.on_start(control)  # type: ignore[arg-type]
+                    elif kind == "resume":
+                        await mux.on_resume(control)  # type: ignore[arg-type]
+                    elif kind == "end":
+                        await mux.on_end(mux._channel_id(control["channel"]) if "channel" in control else None)  # type: ignore[index,operator]
+                    elif kind == "close":
+                        await mux.drain()
+                        break
+                    else:
+                        await mux.send({"type": "error", "detail": "Unsupported frame"})
+                except ValueError as e:
+                    await mux.send({"type": "error", "detail": str(e)})
     except WebSocketDisconnect:
         return
     finally:
-        await ws.close()
+        # Bookkeeping first: the awaits below may be cancelled if the server tears the task down
+        WS_CONNECTIONS.dec()
+        mux.abort()
+        if ws.client_state != WebSocketState.DISCONNECTED:
+            await ws.close()
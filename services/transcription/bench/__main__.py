@@ -0,0 +1,97 @@
+"""Benchmark entry point.
+
+    python -m bench                          # in-process server, fake backend, compare to baseline
+    python -m bench --backend tiny           # real faster-whisper tiny model when weights are present
+    python -m bench --target https://host --token $JWT
+    python -m bench --write-baseline         # refresh bench/baseline.json
+
+Exits non-zero when a regression against the baseline is detected.
+"""
+from __future__ import annotations
+import argparse
+import asyncio
+import json
+import logging
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+from .backends import install_backend, resolve_backend
+from .corpus import build_corpus
+from .load import InProcessServer, run_load
+from .report import compare, load_baseline, summarize, write_baseline
+
+DEFAULT_BASELINE = Path(__file__).with_name("baseline.json")
+
+
+def _parse_args(argv=None):
+    p = argparse.ArgumentParser(prog="python -m bench", description="Transcription load/latency benchmark")
+    p.add_argument("--corpus-dir", help="Directory for the synthetic corpus (default: temp dir)")
+    p.add_argument("--backend", choices=["fake", "tiny", "auto"], default="fake")
+    p.add_argument("--rtf", type=float, default=0.1, help="Real-time factor of the fake backend")
+    p.add_argument("--target", help="Base URL of a running service; default runs the app in-process")
+    p.add_argument("--token", help="Bearer token for --target")
+    p.add_argument("--http-clients", type=int, default=4)
+    p.add_argument("--ws-clients", type=int, default=2)
+    p.add_argument("--requests", type=int, default=4, help="Requests per client")
+    p.add_argument("--baseline", type=Path, default=DEFAULT_BASELINE)
+    p.add_argument("--write-baseline", action="store_true")
+    p.add_argument("--tolerance", type=float, default=0.5, help="Relative slack before flagging a regression")
+    p.add_argument("--min-delta-ms", type=float, default=25.0,
+                   help="Absolute latency slack so sub-millisecond stages do not flap")
+    p.add_argument("--output", type=Path, help="Write the JSON summary here as well")
+    return p.parse_args(argv)
+
+
+def main(argv=None) -> int:
+    args = _parse_args(argv)
+    logging.getLogger("httpx").setLevel(logging.WARNING)
+    with tempfile.TemporaryDirectory() as tmp:
+        corpus_dir = Path(args.corpus_dir or tmp)
+        index = build_corpus(corpus_dir)
+        clips = [Path(c["path"]) for c in index]
+
+        async def _drive(base_url: str):
+            return await run_load(base_url, clips, http_clients=args.http_clients, ws_clients=args.ws_clients,
+                                  requests_per_client=args.requests, token=args.token)
+
+        started = time.perf_counter()
+        if args.target:
+            samples = asyncio.run(_drive(args.target.rstrip("/")))
+        else:
+            install_backend(resolve_backend(args.backend, rtf=args.rtf))
+            with InProcessServer() as server:
+                samples = asyncio.run(_drive(server.base_url))
+        wall = time.perf_counter() - started
+
+    summary = summarize(samples, wall)
+    meta = {
+        "backend": args.backend if not args.target else "remote",
+        "rtf": args.rtf,
+        "http_clients": args.http_clients,
+        "ws_clients": args.ws_clients,
+        "requests_per_client": args.requests,
+        "clips": [c["name"] for c in index],
+    }
+    print(json.dumps({**summary, "meta": meta}, indent=2))
+    if args.output:
+        args.output.write_text(json.dumps({**summary, "meta": meta}, indent=2), encoding="utf-8")
+    if args.write_baseline:
+        write_baseline(args.baseline, summary, meta)
+        print(f"baseline written to {args.baseline}", file=sys.stderr)
+        return 0
+    baseline = load_baseline(args.baseline)
+    if baseline is None:
+        print("no baseline found; run with --write-baseline", file=sys.stderr)
+        return 0
+    if baseline.get("meta", {}).get("clips") != meta["clips"]:
+        print("warning: corpus differs from baseline (ffmpeg codecs unavailable?)", file=sys.stderr)
+    problems = compare(summary, baseline, tolerance=args.tolerance, min_delta_ms=args.min_delta_ms)
+    for line in problems:
+        print(f"REGRESSION {line}", file=sys.stderr)
+    return 1 if problems else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
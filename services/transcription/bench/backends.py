@@ -0,0 +1,99 @@
+"""Pluggable model backends for benchmarks.
+
+A backend is any callable with the ``run_transcription(wav_path)`` signature.
+``install_backend`` swaps it into the modules that call the model so the rest of
+the pipeline (upload, ffmpeg, rate limiting, redaction, serialization) runs
+unmodified.
+"""
+from __future__ import annotations
+import time
+from typing import Any, Callable, Dict
+
+import soundfile as sf
+
+Backend = Callable[[str], Dict[str, Any]]
+
+
+class FakeBackend:
+    """Calibrated stand-in that takes ``rtf`` seconds per second of audio.
+
+    Sleeping releases the GIL like the CTranslate2 runtime does; the last couple
+    of milliseconds are spun so the target latency is hit precisely even on hosts
+    with coarse timer resolution.
+    """
+
+    def __init__(self, rtf: float = 0.1, spin_ms: float = 2.0, model_size: str = "fake"):
+        self.rtf = rtf
+        self.spin_s = spin_ms / 1000.0
+        self.model_size = model_size
+
+    def __call__(self, audio: Any) -> Dict[str, Any]:
+        started = time.perf_counter()
+        duration = sf.info(audio).duration if isinstance(audio, str) else len(audio) / 16000.0
+        target = started + duration * self.rtf
+        remaining = target - time.perf_counter()
+        if remaining > self.spin_s:
+            time.sleep(remaining - self.spin_s)
+        while time.perf_counter() < target:
+            pass
+        segments = []
+        step = 5.0
+        t = 0.0
+        while t < duration:
+            end = min(duration, t + step)
+            segments.append({"id": len(segments), "start": t, "end": end, "text": f"segment {len(segments)}"})
+            t = end
+        return {
+            "language": "en",
+            "duration": duration,
+            "segments": segments,
+            "text": " ".join(s["text"] for s in segments),
+            "processing_ms": int((time.perf_counter() - started) * 1000),
+            "model_size": self.model_size,
+        }
+
+
+def tiny_model_available() -> bool:
+    try:
+        from faster_whisper.utils import download_model  # type: ignore
+    except Exception:
+        return False
+    try:
+        download_model("tiny", local_files_only=True)
+    except Exception:
+        return False
+    return True
+
+
+def whisper_backend(model_size: str = "tiny") -> Backend:
+    """Real faster-whisper backend via ``app.model.run_transcription``."""
+    from app.config import get_settings
+    from app import model as model_module
+
+    get_settings().model_size = model_size
+    model_module.get_model.cache_clear()
+    model_module.get_model()  # load weights before timing starts
+    return model_module.run_transcription
+
+
+def resolve_backend(name: str, rtf: float = 0.1) -> Backend:
+    if name == "fake":
+        return FakeBackend(rtf=rtf)
+    if name == "tiny":
+        if not tiny_model_available():
+            raise RuntimeError("faster-whisper 'tiny' weights not present locally")
+        return whisper_backend("tiny")
+    if name == "auto":
+        return whisper_backend("tiny") if tiny_model_available() else FakeBackend(rtf=rtf)
+    raise ValueError(f"Unknown backend {name}")
+
+
+def install_backend(backend: Backend) -> None:
+    from app import main as main_module
+    from app import websocket as ws_module
+
+    main_module.run_transcription = backend
+    ws_module.run_transcription = backend
+
+
+__all__ = ["FakeBackend", "tiny_model_available", "whisper_backend", "resolve_backend", "install_backend"]
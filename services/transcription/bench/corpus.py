@@ -0,0 +1,137 @@
+"""Deterministic synthetic audio corpus for transcription benchmarks.
+
+Clips are generated from a seeded RNG so the same spec always yields the same
+samples: speech-like voiced bursts (harmonic series with a drifting pitch,
+syllable-rate amplitude envelope and a little breath noise) separated by
+pauses, plus pure silence and tone clips. Each clip can be encoded in several
+containers/codecs so the transcode stage is exercised the way real uploads are.
+"""
+from __future__ import annotations
+import hashlib
+import json
+import os
+import shutil
+import subprocess
+from dataclasses import dataclass, asdict
+from pathlib import Path
+from typing import Iterable, List, Optional
+
+import numpy as np
+import soundfile as sf
+
+SAMPLE_RATE = 16000
+FFMPEG_BIN = os.getenv("FFMPEG_BIN", "ffmpeg")
+
+# Codecs soundfile can write natively; everything else goes through ffmpeg.
+_SF_FORMATS = {"wav": ("WAV", "PCM_16"), "flac": ("FLAC", "PCM_16"), "ogg": ("OGG", "VORBIS")}
+_FFMPEG_CODECS = {
+    "mp3": ["-c:a", "libmp3lame", "-b:a", "64k"],
+    "webm": ["-c:a", "libopus", "-b:a", "32k"],
+    "m4a": ["-c:a", "aac", "-b:a", "64k"],
+}
+
+
+@dataclass(frozen=True)
+class ClipSpec:
+    name: str
+    kind: str  # speech | silence | tone
+    seconds: float
+    codec: str = "wav"
+    seed: int = 0
+
+
+DEFAULT_CORPUS: List[ClipSpec] = [
+    ClipSpec("speech_5s", "speech", 5.0, "wav", 1),
+    ClipSpec("speech_15s", "speech", 15.0, "wav", 2),
+    ClipSpec("speech_30s_flac", "speech", 30.0, "flac", 3),
+    ClipSpec("speech_60s_ogg", "speech", 60.0, "ogg", 4),
+    ClipSpec("speech_20s_webm", "speech", 20.0, "webm", 5),
+    ClipSpec("speech_20s_mp3", "speech", 20.0, "mp3", 6),
+    ClipSpec("silence_10s", "silence", 10.0, "wav", 7),
+    ClipSpec("tone_3s", "tone", 3.0, "wav", 8),
+]
+
+
+def speech_like(seconds: float, seed: int, rate: int = SAMPLE_RATE) -> np.ndarray:
+    """Voiced bursts with pitch drift and syllable envelope, separated by pauses."""
+    rng = np.random.default_rng(seed)
+    total = int(seconds * rate)
+    out = np.zeros(total, dtype=np.float32)
+    pos = 0
+    while pos < total:
+        burst = int(rng.uniform(0.6, 2.5) * rate)
+        pause = int(rng.uniform(0.15, 0.8) * rate)
+        n = min(burst, total - pos)
+        t = np.arange(n) / rate
+        f0 = rng.uniform(95, 220) * (1 + 0.08 * np.sin(2 * np.pi * rng.uniform(0.3, 1.2) * t))
+        phase = 2 * np.pi * np.cumsum(f0) / rate
+        voiced = np.zeros(n)
+        for h in range(1, 12):
+            # crude formant weighting around ~500 Hz and ~1500 Hz
+            fh = h * f0.mean()
+            weight = np.exp(-((fh - 500) / 300) ** 2) + 0.6 * np.exp(-((fh - 1500) / 500) ** 2) + 0.05
+            voiced += weight * np.sin(h * phase) / h
+        syllables = 0.5 * (1 - np.cos(2 * np.pi * rng.uniform(3.0, 5.5) * t))
+        edge = np.minimum(1.0, np.minimum(t, t[::-1]) / 0.05)
+        noise = rng.normal(0, 0.02, n)
+        seg = (voiced * syllables * edge + noise) * rng.uniform(0.15, 0.35)
+        out[pos:pos + n] = seg.astype(np.float32)
+        pos += n + pause
+    return np.clip(out, -1.0, 1.0)
+
+
+def render(spec: ClipSpec, rate: int = SAMPLE_RATE) -> np.ndarray:
+    if spec.kind == "speech":
+        return speech_like(spec.seconds, spec.seed, rate)
+    n = int(spec.seconds * rate)
+    if spec.kind == "silence":
+        rng = np.random.default_rng(spec.seed)
+        return rng.normal(0, 1e-4, n).astype(np.float32)
+    if spec.kind == "tone":
+        t = np.arange(n) / rate
+        return (0.2 * np.sin(2 * np.pi * 440.0 * t)).astype(np.float32)
+    raise ValueError(f"Unknown clip kind {spec.kind}")
+
+
+def write_clip(spec: ClipSpec, out_dir: Path) -> Optional[Path]:
+    """Encode a clip; returns None when the codec needs ffmpeg and it is unavailable."""
+    samples = render(spec)
+    if spec.codec in _SF_FORMATS:
+        fmt, subtype = _SF_FORMATS[spec.codec]
+        path = out_dir / f"{spec.name}.{spec.codec}"
+        sf.write(str(path), samples, SAMPLE_RATE, format=fmt, subtype=subtype)
+        return path
+    if spec.codec not in _FFMPEG_CODECS:
+        raise ValueError(f"Unsupported codec {spec.codec}")
+    if shutil.which(FFMPEG_BIN) is None and not os.path.exists(FFMPEG_BIN):
+        return None
+    wav_path = out_dir / f"{spec.name}.src.wav"
+    sf.write(str(wav_path), samples, SAMPLE_RATE, subtype="PCM_16")
+    path = out_dir / f"{spec.name}.{spec.codec}"
+    cmd = [FFMPEG_BIN, "-y", "-loglevel", "error", "-i", str(wav_path), "-map_metadata", "-1",
+           "-bitexact", *_FFMPEG_CODECS[spec.codec], str(path)]
+    try:
+        subprocess.run(cmd, check=True, capture_output=True)
+    except subprocess.CalledProcessError:
+        return None  # encoder not compiled into this ffmpeg build
+    finally:
+        wav_path.unlink(missing_ok=True)
+    return path
+
+
+def build_corpus(out_dir: str | Path, specs: Iterable[ClipSpec] = DEFAULT_CORPUS) -> List[dict]:
+    """Materialize the corpus under ``out_dir`` and write a ``corpus.json`` index."""
+    out = Path(out_dir)
+    out.mkdir(parents=True, exist_ok=True)
+    index: List[dict] = []
+    for spec in specs:
+        path = write_clip(spec, out)
+        if path is None:
+            continue
+        digest = hashlib.sha256(render(spec).tobytes()).hexdigest()[:16]
+        index.append({**asdict(spec), "path": str(path), "pcm_sha256": digest})
+    (out / "corpus.json").write_text(json.dumps(index, indent=2), encoding="utf-8")
+    return index
+
+
+__all__ = ["ClipSpec", "DEFAULT_CORPUS", "speech_like", "render", "write_clip", "build_corpus"]
@@ -0,0 +1,148 @@
+"""Concurrent HTTP + WebSocket load driver.
+
+Drives either a remote deployment (``--target https://...`` with a bearer token)
+or an in-process uvicorn server with auth overridden and the selected backend
+installed. Per-stage timings come from the ``Server-Timing`` header for HTTP and
+from the ``timings`` object of the WebSocket ``final`` message.
+"""
+from __future__ import annotations
+import asyncio
+import json
+import socket
+import threading
+import time
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Dict, List, Optional
+
+import httpx
+
+
+@dataclass
+class Sample:
+    kind: str
+    clip: str
+    status: int
+    latency_ms: float
+    stages_ms: Dict[str, float] = field(default_factory=dict)
+    audio_seconds: Optional[float] = None
+    error: Optional[str] = None
+
+
+def parse_server_timing(header: str) -> Dict[str, float]:
+    out: Dict[str, float] = {}
+    for entry in header.split(","):
+        parts = [p.strip() for p in entry.split(";")]
+        if not parts or not parts[0]:
+            continue
+        for p in parts[1:]:
+            if p.startswith("dur="):
+                try:
+                    out[parts[0]] = float(p[4:])
+                except ValueError:
+                    pass
+            elif p.startswith("desc=") and parts[0] == "audio":
+                out["audio_seconds"] = float(p[5:].strip('"').rstrip("s"))
+    return out
+
+
+async def _http_client(client: httpx.AsyncClient, base_url: str, clips: List[Path], n: int,
+                       headers: Dict[str, str], samples: List[Sample]):
+    for i in range(n):
+        clip = clips[i % len(clips)]
+        t0 = time.perf_counter()
+        try:
+            with clip.open("rb") as fh:
+                r = await client.post(f"{base_url}/v1/transcribe", files={"file": (clip.name, fh)}, headers=headers)
+            latency = (time.perf_counter() - t0) * 1000
+            stages = parse_server_timing(r.headers.get("server-timing", ""))
+            audio = stages.pop("audio_seconds", None)
+            samples.append(Sample("http", clip.name, r.status_code, latency, stages, audio,
+                                  None if r.status_code == 200 else r.text[:200]))
+        except Exception as e:  # network failures count as errors, not crashes
+            samples.append(Sample("http", clip.name, 0, (time.perf_counter() - t0) * 1000, error=str(e)))
+
+
+async def _ws_client(ws_url: str, clips: List[Path], n: int, headers: Dict[str, str],
+                     samples: List[Sample], chunk_bytes: int):
+    try:  # websockets >= 13 ships the new asyncio client
+        from websockets.asyncio.client import connect
+        header_kw = "additional_headers"
+    except ImportError:  # pragma: no cover - older websockets (uvicorn[standard] pin)
+        from websockets import connect  # type: ignore
+        header_kw = "extra_headers"
+
+    for i in range(n):
+        clip = clips[i % len(clips)]
+        data = clip.read_bytes()
+        t0 = time.perf_counter()
+        try:
+            async with connect(ws_url, max_size=None, **{header_kw: headers}) as ws:
+                for off in range(0, len(data), chunk_bytes):
+                    await ws.send(data[off:off + chunk_bytes])
+                await ws.send("__end__")
+                msg = json.loads(await ws.recv())
+            latency = (time.perf_counter() - t0) * 1000
+            timings = msg.get("timings") or {}
+            stages = {k[:-3]: v for k, v in timings.items() if k.endswith("_ms") and k != "total_ms"}
+            ok = msg.get("type") == "final"
+            samples.append(Sample("ws", clip.name, 200 if ok else 500, latency, stages,
+                                  timings.get("audio_seconds"), None if ok else str(msg)[:200]))
+        except Exception as e:
+            samples.append(Sample("ws", clip.name, 0, (time.perf_counter() - t0) * 1000, error=str(e)))
+
+
+async def run_load(base_url: str, clips: List[Path], *, http_clients: int = 4, ws_clients: int = 2,
+                   requests_per_client: int = 5, token: Optional[str] = None,
+                   ws_chunk_bytes: int = 32 * 1024) -> List[Sample]:
+    headers = {"Authorization": f"Bearer {token}"} if token else {}
+    samples: List[Sample] = []
+    ws_url = base_url.replace("http://", "ws://").replace("https://", "wss://") + "/v1/ws"
+    limits = httpx.Limits(max_connections=max(http_clients, 1))
+    async with httpx.AsyncClient(timeout=600.0, limits=limits) as client:
+        tasks = [_http_client(client, base_url, clips[i:] + clips[:i], requests_per_client, headers, samples)
+                 for i in range(http_clients)]
+        tasks += [_ws_client(ws_url, clips[i:] + clips[:i], requests_per_client, headers, samples, ws_chunk_bytes)
+                  for i in range(ws_clients)]
+        await asyncio.gather(*tasks)
+    return samples
+
+
+class InProcessServer:
+    """Run the transcription app under uvicorn on an ephemeral port in a thread."""
+
+    def __init__(self):
+        import uvicorn
+        from app.main import app
+        from app.auth import verify_jwt
+        from app import main as main_module
+
+        app.dependency_overrides[verify_jwt] = lambda: {"sub": "bench", "scope": "transcribe"}
+        # The per-user limit would throttle a single synthetic user; measure the pipeline instead.
+        main_module.rate_limit = lambda key, limit, window_sec: None
+        self._sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        self._sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+        self._sock.bind(("127.0.0.1", 0))
+        self.port = self._sock.getsockname()[1]
+        config = uvicorn.Config(app, log_level="warning", lifespan="off", ws_max_size=64 * 1024 * 1024)
+        self._server = uvicorn.Server(config)
+        self._thread = threading.Thread(target=self._server.run, kwargs={"sockets": [self._sock]}, daemon=True)
+
+    @property
+    def base_url(self) -> str:
+        return f"http://127.0.0.1:{self.port}"
+
+    def __enter__(self) -> "InProcessServer":
+        self._thread.start()
+        deadline = time.time() + 10
+        while not self._server.started and time.time() < deadline:
+            time.sleep(0.02)
+        return self
+
+    def __exit__(self, *exc):
+        self._server.should_exit = True
+        self._thread.join(timeout=10)
+        self._sock.close()
+
+
+__all__ = ["Sample", "parse_server_timing", "run_load", "InProcessServer"]
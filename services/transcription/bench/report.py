@@ -0,0 +1,107 @@
+"""Summaries and baseline comparison for benchmark runs."""
+from __future__ import annotations
+import json
+import math
+import resource
+import sys
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Optional
+
+from .load import Sample
+
+PERCENTILES = (50, 95, 99)
+
+
+def percentile(values: List[float], p: float) -> float:
+    """Nearest-rank percentile (stable for small sample counts)."""
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    rank = max(1, math.ceil(p / 100.0 * len(ordered)))
+    return ordered[rank - 1]
+
+
+def _dist(values: List[float]) -> Dict[str, float]:
+    return {f"p{p}": round(percentile(values, p), 3) for p in PERCENTILES}
+
+
+def max_rss_mb() -> float:
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux reports KiB, macOS reports bytes
+    return round(rss / (1024 * 1024) if sys.platform == "darwin" else rss / 1024, 1)
+
+
+def summarize(samples: Iterable[Sample], wall_seconds: float) -> Dict[str, Any]:
+    samples = list(samples)
+    ok = [s for s in samples if s.status == 200]
+    stages: Dict[str, List[float]] = {}
+    for s in ok:
+        for name, ms in s.stages_ms.items():
+            stages.setdefault(name, []).append(ms)
+    audio = sum(s.audio_seconds or 0.0 for s in ok)
+    summary: Dict[str, Any] = {
+        "requests": len(samples),
+        "errors": len(samples) - len(ok),
+        "wall_seconds": round(wall_seconds, 3),
+        "throughput_rps": round(len(ok) / wall_seconds, 3) if wall_seconds else 0.0,
+        "audio_seconds_per_second": round(audio / wall_seconds, 3) if wall_seconds else 0.0,
+        "latency_ms": _dist([s.latency_ms for s in ok]),
+        "stages_ms": {name: _dist(v) for name, v in sorted(stages.items())},
+        "max_rss_mb": max_rss_mb(),
+    }
+    for kind in ("http", "ws"):
+        subset = [s.latency_ms for s in ok if s.kind == kind]
+        if subset:
+            summary[f"{kind}_latency_ms"] = _dist(subset)
+    return summary
+
+
+def compare(current: Dict[str, Any], baseline: Dict[str, Any], tolerance: float = 0.2,
+            min_delta_ms: float = 5.0) -> List[str]:
+    """Return human-readable regressions of ``current`` against ``baseline``.
+
+    Latencies regress when they exceed baseline by more than ``tolerance`` (relative)
+    *and* ``min_delta_ms`` (absolute, so sub-millisecond stages don't flap); throughput
+    regresses when it drops by more than ``tolerance``; memory when the high-water mark
+    grows by more than ``tolerance``.
+    """
+    problems: List[str] = []
+
+    def _lat(label: str, cur: Optional[Dict[str, float]], base: Optional[Dict[str, float]]):
+        if not cur or not base:
+            return
+        for key, b in base.items():
+            c = cur.get(key)
+            if c is None:
+                continue
+            if c > b * (1 + tolerance) and c - b > min_delta_ms:
+                problems.append(f"{label} {key}: {c:.1f}ms > baseline {b:.1f}ms")
+
+    _lat("latency", current.get("latency_ms"), baseline.get("latency_ms"))
+    for kind in ("http", "ws"):
+        _lat(f"{kind} latency", current.get(f"{kind}_latency_ms"), baseline.get(f"{kind}_latency_ms"))
+    for stage, base in (baseline.get("stages_ms") or {}).items():
+        _lat(f"stage {stage}", (current.get("stages_ms") or {}).get(stage), base)
+    for key in ("throughput_rps", "audio_seconds_per_second"):
+        b, c = baseline.get(key), current.get(key)
+        if b and c is not None and c < b * (1 - tolerance):
+            problems.append(f"{key}: {c:.3f} < baseline {b:.3f}")
+    b, c = baseline.get("max_rss_mb"), current.get("max_rss_mb")
+    if b and c is not None and c > b * (1 + tolerance):
+        problems.append(f"max_rss_mb: {c:.1f} > baseline {b:.1f}")
+    if current.get("errors", 0) > baseline.get("errors", 0):
+        problems.append(f"errors: {current['errors']} > baseline {baseline.get('errors', 0)}")
+    return problems
+
+
+def load_baseline(path: Path) -> Optional[Dict[str, Any]]:
+    if not path.exists():
+        return None
+    return json.loads(path.read_text(encoding="utf-8"))
+
+
+def write_baseline(path: Path, summary: Dict[str, Any], meta: Dict[str, Any]) -> None:
+    path.write_text(json.dumps({**summary, "meta": meta}, indent=2, sort_keys=True) + "\n", encoding="utf-8")
+
+
+__all__ = ["percentile", "summarize", "compare", "load_baseline", "write_baseline", "max_rss_mb"]
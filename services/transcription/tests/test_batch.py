@@ -0,0 +1,133 @@
+import io
+import json
+import os
+import tarfile
+import tempfile
+import zipfile
+
+import pytest
+
+from app import main as main_module
+
+
+def _fake_run(path):
+    return {"language": "en", "duration": 0.2, "segments": [{"id": 0, "start": 0.0, "end": 0.2, "text": "ok"}],
+            "text": "ok", "processing_ms": 1, "model_size": "base"}
+
+
+@pytest.fixture
+def charges(monkeypatch):
+    calls = []
+    monkeypatch.setattr(main_module, "rate_limit", lambda key, limit, window_sec, cost=1: calls.append((key, cost)))
+    monkeypatch.setattr(main_module, "run_transcription", _fake_run)
+    return calls
+
+
+def _lines(r):
+    return [json.loads(line) for line in r.text.splitlines() if line]
+
+
+def test_multipart_batch_streams_one_line_per_file(client, charges):
+    from test_transcribe import _sine_wav
+
+    files = [("files", (f"clip{i}.wav", _sine_wav().read(), "audio/wav")) for i in range(3)]
+    files.append(("files", ("broken.wav", b"not audio", "audio/wav")))
+    r = client.post('/v1/transcribe/batch', files=files)
+    assert r.status_code == 200
+    assert r.headers["content-type"].startswith("application/x-ndjson")
+    lines = sorted(_lines(r), key=lambda line: line["index"])
+    assert [line["filename"] for line in lines] == ["clip0.wav", "clip1.wav", "clip2.wav", "broken.wav"]
+    assert [line["status"] for line in lines] == ["ok", "ok", "ok", "error"]
+    assert lines[0]["result"]["text"] == "ok"
+    assert lines[3]["status_code"] == 400
+    # One rate-limit round trip per key for the whole batch, charged per file
+    assert charges == [("user:test-user", 4), ("global:transcribe", 4)]
+
+
+@pytest.mark.parametrize("kind", ["tar", "zip"])
+def test_archive_batch(client, charges, kind):
+    from test_transcribe import _sine_wav
+
+    data = _sine_wav().read()
+    buf = io.BytesIO()
+    if kind == "tar":
+        with tarfile.open(fileobj=buf, mode="w:gz") as tf:
+            for name in ("a.wav", "b.wav"):
+                info = tarfile.TarInfo(name)
+                info.size = len(data)
+                tf.addfile(info, io.BytesIO(data))
+        content_type = "application/gzip"
+    else:
+        with zipfile.ZipFile(buf, "w") as zf:
+            zf.writestr("a.wav", data)
+            zf.writestr("b.wav", data)
+        content_type = "application/zip"
+    r = client.post('/v1/transcribe/batch', content=buf.getvalue(), headers={"content-type": content_type})
+    assert r.status_code == 200
+    assert sorted(line["filename"] for line in _lines(r)) == ["a.wav", "b.wav"]
+    assert all(line["status"] == "ok" for line in _lines(r))
+
+
+def test_batch_limits(client, charges, monkeypatch):
+    from app.config import get_settings
+
+    monkeypatch.setattr(get_settings(), "batch_max_files", 2)
+    files = [("files", (f"c{i}.wav", b"x", "audio/wav")) for i in range(3)]
+    assert client.post('/v1/transcribe/batch', files=files).status_code == 413
+    assert client.post('/v1/transcribe/batch', content=b"{}", headers={"content-type": "application/json"}).status_code == 415
+    assert charges == []
+
+
+def test_multipart_byte_budget_is_enforced_while_streaming(client, charges, monkeypatch):
+    from app.config import get_settings
+
+    monkeypatch.setattr(get_settings(), "batch_max_bytes", 1000)
+    spooled = []
+    real_mkstemp = tempfile.mkstemp
+
+    def mkstemp(*args, **kwargs):
+        spooled.append(real_mkstemp(*args, **kwargs))
+        return spooled[-1]
+
+    monkeypatch.setattr(tempfile, "mkstemp", mkstemp)
+    files = [("files", ("a.wav", b"x" * 600, "audio/wav")), ("files", ("b.wav", b"x" * 600, "audio/wav"))]
+    assert client.post('/v1/transcribe/batch', files=files).status_code == 413
+    assert charges == []
+    assert len(spooled) == 2 and not any(os.path.exists(path) for _fd, path in spooled)
+
+
+def test_batch_is_capped_at_the_per_user_rate_limit(client, monkeypatch):
+    from app.config import get_settings
+
+    limits = []
+    monkeypatch.setattr(main_module, "rate_limit", lambda key, limit, window_sec, cost=1: limits.append((key, limit)))
+    monkeypatch.setattr(main_module, "run_transcription", _fake_run)
+    monkeypatch.setattr(get_settings(), "batch_max_files", 50)
+    monkeypatch.setattr(get_settings(), "rate_limit_per_minute", 3)
+    files = [("files", (f"c{i}.wav", b"x", "audio/wav")) for i in range(4)]
+    r = client.post('/v1/transcribe/batch', files=files)
+    assert r.status_code == 413 and "max 3" in r.json()["detail"]
+    assert limits == []
+    assert client.post('/v1/transcribe/batch', files=files[:3]).status_code == 200
+    assert limits[0] == ("user:test-user", 3)
+
+
+def test_spooled_files_removed_when_body_never_streams(client, charges, monkeypatch):
+    from starlette.responses import StreamingResponse
+
+    spooled = []
+    real_mkstemp = tempfile.mkstemp
+
+    def mkstemp(*args, **kwargs):
+        spooled.append(real_mkstemp(*args, **kwargs))
+        return spooled[-1]
+
+    async def start_only(self, send):  # the client disconnects before the first body chunk
+        await send({"type": "http.response.start", "status": self.status_code, "headers": self.raw_headers})
+        await send({"type": "http.response.body", "body": b""})
+
+    monkeypatch.setattr(tempfile, "mkstemp", mkstemp)
+    monkeypatch.setattr(StreamingResponse, "stream_response", start_only)
+    files = [("files", (f"c{i}.wav", b"x", "audio/wav")) for i in range(2)]
+    assert client.post('/v1/transcribe/batch', files=files).status_code == 200
+    assert len(spooled) == 2 and not any(os.path.exists(path) for _fd, path in spooled)
@@ -0,0 +1,43 @@
+import time
+
+import numpy as np
+import soundfile as sf
+
+from bench.backends import FakeBackend
+from bench.corpus import ClipSpec, render, write_clip
+from bench.load import parse_server_timing
+from bench.report import compare, percentile
+
+
+def test_corpus_is_deterministic(tmp_path):
+    spec = ClipSpec("s", "speech", 2.0, "wav", 42)
+    a, b = render(spec), render(spec)
+    assert np.array_equal(a, b)
+    assert not np.array_equal(a, render(ClipSpec("s", "speech", 2.0, "wav", 43)))
+    path = write_clip(spec, tmp_path)
+    assert abs(sf.info(str(path)).duration - 2.0) < 1e-3
+
+
+def test_fake_backend_honours_rtf(tmp_path):
+    path = write_clip(ClipSpec("t", "tone", 1.0, "wav"), tmp_path)
+    backend = FakeBackend(rtf=0.05)
+    t0 = time.perf_counter()
+    result = backend(str(path))
+    elapsed = time.perf_counter() - t0
+    assert 0.05 <= elapsed < 0.5
+    assert result["segments"] and result["model_size"] == "fake"
+
+
+def test_parse_server_timing():
+    parsed = parse_server_timing('receive;dur=1.5, inference;dur=20.000, audio;desc="3.000s", rtf;desc="0.1"')
+    assert parsed == {"receive": 1.5, "inference": 20.0, "audio_seconds": 3.0}
+
+
+def test_compare_flags_regressions():
+    assert percentile([1, 2, 3, 4], 50) == 2
+    base = {"latency_ms": {"p95": 100.0}, "throughput_rps": 10.0, "stages_ms": {"inference": {"p99": 50.0}}}
+    same = {"latency_ms": {"p95": 110.0}, "throughput_rps": 9.5, "stages_ms": {"inference": {"p99": 51.0}}}
+    assert compare(same, base, tolerance=0.2) == []
+    worse = {"latency_ms": {"p95": 200.0}, "throughput_rps": 5.0, "stages_ms": {"inference": {"p99": 90.0}}}
+    problems = compare(worse, base, tolerance=0.2)
+    assert len(problems) == 3
@@ -0,0 +1,133 @@
+import gzip
+import json
+from concurrent.futures import Future
+from concurrent.futures.process import BrokenProcessPool
+
+from app import bulk
+
+from test_transcribe import _sine_wav
+
+
+def _fake_run(path):
+    return {
+        "language": "en",
+        "duration": 0.2,
+        "segments": [{"id": 0, "start": 0.0, "end": 0.2, "text": "Call John Smith"}],
+        "text": "Call John Smith",
+        "processing_ms": 1,
+        "model_size": "base",
+    }
+
+
+def _write(path):
+    path.write_bytes(_sine_wav().read())
+
+
+def _records(out_dir):
+    recs = []
+    for part in sorted(out_dir.glob("part-*.jsonl.gz")):
+        with gzip.open(part, "rt", encoding="utf-8") as fh:
+            recs.extend(json.loads(line) for line in fh)
+    return recs
+
+
+def test_bulk_resumes_from_checkpoint(tmp_path, monkeypatch):
+    calls = []
+
+    def run(path):
+        calls.append(path)
+        return _fake_run(path)
+
+    monkeypatch.setattr(bulk, "get_model", lambda: None)
+    monkeypatch.setattr(bulk, "run_transcription", run)
+    src = tmp_path / "in"
+    (src / "2023").mkdir(parents=True)
+    _write(src / "a.wav")
+    _write(src / "2023" / "b.wav")
+    (src / "notes.txt").write_text("ignored")
+    out = tmp_path / "out"
+
+    assert bulk.main([str(src), "-o", str(out), "--workers", "0"]) == 0
+    recs = _records(out)
+    assert sorted(r["key"] for r in recs) == ["2023/b.wav", "a.wav"]
+    assert recs[0]["text"] == "Call John Smith" and recs[0]["filename"].endswith(".wav")
+    assert len(calls) == 2
+
+    # Second run is a no-op; a new file is the only work done.
+    _write(src / "c.wav")
+    assert bulk.main([str(src), "-o", str(out), "--workers", "0"]) == 0
+    assert len(calls) == 3
+    assert [r["key"] for r in _records(out)][-1] == "c.wav"
+
+
+def test_bulk_manifest_and_errors(tmp_path, monkeypatch):
+    monkeypatch.setattr(bulk, "get_model", lambda: None)
+    monkeypatch.setattr(bulk, "run_transcription", _fake_run)
+    _write(tmp_path / "ok.wav")
+    (tmp_path / "bad.wav").write_bytes(b"not audio")
+    manifest = tmp_path / "m.jsonl"
+    manifest.write_text('{"path": "ok.wav", "id": "visit-1"}\n{"path": "bad.wav", "id": "visit-2"}\n')
+    out = tmp_path / "out"
+    assert bulk.main([str(manifest), "-o", str(out), "--workers", "0"]) == 2
+    by_key = {r["key"]: r for r in _records(out)}
+    assert by_key["visit-1"]["status"] == "ok"
+    assert by_key["visit-2"]["status"] == "error"
+
+
+def test_bulk_inline_model_failure_is_recorded(tmp_path, monkeypatch):
+    def run(path):
+        calls.append(path)
+        if len(calls) == 1:
+            raise RuntimeError("model exploded")
+        return _fake_run(path)
+
+    calls = []
+    monkeypatch.setattr(bulk, "get_model", lambda: None)
+    monkeypatch.setattr(bulk, "run_transcription", run)
+    src = tmp_path / "in"
+    src.mkdir()
+    _write(src / "a.wav")
+    _write(src / "b.wav")
+    out = tmp_path / "out"
+    assert bulk.main([str(src), "-o", str(out), "--workers", "0"]) == 2
+    statuses = sorted((r["status"], r.get("error")) for r in _records(out))
+    assert statuses == [("error", "RuntimeError: model exploded"), ("ok", None)]
+
+
+class _DyingPool:
+    """In-process stand-in for ProcessPoolExecutor whose first pool loses a worker after one task."""
+
+    pools = []
+
+    def __init__(self, **kwargs):
+        self.broken = False
+        self.submitted = 0
+        self.pools.append(self)
+
+    def submit(self, fn, *args):
+        if self.broken:
+            raise BrokenProcessPool("A child process terminated abruptly")
+        fut = Future()
+        fut.set_result(fn(*args))
+        self.submitted += 1
+        if len(self.pools) == 1:
+            self.broken = True
+        return fut
+
+    def shutdown(self, wait=True, cancel_futures=False):
+        pass
+
+
+def test_bulk_recovers_from_a_broken_worker_pool(tmp_path, monkeypatch):
+    monkeypatch.setattr(bulk, "get_model", lambda: None)
+    monkeypatch.setattr(bulk, "run_transcription", _fake_run)
+    monkeypatch.setattr(bulk, "ProcessPoolExecutor", _DyingPool)
+    monkeypatch.setattr(_DyingPool, "pools", [])
+    src = tmp_path / "in"
+    src.mkdir()
+    for name in ("a.wav", "b.wav", "c.wav"):
+        _write(src / name)
+    out = tmp_path / "out"
+    assert bulk.main([str(src), "-o", str(out), "--workers", "1"]) == 0
+    assert sorted(r["key"] for r in _records(out)) == ["a.wav", "b.wav", "c.wav"]
+    assert [p.submitted for p in _DyingPool.pools] == [1, 2]
@@ -0,0 +1,103 @@
+import numpy as np
+import pytest
+
+from app import cascade as cascade_module
+from app.config import get_settings
+
+
+def _fake(label, calls):
+    def run(audio):
+        calls.append(len(audio))
+        duration = len(audio) / 16000.0
+        segments, t = [], 0.0
+        while t < duration:
+            end = min(duration, t + 1.0)
+            segments.append({"id": len(segments), "start": t, "end": end, "text": label})
+            t = end
+        return {"language": "en", "duration": duration, "segments": segments,
+                "text": " ".join(s["text"] for s in segments), "processing_ms": 1, "model_size": label}
+    return run
+
+
+@pytest.fixture
+def cascade_models(monkeypatch):
+    settings = get_settings()
+    monkeypatch.setattr(settings, "cascade_partial_interval_seconds", 1.0)
+    monkeypatch.setattr(settings, "cascade_commit_seconds", 3.0)
+    small, large = [], []
+    monkeypatch.setattr(cascade_module, "run_partial_transcription", _fake("small", small))
+    monkeypatch.setattr(cascade_module, "run_transcription", _fake("large", large))
+    return small, large
+
+
+def _stream(client, seconds=8):
+    second = (np.sin(np.arange(16000) / 5.0) * 8000).astype("<i2").tobytes()
+    messages = []
+    with client.websocket_connect('/v1/ws') as ws:
+        ws.send_text('{"type": "start", "codec": "pcm16", "partials": true}')
+        ready = ws.receive_json()
+        assert ready["partials"] is True
+        for _ in range(seconds):
+            ws.send_bytes(second)
+            while True:  # each second of audio yields one partial caption
+                msg = ws.receive_json()
+                messages.append(msg)
+                if msg["type"] == "partial":
+                    break
+        ws.send_text('__end__')
+        while messages[-1]["type"] != "final":
+            messages.append(ws.receive_json())
+    return messages
+
+
+def test_partials_then_large_model_final(client, cascade_models):
+    small, large = cascade_models
+    messages = _stream(client)
+    partials = [m for m in messages if m["type"] == "partial"]
+    committed = [m for m in messages if m["type"] == "committed"]
+    final = messages[-1]
+    assert len(partials) == 8 and all("small" in p["text"] for p in partials)
+    # Partial windows stay bounded: committed audio is not re-decoded by the small model
+    assert max(small) <= 4 * 16000
+    assert committed and all(c["second_pass"] and c["model_size"] == "large" for c in committed)
+    assert set(final["text"].split()) == {"large"}
+    ends = [s["end"] for s in final["segments"]]
+    assert ends == sorted(ends) and ends[-1] == pytest.approx(8.0)
+    assert [s["id"] for s in final["segments"]] == list(range(len(final["segments"])))
+    assert sum(large) == 8 * 16000  # every sample decoded exactly once by the large model
+
+
+def test_second_pass_skipped_under_load(client, cascade_models, monkeypatch):
+    small, large = cascade_models
+    monkeypatch.setattr(get_settings(), "cascade_max_queue_depth", -1)
+    messages = _stream(client)
+    committed = [m for m in messages if m["type"] == "committed"]
+    assert committed and not any(c["second_pass"] for c in committed)
+    final = messages[-1]
+    assert "small" in final["text"] and "large" in final["text"]  # only the live tail gets the large model
+    assert sum(large) < 8 * 16000
+
+
+def test_partials_require_sample_buffer(client):
+    with client.websocket_connect('/v1/ws') as ws:
+        ws.send_text('{"type": "start", "codec": "m4a", "partials": true}')
+        ready = ws.receive_json()
+        assert ready["mode"] == "container" and ready["partials"] is False
+
+
+def test_cascade_decodes_count_towards_queue_depth(client, cascade_models, monkeypatch):
+    from app.metrics import QUEUE_DEPTH
+
+    small, large = cascade_models
+    queued = []
+    inc = QUEUE_DEPTH.inc
+
+    def counting_inc(amount=1.0, **labels):
+        if amount > 0:
+            queued.append(amount)
+        inc(amount, **labels)
+
+    monkeypatch.setattr(QUEUE_DEPTH, "inc", counting_inc)
+    _stream(client)
+    assert small and large
+    assert len(queued) == len(small) + len(large)  # partials and second passes as well as the final tail
@@ -0,0 +1,56 @@
+import numpy as np
+import soundfile as sf
+
+from app.incremental import FingerprintCache, transcribe_incremental
+
+RATE = 16000
+
+
+def _session_audio(blocks, seed=0):
+    """5 s tone 'utterances' separated by 0.5 s of silence."""
+    rng = np.random.default_rng(seed)
+    parts = []
+    for i in range(blocks):
+        t = np.arange(5 * RATE) / RATE
+        parts.append(0.3 * np.sin(2 * np.pi * rng.uniform(150, 300) * t))
+        parts.append(np.zeros(RATE // 2))
+    return (np.concatenate(parts) * 32767).astype(np.int16)
+
+
+def _fake_model(calls):
+    def run(path):
+        info = sf.info(path)
+        calls.append(info.duration)
+        segs, t, i = [], 0.0, 0
+        while t + 5.0 <= info.duration + 1e-6:
+            segs.append({"id": i, "start": t, "end": t + 5.0, "text": f"utt{i}"})
+            t += 5.5
+            i += 1
+        return {"language": "en", "duration": info.duration, "segments": segs,
+                "text": " ".join(s["text"] for s in segs), "processing_ms": 1, "model_size": "base"}
+    return run
+
+
+def test_growing_upload_only_transcribes_tail(tmp_path):
+    audio = _session_audio(12)  # 66 s
+    first = tmp_path / "first.wav"
+    sf.write(first, audio[: 44 * RATE], RATE, subtype="PCM_16")  # 8 utterances
+    grown = tmp_path / "grown.wav"
+    sf.write(grown, audio, RATE, subtype="PCM_16")
+    cache, calls = FingerprintCache(), []
+    run = _fake_model(calls)
+
+    r1 = transcribe_incremental(str(first), "u1", run, cache)
+    assert r1["reused_seconds"] == 0.0 and len(r1["segments"]) == 8
+
+    r2 = transcribe_incremental(str(grown), "u1", run, cache)
+    assert r2["reused_seconds"] > 30
+    assert calls[-1] < 66 - 30  # only the tail hit the model
+    starts = [s["start"] for s in r2["segments"]]
+    assert starts == sorted(starts)
+    assert [s["id"] for s in r2["segments"]] == list(range(len(starts)))
+    assert 60 < r2["segments"][-1]["end"] <= 66.0
+
+    # Another user never sees u1's cache
+    transcribe_incremental(str(grown), "u2", run, cache)
+    assert abs(calls[-1] - 66.0) < 0.01
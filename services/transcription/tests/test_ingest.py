@@ -0,0 +1,74 @@
+import os
+
+import numpy as np
+import pytest
+
+from app import main as main_module
+from app.audio import read_pcm16
+from app.config import get_settings
+from app.main import app
+from app.auth import verify_jwt
+
+
+def _capture(calls):
+    def run(audio):
+        calls.append(audio)
+        return {"language": "en", "duration": 1.0, "segments": [], "text": "ingested",
+                "processing_ms": 1, "model_size": "base"}
+    return run
+
+
+@pytest.fixture
+def ingest(client, monkeypatch, tmp_path):
+    from test_transcribe import _sine_wav
+
+    root = tmp_path / "volume"
+    (root / "visits").mkdir(parents=True)
+    (root / "visits" / "a.wav").write_bytes(_sine_wav(duration_sec=1.0).read())
+    (tmp_path / "secret.wav").write_bytes(_sine_wav().read())
+    settings = get_settings()
+    monkeypatch.setattr(settings, "ingest_root", str(root))
+    monkeypatch.setattr(settings, "enable_incremental", False)
+    monkeypatch.setattr(main_module, "rate_limit", lambda *a, **kw: None)
+    app.dependency_overrides[verify_jwt] = lambda: {"sub": "gateway", "scope": "transcribe transcribe:ingest"}
+    calls = []
+    monkeypatch.setattr(main_module, "run_transcription", _capture(calls))
+    return client, root, calls
+
+
+def test_wav_is_memory_mapped_without_ffmpeg(ingest, monkeypatch):
+    client, root, calls = ingest
+
+    async def no_ffmpeg(*a, **kw):
+        raise AssertionError("16 kHz PCM16 wav must not be transcoded")
+    monkeypatch.setattr(main_module, "transcode_to_wav_16k", no_ffmpeg)
+    before = os.stat(root / "visits" / "a.wav")
+    r = client.post('/v1/transcribe/file', json={"path": "visits/a.wav"})
+    assert r.status_code == 200, r.text
+    assert r.json()["filename"] == "visits/a.wav" and r.json()["text"] == "ingested"
+    assert calls[0].dtype == np.float32 and len(calls[0]) == 16000
+    assert os.stat(root / "visits" / "a.wav").st_mtime == before.st_mtime  # source left in place
+
+    samples, rate = read_pcm16(str(root / "visits" / "a.wav"))
+    assert isinstance(samples, np.memmap) and rate == 16000
+
+
+@pytest.mark.parametrize("ref", ["../secret.wav", "/etc/passwd", "visits/../../secret.wav", "visits", ""])
+def test_paths_outside_root_are_rejected(ingest, ref):
+    client, root, calls = ingest
+    r = client.post('/v1/transcribe/file', json={"path": ref})
+    assert r.status_code == 403
+    assert calls == []
+
+
+def test_symlink_escape_is_rejected(ingest, tmp_path):
+    client, root, calls = ingest
+    os.symlink(tmp_path / "secret.wav", root / "visits" / "link.wav")
+    assert client.post('/v1/transcribe/file', json={"path": "visits/link.wav"}).status_code == 403
+    assert client.post('/v1/transcribe/file', json={"path": "visits/missing.wav"}).status_code == 404
+
+
+def test_ingest_requires_scope(ingest):
+    client, root, calls = ingest
+    app.dependency_overrides[verify_jwt] = lambda: {"sub": "clinician", "scope": "transcribe"}
+    assert client.post('/v1/transcribe/file', json={"path": "visits/a.wav"}).status_code == 403
@@ -0,0 +1,99 @@
+import asyncio
+from types import SimpleNamespace
+
+import httpx
+import pytest
+
+from app import jwks as jwks_module
+from app.jwks import JWKSClient, JWKSUnavailable, cache_lifetime
+
+KEYS = {"keys": [{"kid": "k1", "kty": "RSA"}]}
+
+
+class Issuer:
+    def __init__(self):
+        self.requests = []
+        self.fail = False
+        self.headers = {"cache-control": "max-age=60", "etag": '"v1"'}
+
+    async def __call__(self, request):
+        self.requests.append(request)
+        await asyncio.sleep(0.01)
+        if self.fail:
+            return httpx.Response(503)
+        if request.headers.get("if-none-match") == self.headers["etag"]:
+            return httpx.Response(304, headers=self.headers)
+        return httpx.Response(200, json=KEYS, headers=self.headers)
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(jwks_module, "time", SimpleNamespace(monotonic=lambda: now[0]))
+    return now
+
+
+def _client(issuer, **kwargs):
+    http = httpx.AsyncClient(transport=httpx.MockTransport(issuer))
+    return JWKSClient("https://issuer.test/jwks.json", client=http, **kwargs)
+
+
+def test_cache_lifetime_headers():
+    assert cache_lifetime({"cache-control": "public, max-age=600", "age": "100"}, 300, 30, 3600) == 500
+    assert cache_lifetime({"cache-control": "max-age=999999"}, 300, 30, 3600) == 3600
+    assert cache_lifetime({"cache-control": "no-cache"}, 300, 30, 3600) == 30
+    assert cache_lifetime({}, 300, 30, 3600) == 300
+
+
+def test_concurrent_cold_start_is_single_flight(clock):
+    issuer = Issuer()
+    client = _client(issuer)
+
+    async def run():
+        return await asyncio.gather(*(client.get() for _ in range(50)))
+
+    results = asyncio.run(run())
+    assert all(r == KEYS for r in results)
+    assert len(issuer.requests) == 1
+
+
+def test_stale_served_while_revalidating(clock):
+    issuer = Issuer()
+    client = _client(issuer)
+
+    async def run():
+        await client.get()
+        clock[0] += 61  # past max-age=60
+        stale = await asyncio.gather(*(client.get() for _ in range(20)))
+        await asyncio.sleep(0.05)  # let the background refresh land
+        return stale
+
+    assert all(r == KEYS for r in asyncio.run(run()))
+    assert len(issuer.requests) == 2
+    assert issuer.requests[1].headers["if-none-match"] == '"v1"'
+
+
+def test_issuer_down_serves_stale_then_fails_closed(clock):
+    issuer = Issuer()
+    client = _client(issuer, max_stale=120)
+
+    async def run():
+        await client.get()
+        issuer.fail = True
+        clock[0] += 61
+        assert await client.get() == KEYS  # stale, refresh fails in background
+        await asyncio.sleep(0.05)
+        sent = len(issuer.requests)
+        assert await client.get() == KEYS  # within backoff: no new fetch
+        assert len(issuer.requests) == sent
+        clock[0] += 200  # beyond max_stale
+        with pytest.raises(JWKSUnavailable):
+            await client.get()
+        with pytest.raises(JWKSUnavailable):  # backing off: fails fast without a request
+            await client.get()
+        assert len(issuer.requests) == sent + 1
+        issuer.fail = False
+        clock[0] += 60
+        assert await client.get() == KEYS
+
+    asyncio.run(run())
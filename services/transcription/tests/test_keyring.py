@@ -0,0 +1,64 @@
+import asyncio
+import time
+
+import httpx
+import pytest
+import rsa
+from fastapi import HTTPException
+from jose import jwk, jwt
+
+from app import auth
+from app.config import get_settings
+from app.jwks import JWKSClient
+
+
+@pytest.fixture(scope="module")
+def keypair():
+    public, private = rsa.newkeys(2048)
+    public_jwk = jwk.construct(public.save_pkcs1(), "RS256").to_dict()
+    public_jwk.update(kid="k1", alg="RS256")
+    return private.save_pkcs1(), public_jwk
+
+
+@pytest.fixture
+def issuer(monkeypatch, keypair):
+    requests = []
+
+    def handler(request):
+        requests.append(request)
+        return httpx.Response(200, json={"keys": [keypair[1]]})
+
+    client = JWKSClient("https://issuer.test/jwks.json", client=httpx.AsyncClient(transport=httpx.MockTransport(handler)))
+    monkeypatch.setattr(auth, "_jwks_client", client)
+    monkeypatch.setattr(auth, "_keyring", None)
+    monkeypatch.setattr(get_settings(), "jwt_issuer", "iss")
+    monkeypatch.setattr(get_settings(), "jwt_audience", "aud")
+    return requests
+
+
+def _token(private_pem, kid="k1"):
+    claims = {"sub": "u1", "iss": "iss", "aud": "aud", "exp": int(time.time()) + 600}
+    return "Bearer " + jwt.encode(claims, private_pem, algorithm="RS256", headers={"kid": kid})
+
+
+def test_verify_with_prebuilt_key(issuer, keypair):
+    async def run():
+        for _ in range(3):
+            assert (await auth.verify_jwt(_token(keypair[0])))["sub"] == "u1"
+
+    asyncio.run(run())
+    assert len(issuer) == 1
+
+
+def test_unknown_kid_refreshes_once_then_negative_cached(issuer, keypair):
+    async def run():
+        for _ in range(5):
+            with pytest.raises(HTTPException) as e:
+                await auth.verify_jwt(_token(keypair[0], kid="bogus"))
+            assert e.value.status_code == 401
+        for i in range(5):  # other junk kids inside the refresh interval
+            with pytest.raises(HTTPException):
+                await auth.verify_jwt(_token(keypair[0], kid=f"junk-{i}"))
+
+    asyncio.run(run())
+    assert len(issuer) == 2  # initial fetch + one forced refresh
@@ -0,0 +1,55 @@
+from app import main as main_module
+from app.metrics import StageTimer
+
+from test_transcribe import _sine_wav
+
+
+def _fake_run(path):
+    return {
+        "language": "en",
+        "duration": 0.2,
+        "segments": [{"id": 0, "start": 0.0, "end": 0.2, "text": "timed"}],
+        "text": "timed",
+        "processing_ms": 3,
+        "model_size": "base",
+    }
+
+
+def test_stage_timer_server_timing():
+    timer = StageTimer("/test")
+    timer.add("inference", 0.5)
+    timer.audio_seconds = 10.0
+    assert abs(timer.rtf - 0.05) < 1e-9
+    header = timer.server_timing()
+    assert "inference;dur=500.000" in header
+    assert 'rtf;desc="0.0500"' in header
+    assert timer.as_dict()["inference_ms"] == 500.0
+
+
+def test_transcribe_reports_timings(client, monkeypatch):
+    monkeypatch.setattr(main_module, "run_transcription", _fake_run)
+    monkeypatch.setattr(main_module, "rate_limit", lambda key, limit, window_sec: None)
+    files = {"file": ("t.wav", _sine_wav(), "audio/wav")}
+    r = client.post('/v1/transcribe?timings=true', files=files)
+    assert r.status_code == 200
+    header = r.headers["server-timing"]
+    for stage in ("receive", "transcode", "admission", "queue_wait", "inference", "postprocess", "serialize"):
+        assert f"{stage};dur=" in header
+    timings = r.json()["timings"]
+    assert "inference_ms" in timings and "audio_seconds" in timings and "rtf" in timings
+
+    r = client.post('/v1/transcribe', files={"file": ("t.wav", _sine_wav(), "audio/wav")})
+    assert "timings" not in r.json()
+
+
+def test_metrics_endpoint(client, monkeypatch):
+    monkeypatch.setattr(main_module, "run_transcription", _fake_run)
+    monkeypatch.setattr(main_module, "rate_limit", lambda key, limit, window_sec: None)
+    client.post('/v1/transcribe', files={"file": ("t.wav", _sine_wav(), "audio/wav")})
+    r = client.get('/metrics')
+    assert r.status_code == 200
+    body = r.text
+    assert 'transcription_stage_seconds_bucket{path="/v1/transcribe",stage="inference",le="+Inf"}' in body
+    assert "transcription_queue_depth 0" in body
+    assert "transcription_active_sessions" in body
+    assert "transcription_real_time_factor_count" in body
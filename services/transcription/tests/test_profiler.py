@@ -0,0 +1,48 @@
+import threading
+import time
+
+from app import profiler
+from app.main import app
+from app.auth import verify_jwt
+
+
+def _busy(stop):
+    while not stop.is_set():
+        sum(i * i for i in range(1000))
+
+
+def test_profile_requires_admin_role(client):
+    assert client.get('/debug/profile?seconds=0.1').status_code == 403
+
+
+def test_collapsed_and_speedscope_output(client):
+    app.dependency_overrides[verify_jwt] = lambda: {"sub": "ops", "role": "admin"}
+    stop = threading.Event()
+    worker = threading.Thread(target=_busy, args=(stop,), name="busy-worker")
+    worker.start()
+    try:
+        r = client.get('/debug/profile', params={"seconds": 0.3, "interval_ms": 5})
+        assert r.status_code == 200
+        busy = [line for line in r.text.splitlines() if line.startswith("busy-worker;")]
+        assert busy and any("_busy (test_profiler.py" in line for line in busy)
+        assert all(line.rsplit(" ", 1)[1].isdigit() for line in r.text.splitlines())
+
+        doc = client.get('/debug/profile', params={"seconds": 0.2, "format": "speedscope"}).json()
+        assert doc["$schema"].startswith("https://www.speedscope.app")
+        profile = next(p for p in doc["profiles"] if p["name"] == "busy-worker")
+        assert len(profile["samples"]) == len(profile["weights"])
+        assert all(0 <= i < len(doc["shared"]["frames"]) for stack in profile["samples"] for i in stack)
+    finally:
+        stop.set()
+        worker.join()
+
+
+def test_one_profile_at_a_time(client):
+    app.dependency_overrides[verify_jwt] = lambda: {"sub": "ops", "role": "admin"}
+    holder = threading.Thread(target=profiler.sample, args=(0.5,))
+    holder.start()
+    time.sleep(0.05)
+    try:
+        assert client.get('/debug/profile?seconds=0.1').status_code == 409
+    finally:
+        holder.join()
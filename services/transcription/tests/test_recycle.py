@@ -0,0 +1,33 @@
+from app import main as main_module
+from app import recycle
+from app.metrics import REQUESTS_TOTAL
+
+from test_transcribe import _sine_wav
+
+
+def test_recycler_retires_once(monkeypatch):
+    calls = []
+    monkeypatch.setattr(recycle, "_retire_hook", lambda: calls.append(1))
+    r = recycle.Recycler(max_rss_mb=1)
+    assert r.check() is not None and r.check() is None
+    assert calls == [1]
+
+
+def test_recycler_request_limit(monkeypatch):
+    monkeypatch.setattr(recycle, "_retire_hook", lambda: None)
+    base = REQUESTS_TOTAL.total()
+    r = recycle.Recycler(max_requests=int(base) + 2)
+    assert r.reason(0, base) is None
+    assert r.reason(0, base + 2) is not None
+    assert not recycle.Recycler().enabled and recycle.Recycler().check() is None
+
+
+def test_request_rss_growth_exported(client, monkeypatch):
+    monkeypatch.setattr(main_module, "run_transcription", lambda path: {
+        "language": "en", "duration": 0.2, "segments": [], "text": "", "processing_ms": 1, "model_size": "base"})
+    monkeypatch.setattr(main_module, "rate_limit", lambda *a, **kw: None)
+    client.post('/v1/transcribe', files={"file": ("t.wav", _sine_wav(), "audio/wav")})
+    body = client.get('/metrics').text
+    assert 'transcription_request_rss_growth_bytes_count{path="/v1/transcribe"}' in body
+    rss = [line for line in body.splitlines() if line.startswith("transcription_process_rss_bytes ")]
+    assert rss and float(rss[0].split()[1]) > 0
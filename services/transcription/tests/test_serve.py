@@ -0,0 +1,110 @@
+import os
+import signal
+import socket
+import subprocess
+import sys
+import time
+from pathlib import Path
+
+import httpx
+import pytest
+
+from app import serve
+
+SERVICE_DIR = Path(__file__).resolve().parents[1]
+
+
+def _children(pid):
+    try:
+        with open(f"/proc/{pid}/task/{pid}/children") as f:
+            return {int(p) for p in f.read().split()}
+    except OSError:
+        pytest.skip("needs /proc children listing")
+
+
+def _wait_for(predicate, timeout=20.0):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        value = predicate()
+        if value:
+            return value
+        time.sleep(0.1)
+    raise AssertionError("timed out")
+
+
+def _healthy(port):
+    try:
+        return httpx.get(f"http://127.0.0.1:{port}/healthz", timeout=1.0).status_code == 200
+    except httpx.HTTPError:
+        return False
+
+
+def test_auto_workers_respects_memory(monkeypatch):
+    settings = serve.get_settings()
+    monkeypatch.setattr(settings, "cpu_threads", 2)
+    monkeypatch.setattr(settings, "worker_memory_mb", 1000)
+    monkeypatch.setattr(serve, "cpu_count", lambda: 16)
+    monkeypatch.setattr(serve, "memory_limit_mb", lambda: 3600)
+    assert serve.auto_workers() == 3  # 8 by cores, 3 fit in memory after the master reserve
+    monkeypatch.setattr(serve, "memory_limit_mb", lambda: None)
+    assert serve.auto_workers() == 8
+
+
+def test_single_worker_while_state_is_process_local(monkeypatch):
+    settings = serve.get_settings()
+    monkeypatch.setattr(serve, "auto_workers", lambda: 4)
+    monkeypatch.setattr(settings, "ws_resume_ttl_seconds", 120)
+    monkeypatch.setattr(settings, "enable_incremental", False)
+    assert serve.resolve_workers(0) == 1
+    assert serve.resolve_workers(3) == 3  # explicit count (behind sticky routing) is honoured
+    monkeypatch.setattr(settings, "ws_resume_ttl_seconds", 0)
+    assert serve.resolve_workers(0) == 4
+
+
+@pytest.mark.skipif(not hasattr(os, "fork"), reason="fork-based launcher")
+def test_fork_launcher_rolling_restart_and_respawn():
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        port = s.getsockname()[1]
+    proc = subprocess.Popen(
+        [sys.executable, "-m", "app.serve", "--host", "127.0.0.1", "--port", str(port), "--workers", "2", "--no-warm"],
+        cwd=SERVICE_DIR, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+    )
+    try:
+        first = _wait_for(lambda: len(_children(proc.pid)) == 2 and _healthy(port) and _children(proc.pid))
+
+        proc.send_signal(signal.SIGHUP)
+        second = _wait_for(lambda: (c := _children(proc.pid)) and len(c) == 2 and not c & first and c)
+        assert _healthy(port)
+
+        victim = next(iter(second))
+        os.kill(victim, signal.SIGKILL)
+        _wait_for(lambda: (c := _children(proc.pid)) and len(c) == 2 and victim not in c)
+        assert _healthy(port)
+
+        proc.send_signal(signal.SIGTERM)
+        assert proc.wait(timeout=30) == 0
+    finally:
+        if proc.poll() is None:
+            proc.kill()
+
+
+@pytest.mark.skipif(not hasattr(os, "fork"), reason="fork-based launcher")
+def test_worker_over_rss_watermark_is_replaced():
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        port = s.getsockname()[1]
+    env = {**os.environ, "MAX_RSS_MB": "1", "MEMORY_SAMPLE_SECONDS": "0.2"}
+    proc = subprocess.Popen(
+        [sys.executable, "-m", "app.serve", "--host", "127.0.0.1", "--port", str(port), "--workers", "1", "--no-warm"],
+        cwd=SERVICE_DIR, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+    )
+    try:
+        first = _wait_for(lambda: _healthy(port) and _children(proc.pid))
+        _wait_for(lambda: (c := _children(proc.pid)) and not c & first)
+        assert _wait_for(lambda: _healthy(port))
+        proc.send_signal(signal.SIGTERM)
+        assert proc.wait(timeout=30) == 0
+    finally:
+        if proc.poll() is None:
+            proc.kill()
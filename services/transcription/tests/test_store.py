@@ -0,0 +1,93 @@
+import pytest
+
+from app import main as main_module
+from app.config import get_settings
+from app.main import app
+from app.auth import verify_jwt
+from app.store import TranscriptStore
+
+
+def _fake_run(path):
+    segments = [
+        {"id": 0, "start": 0.0, "end": 2.5, "text": "patient reports chest pain"},
+        {"id": 1, "start": 2.5, "end": 5.0, "text": "no shortness of breath"},
+    ]
+    return {"language": "en", "duration": 5.0, "segments": segments,
+            "text": " ".join(s["text"] for s in segments), "processing_ms": 3, "model_size": "base"}
+
+
+@pytest.fixture
+def store_client(client, monkeypatch, tmp_path):
+    monkeypatch.setattr(get_settings(), "transcript_store_path", str(tmp_path / "transcripts.db"))
+    monkeypatch.setattr(main_module, "run_transcription", _fake_run)
+    monkeypatch.setattr(main_module, "rate_limit", lambda *a, **kw: None)
+    return client
+
+
+def test_stored_result_is_fetched_and_searchable(store_client, monkeypatch):
+    from test_transcribe import _sine_wav
+
+    r = store_client.post('/v1/transcribe', files={"file": ("visit.wav", _sine_wav(), "audio/wav")})
+    assert r.status_code == 200
+    transcript_id = r.json()["transcript_id"]
+
+    def boom(path):
+        raise AssertionError("stored transcripts must not re-run inference")
+    monkeypatch.setattr(main_module, "run_transcription", boom)
+    stored = store_client.get(f'/v1/transcripts/{transcript_id}').json()
+    assert stored["text"] == r.json()["text"] and stored["source"] == "upload"
+    assert stored["segments"][1]["start"] == 2.5 and "inference_ms" in stored["timings"]
+
+    hits = store_client.get('/v1/transcripts/search', params={"q": "breath"}).json()
+    assert hits["results"] == [{
+        "transcript_id": transcript_id, "segment_id": 1, "start": 2.5, "end": 5.0,
+        "text": "no shortness of breath", "filename": "visit.wav", "created_at": stored["created_at"],
+    }]
+    # FTS syntax in the query is matched literally rather than raising
+    assert store_client.get('/v1/transcripts/search', params={"q": 'pain" OR ('}).status_code == 200
+
+
+def test_transcripts_are_scoped_to_owner(store_client):
+    from test_transcribe import _sine_wav
+
+    transcript_id = store_client.post(
+        '/v1/transcribe', files={"file": ("visit.wav", _sine_wav(), "audio/wav")}
+    ).json()["transcript_id"]
+    app.dependency_overrides[verify_jwt] = lambda: {"sub": "someone-else"}
+    assert store_client.get(f'/v1/transcripts/{transcript_id}').status_code == 404
+    assert store_client.get('/v1/transcripts/search', params={"q": "chest"}).json()["results"] == []
+
+
+def test_search_paginates(tmp_path):
+    store = TranscriptStore(str(tmp_path / "t.db"))
+    for i in range(5):
+        store.save("u1", {"filename": f"f{i}.wav", "language": "en", "duration_seconds": 1.0, "model": "base",
+                          "processing_ms": 1, "text": "follow up visit",
+                          "segments": [{"id": 0, "start": 0.0, "end": 1.0, "text": "follow up visit"}]})
+    first = store.search("u1", "follow", limit=2)
+    assert len(first["results"]) == 2 and first["next_offset"] == 2
+    last = store.search("u1", "follow", limit=2, offset=4)
+    assert len(last["results"]) == 1 and last["next_offset"] is None
+    seen = {h["filename"] for off in (0, 2, 4) for h in store.search("u1", "follow", limit=2, offset=off)["results"]}
+    assert len(seen) == 5
+
+
+def test_like_fallback_matches_wildcards_literally(tmp_path):
+    store = TranscriptStore(str(tmp_path / "t.db"))
+    store.fts = False  # SQLite builds without FTS5
+    for text in ("dose 50% reduced", "dose 50 mg", "take_2 tablets", "take 2 tablets", "path a\\b"):
+        store.save("u1", {"filename": "f.wav", "language": "en", "duration_seconds": 1.0, "model": "base",
+                          "processing_ms": 1, "text": text,
+                          "segments": [{"id": 0, "start": 0.0, "end": 1.0, "text": text}]})
+
+    def texts(query):
+        return [h["text"] for h in store.search("u1", query)["results"]]
+
+    assert texts("50%") == ["dose 50% reduced"]
+    assert texts("take_2") == ["take_2 tablets"]
+    assert texts("a\\b") == ["path a\\b"]
+    assert texts("%") == ["dose 50% reduced"]
+
+
+def test_store_disabled_by_default(client):
+    assert client.get('/v1/transcripts/abc').status_code == 404
@@ -0,0 +1,114 @@
+import asyncio
+import json
+import os
+
+import httpx
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from app import tracing
+from app.jwks import JWKSClient
+
+PARENT = "00-4bf92f3577b34da6a3ce929d0e0e4736-00f067aa0ba902b7-01"
+
+
+@pytest.fixture
+def tracer(monkeypatch, tmp_path):
+    def install(ratio=1.0):
+        t = tracing.Tracer("test", [tracing.FileExporter(str(tmp_path / "traces.jsonl"))], ratio, flush_interval=0.01)
+        monkeypatch.setattr(tracing, "_tracer", t)
+        return t
+
+    return install
+
+
+def _spans(tmp_path):
+    spans = []
+    path = tmp_path / "traces.jsonl"
+    for line in path.read_text().splitlines() if path.exists() else ():
+        for rs in json.loads(line)["resourceSpans"]:
+            for ss in rs["scopeSpans"]:
+                spans.extend(ss["spans"])
+    return {s["name"]: s for s in spans}
+
+
+def _app():
+    app = FastAPI()
+    app.add_middleware(tracing.TracingMiddleware)
+
+    @app.get("/items/{item_id}")
+    async def item(item_id: str):
+        with tracing.span("child", {"item": item_id}):
+            pass
+        return {"ok": True}
+
+    return app
+
+
+def test_traceparent_round_trip_and_rejects():
+    ctx = tracing.parse_traceparent(PARENT)
+    assert ctx == tracing.SpanContext("4bf92f3577b34da6a3ce929d0e0e4736", "00f067aa0ba902b7", True)
+    assert tracing.format_traceparent(ctx) == PARENT
+    for bad in (None, "", "garbage", "00-" + "0" * 32 + "-00f067aa0ba902b7-01",
+                "ff-4bf92f3577b34da6a3ce929d0e0e4736-00f067aa0ba902b7-01", PARENT + "-extra"):
+        assert tracing.parse_traceparent(bad) is None
+
+
+def test_server_span_continues_incoming_trace(tracer, tmp_path):
+    t = tracer(ratio=0.0)  # parent-based: the caller's sampled flag wins over the ratio
+    response = TestClient(_app()).get("/items/42", headers={"traceparent": PARENT})
+    t.shutdown()
+    assert response.headers["traceresponse"].startswith("00-4bf92f3577b34da6a3ce929d0e0e4736-")
+    spans = _spans(tmp_path)
+    server, child = spans["GET /items/{item_id}"], spans["child"]
+    assert server["traceId"] == child["traceId"] == "4bf92f3577b34da6a3ce929d0e0e4736"
+    assert server["parentSpanId"] == "00f067aa0ba902b7"
+    assert child["parentSpanId"] == server["spanId"]
+    assert server["kind"] == tracing.SERVER
+
+
+def test_unsampled_request_exports_nothing(tracer, tmp_path):
+    t = tracer(ratio=0.0)
+    response = TestClient(_app()).get("/items/1")
+    t.shutdown()
+    assert response.headers["traceresponse"].endswith("-00")
+    assert _spans(tmp_path) == {}
+
+
+def test_jwks_fetch_propagates_context(tracer, tmp_path):
+    t = tracer()
+    seen = []
+
+    def handler(request):
+        seen.append(request.headers.get("traceparent"))
+        return httpx.Response(200, json={"keys": []})
+
+    client = JWKSClient("https://issuer.test/jwks.json", client=httpx.AsyncClient(transport=httpx.MockTransport(handler)))
+
+    async def run():
+        with tracing.span("request", parent=tracing.parse_traceparent(PARENT)):
+            await client.get()
+
+    asyncio.run(run())
+    t.shutdown()
+    fetch = _spans(tmp_path)["jwks.fetch"]
+    assert seen == [f"00-{fetch['traceId']}-{fetch['spanId']}-01"]
+    assert fetch["kind"] == tracing.CLIENT
+
+
+def test_export_thread_restarts_in_forked_child(tracer, tmp_path):
+    tracer()  # configured before fork, as in the preloading launcher
+    pid = os.fork()
+    if pid == 0:
+        code = 1
+        try:
+            with tracing.span("in-child"):
+                pass
+            tracing.get_tracer().shutdown()
+            code = 0
+        finally:
+            os._exit(code)
+    _, status = os.waitpid(pid, 0)
+    assert os.WEXITSTATUS(status) == 0
+    assert "in-child" in _spans(tmp_path)
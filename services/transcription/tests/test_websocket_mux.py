@@ -0,0 +1,76 @@
+import numpy as np
+
+from app import websocket as ws_module
+from app.metrics import ACTIVE_SESSIONS
+
+
+def _fake_run(audio):
+    return {"language": "en", "duration": len(audio) / 16000.0, "segments": [],
+            "text": f"{len(audio)} samples", "processing_ms": 1, "model_size": "base"}
+
+
+def _pcm(seconds, freq):
+    n = int(seconds * 16000)
+    return (np.sin(2 * np.pi * freq * np.arange(n) / 16000) * 8000).astype("<i2").tobytes()
+
+
+def test_two_channels_on_one_connection(client, monkeypatch):
+    monkeypatch.setattr(ws_module, "run_transcription", _fake_run)
+    with client.websocket_connect('/v1/ws') as ws:
+        for ch in (1, 2):
+            ws.send_text('{"type": "start", "channel": %d, "codec": "pcm16", "sample_rate": 16000}' % ch)
+            ready = ws.receive_json()
+            assert ready["channel"] == ch and ready["mode"] == "pcm"
+        a, b = _pcm(0.5, 200), _pcm(1.0, 300)
+        for off in range(0, max(len(a), len(b)), 3200):
+            if off < len(a):
+                ws.send_bytes(bytes([1]) + a[off:off + 3200])
+            if off < len(b):
+                ws.send_bytes(bytes([2]) + b[off:off + 3200])
+        ws.send_text('{"type": "end", "channel": 2}')
+        ws.send_text('{"type": "end", "channel": 1}')
+        finals = {}
+        while len(finals) < 2:
+            msg = ws.receive_json()
+            if msg["type"] == "final":
+                finals[msg["channel"]] = msg["text"]
+        assert finals == {1: "8000 samples", 2: "16000 samples"}
+        ws.send_text('{"type": "close"}')
+    assert ACTIVE_SESSIONS.value() == 0
+
+
+def test_channel_limits_are_per_channel(client, monkeypatch):
+    monkeypatch.setattr(ws_module.settings, "ws_channel_max_bytes", 1000)
+    monkeypatch.setattr(ws_module, "run_transcription", _fake_run)
+    with client.websocket_connect('/v1/ws') as ws:
+        ws.send_text('{"type": "start", "channel": 0, "codec": "pcm16"}')
+        ws.receive_json()
+        ws.send_text('{"type": "start", "channel": 1, "codec": "pcm16"}')
+        ws.receive_json()
+        ws.send_bytes(bytes([0]) + b"\x00" * 2000)
+        err = ws.receive_json()
+        assert err["type"] == "error" and err["channel"] == 0
+        ws.send_bytes(bytes([1]) + b"\x00" * 800)
+        ws.send_text('{"type": "end", "channel": 1}')
+        msg = ws.receive_json()
+        assert msg["type"] == "final" and msg["channel"] == 1
+        ws.send_bytes(bytes([7]) + b"\x00\x00")
+        assert ws.receive_json()["detail"] == "Unknown channel"
+
+
+def test_finalize_failure_is_reported_on_the_channel(client, monkeypatch, caplog):
+    def broken_run(audio):
+        raise RuntimeError("model exploded")
+
+    monkeypatch.setattr(ws_module, "run_transcription", broken_run)
+    with client.websocket_connect('/v1/ws') as ws:
+        ws.send_text('{"type": "start", "channel": 3, "codec": "pcm16"}')
+        ws.receive_json()
+        ws.send_bytes(bytes([3]) + _pcm(0.2, 200))
+        ws.send_text('{"type": "end", "channel": 3}')
+        msg = ws.receive_json()
+        while msg["type"] == "ack":
+            msg = ws.receive_json()
+        assert msg == {"type": "error", "detail": "Transcription failed", "channel": 3}
+        ws.send_text('{"type": "close"}')
+    assert "Stream finalize failed" in caplog.text
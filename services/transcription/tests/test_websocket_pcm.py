@@ -0,0 +1,107 @@
+import numpy as np
+
+from app import websocket as ws_module
+
+
+def _capture(calls):
+    def run(audio):
+        calls.append(audio)
+        return {"language": "en", "duration": 0.0, "segments": [], "text": "pcm ok",
+                "processing_ms": 1, "model_size": "base"}
+    return run
+
+
+def test_pcm_fast_lane_skips_ffmpeg(client, monkeypatch):
+    calls = []
+    monkeypatch.setattr(ws_module, "run_transcription", _capture(calls))
+
+    async def no_ffmpeg(*a, **kw):
+        raise AssertionError("ffmpeg must not run for pcm16 sessions")
+    monkeypatch.setattr(ws_module, "transcode_to_wav_16k", no_ffmpeg)
+
+    samples = (np.sin(np.arange(16000) / 5.0) * 8000).astype("<i2").tobytes()
+    with client.websocket_connect('/v1/ws') as ws:
+        ws.send_text('{"type": "start", "codec": "pcm16", "sample_rate": 16000, "channels": 1}')
+        ready = ws.receive_json()
+        assert ready["type"] == "ready" and ready["mode"] == "pcm"
+        # odd-sized frames must be stitched back together
+        ws.send_bytes(samples[:1001])
+        ws.send_bytes(samples[1001:])
+        ws.send_text('__end__')
+        msg = ws.receive_json()
+    assert msg["type"] == "final" and msg["mode"] == "pcm"
+    audio = calls[0]
+    assert audio.dtype == np.float32 and len(audio) == 16000
+    assert msg["timings"]["audio_seconds"] == 1.0
+
+
+def test_non_pcm_start_falls_back_to_container(client):
+    with client.websocket_connect('/v1/ws') as ws:
+        ws.send_text('{"type": "start", "codec": "m4a", "sample_rate": 48000, "channels": 1}')
+        assert ws.receive_json()["mode"] == "container"
+        ws.send_bytes(b"\x00\x01")
+        ws.send_text('{"type": "start", "codec": "pcm16"}')
+        assert ws.receive_json()["type"] == "error"
+
+
+def test_pcm_buffer_grows_and_caps():
+    from app.audio import PcmBuffer, AudioProcessingError
+    buf = PcmBuffer(max_seconds=2, initial_seconds=0.5)
+    buf.append(b"\x01\x00" * 16000)
+    assert len(buf) == 16000 and buf.duration == 1.0
+    try:
+        buf.append(b"\x01\x00" * 20000)
+    except AudioProcessingError:
+        pass
+    else:
+        raise AssertionError("expected cap")
+
+
+def test_compressed_stream_decodes_incrementally(client, monkeypatch):
+    from app.metrics import DECODER_PROCESSES
+    from test_transcribe import _sine_wav
+
+    calls = []
+    monkeypatch.setattr(ws_module, "run_transcription", _capture(calls))
+    data = _sine_wav(duration_sec=1.0).read()
+    with client.websocket_connect('/v1/ws') as ws:
+        ws.send_text('{"type": "start", "codec": "wav", "sample_rate": 16000, "channels": 1}')
+        assert ws.receive_json()["mode"] == "stream"
+        assert DECODER_PROCESSES.value() == 1
+        for off in range(0, len(data), 4096):
+            ws.send_bytes(data[off:off + 4096])
+        ws.send_text('__end__')
+        msg = ws.receive_json()
+    assert msg["type"] == "final" and msg["mode"] == "stream"
+    assert abs(len(calls[0]) - 16000) < 160
+    assert DECODER_PROCESSES.value() == 0
+
+
+def test_stream_decoder_torn_down_on_disconnect(client, monkeypatch):
+    from app.metrics import DECODER_PROCESSES
+    from app.sessions import get_registry
+    import time
+
+    monkeypatch.setattr(get_registry(), "ttl_seconds", 0)  # no resumption window
+
+    with client.websocket_connect('/v1/ws') as ws:
+        ws.send_text('{"type": "start", "codec": "webm"}')
+        assert ws.receive_json()["mode"] == "stream"
+        ws.send_bytes(b"\x1a\x45\xdf\xa3")
+    deadline = time.time() + 5
+    while DECODER_PROCESSES.value() and time.time() < deadline:
+        time.sleep(0.01)
+    assert DECODER_PROCESSES.value() == 0
+
+
+def test_finalize_failure_sends_error_on_legacy_end(client, monkeypatch):
+    def broken_run(audio):
+        raise RuntimeError("model exploded")
+
+    monkeypatch.setattr(ws_module, "run_transcription", broken_run)
+    with client.websocket_connect('/v1/ws') as ws:
+        ws.send_text('{"type": "start", "codec": "pcm16", "sample_rate": 16000, "channels": 1}')
+        ws.receive_json()
+        ws.send_bytes(b"\x00\x01" * 1600)
+        ws.send_text('__end__')
+        assert ws.receive_json() == {"type": "error", "detail": "Transcription failed"}
@@ -0,0 +1,62 @@
+import numpy as np
+import pytest
+
+from app import websocket as ws_module
+from app.sessions import get_registry
+
+
+@pytest.fixture(autouse=True)
+def _empty_registry():
+    get_registry().clear()
+    yield
+    get_registry().clear()
+
+
+def _fake_run(audio):
+    return {"language": "en", "duration": len(audio) / 16000.0, "segments": [],
+            "text": f"{len(audio)} samples", "processing_ms": 1, "model_size": "base"}
+
+
+def _pcm(n):
+    return (np.arange(n) % 100).astype("<i2").tobytes()
+
+
+def test_resume_continues_from_acked_offset(client, monkeypatch):
+    monkeypatch.setattr(ws_module, "run_transcription", _fake_run)
+    monkeypatch.setattr(ws_module.settings, "ws_ack_bytes", 1000)
+    audio = _pcm(16000)
+    with client.websocket_connect('/v1/ws') as ws:
+        ws.send_text('{"type": "start", "codec": "pcm16", "sample_rate": 16000}')
+        sid = ws.receive_json()["session_id"]
+        ws.send_bytes(audio[:12000])
+        ack = ws.receive_json()
+        assert ack == {"type": "ack", "offset": 12000}
+    # connection dropped; the session is parked rather than discarded
+    assert len(get_registry()) == 1
+
+    with client.websocket_connect('/v1/ws') as ws:
+        ws.send_text('{"type": "resume", "session_id": "%s"}' % sid)
+        resumed = ws.receive_json()
+        assert resumed["type"] == "resumed" and resumed["offset"] == 12000
+        ws.send_bytes(audio[resumed["offset"]:])
+        ws.send_text('__end__')
+        msgs = [ws.receive_json() for _ in range(2)]
+    final = [m for m in msgs if m["type"] == "final"][0]
+    assert final["text"] == "16000 samples" and final["session_id"] == sid
+    assert len(get_registry()) == 0
+
+
+def test_resume_rejects_other_subject(client):
+    from app.main import app
+    from app.auth import verify_jwt
+
+    with client.websocket_connect('/v1/ws') as ws:
+        ws.send_text('{"type": "start", "codec": "pcm16"}')
+        sid = ws.receive_json()["session_id"]
+        ws.send_bytes(_pcm(100))
+    app.dependency_overrides[verify_jwt] = lambda: {"sub": "someone-else"}
+    with client.websocket_connect('/v1/ws') as ws:
+        ws.send_text('{"type": "resume", "session_id": "%s"}' % sid)
+        assert ws.receive_json()["detail"] == "Unknown or expired session"
+    # still claimable by its owner
+    assert len(get_registry()) == 1